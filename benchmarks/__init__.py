@@ -0,0 +1 @@
+# 📊 Offline benchmark harness (python -m benchmarks.run_benchmarks)
@@ -0,0 +1,388 @@
+# 🎭 Local stand-ins for GitHub (REST + GraphQL) and the OpenAI embedding / chat endpoints, serving synthetic repos
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy as np
+
+EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+AUTHORS = ["alice", "bob", "carol", "dave", "erin", "frank", "grace", "heidi"]
+DIRECTORIES = ["src/core", "src/api", "src/utils", "src/ui/components", "docs", "tests", "scripts"]
+BRANCHES = ["main", "main", "main", "develop", "release"]
+WORDS = ("fix add update refactor remove handle support improve cache retry parser config client "
+         "token request response error timeout merge conflict branch test docs build").split()
+VERDICTS = ["This PR is ready to merge.", "Safe to merge after CI passes.", "Minor issues, requires small changes.",
+            "Needs review from a code owner.", "Possible conflicts with recent changes.",
+            "Not recommended in its current state."]
+
+
+def _timestamp(hours):
+    return (EPOCH + timedelta(hours=hours)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+class SyntheticRepo:
+    """
+    A deterministic fake repo: `closed` + `open` PRs numbered 1..N (the newest
+    `open` ones are still open). PR bodies, files and comments are generated
+    from `seed` and the PR number on request, so big repos cost no memory.
+    """
+
+    def __init__(self, owner="bench", name="repo", closed=500, open=50, files_per_pr=6, comments_per_pr=4,
+                 seed=0):
+        self.owner = owner
+        self.name = name
+        self.closed = closed
+        self.open = open
+        self.files_per_pr = files_per_pr
+        self.comments_per_pr = comments_per_pr
+        self.seed = seed
+        self.total = closed + open
+        # number -> (created hour, updated hour); listing sorts on these
+        self.times = {}
+        for number in range(1, self.total + 1):
+            created = number * 3
+            self.times[number] = (created, created + self._rng(number, "updated").randint(1, 400))
+
+    def _rng(self, number, part):
+        return random.Random(f"{self.seed}:{number}:{part}")
+
+    def state(self, number):
+        return "open" if number > self.closed else "closed"
+
+    def pull(self, number):
+        """The `/pulls` list entry of PR `number`."""
+        rng = self._rng(number, "pull")
+        created, updated = self.times[number]
+        merged = self.state(number) == "closed" and rng.random() < 0.7
+        return {
+            "number": number,
+            "title": f"{_sentence(rng, 4).capitalize()} (#{number})",
+            "state": self.state(number),
+            "user": {"login": rng.choice(AUTHORS)},
+            "created_at": _timestamp(created),
+            "updated_at": _timestamp(updated),
+            "merged_at": _timestamp(updated) if merged else None,
+            "base": {"ref": rng.choice(BRANCHES)},
+            "head": {"ref": f"feature/{number}-{rng.choice(WORDS)}",
+                     "sha": hashlib.sha1(f"{self.seed}:{number}".encode()).hexdigest()},
+            "mergeable": rng.random() > 0.1,
+        }
+
+    def files(self, number):
+        rng = self._rng(number, "files")
+        files = []
+        for index in range(rng.randint(1, self.files_per_pr * 2 - 1)):
+            added = [f"+    {_sentence(rng, 6)}" for _ in range(rng.randint(1, 12))]
+            removed = [f"-    {_sentence(rng, 6)}" for _ in range(rng.randint(0, 6))]
+            files.append({
+                "filename": f"{rng.choice(DIRECTORIES)}/{rng.choice(WORDS)}_{index}.py",
+                "status": rng.choice(["modified", "modified", "modified", "added", "removed"]),
+                "additions": len(added),
+                "deletions": len(removed),
+                "patch": "\n".join([f"@@ -1,{len(removed)} +1,{len(added)} @@"] + removed + added),
+            })
+        return files
+
+    def comments(self, number):
+        rng = self._rng(number, "comments")
+        created = self.times[number][0]
+        return [{"user": {"login": rng.choice(AUTHORS)}, "created_at": _timestamp(created + index + 1),
+                 "body": _sentence(rng, rng.randint(5, 30))}
+                for index in range(rng.randint(0, self.comments_per_pr * 2))]
+
+    def listing(self, state="open", sort="created", direction="desc"):
+        numbers = [number for number in self.times if state == "all" or self.state(number) == state]
+        position = 1 if sort == "updated" else 0
+        return sorted(numbers, key=lambda number: self.times[number][position], reverse=direction != "asc")
+
+    # GraphQL shapes (see graphql_extractor.PR_FIELDS)
+    def graphql_state(self, number):
+        if self.state(number) == "open":
+            return "OPEN"
+        return "MERGED" if self.pull(number)["merged_at"] else "CLOSED"
+
+    def graphql_node(self, number, nested):
+        pull = self.pull(number)
+        files = [{"path": file["filename"], "changeType": file["status"].upper().replace("REMOVED", "DELETED"),
+                  "additions": file["additions"], "deletions": file["deletions"]}
+                 for file in self.files(number)]
+        comments = [{"author": comment["user"], "createdAt": comment["created_at"], "body": comment["body"]}
+                    for comment in self.comments(number)]
+        return {
+            "number": number, "title": pull["title"], "state": self.graphql_state(number),
+            "createdAt": pull["created_at"], "mergedAt": pull["merged_at"], "updatedAt": pull["updated_at"],
+            "mergeable": "MERGEABLE" if pull["mergeable"] else "CONFLICTING",
+            "author": pull["user"], "baseRefName": pull["base"]["ref"], "headRefName": pull["head"]["ref"],
+            "headRefOid": pull["head"]["sha"],
+            "files": connection(files, nested, None), "comments": connection(comments, nested, None),
+        }
+
+
+def connection(items, first, after):
+    """A GraphQL connection page; cursors are plain offsets."""
+    start = int(after) if after else 0
+    page = items[start:start + first]
+    end = start + len(page)
+    return {"pageInfo": {"hasNextPage": end < len(items), "endCursor": str(end)}, "nodes": page}
+
+
+def fake_vector(text, dim):
+    """Unit vector derived from the text alone, so equal inputs embed equally across runs."""
+    vector = np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class FakeServices:
+    """
+    Serves `repos` on `http://host:port`: the GitHub REST endpoints the
+    extractors use, `/graphql`, and OpenAI's `/v1/embeddings` and
+    `/v1/chat/completions`. Each request sleeps `latency` seconds (+ up to
+    `jitter`; LLM calls use `llm_latency`, embedding calls `embed_latency`).
+    GitHub responses carry ETags and `X-RateLimit-*` headers counting down
+    from `rate_limit` per token; 304s are free, as on GitHub.
+    """
+
+    def __init__(self, repos, host="127.0.0.1", port=0, latency=0.02, jitter=0.01, embed_latency=0.05,
+                 llm_latency=0.3, embedding_dim=256, rate_limit=5000, page_size_cap=100):
+        self.repos = {(repo.owner, repo.name): repo for repo in repos}
+        self.latency = latency
+        self.jitter = jitter
+        self.embed_latency = embed_latency
+        self.llm_latency = llm_latency
+        self.embedding_dim = embedding_dim
+        self.rate_limit = rate_limit
+        self.page_size_cap = page_size_cap
+        self.reset_at = int(time.time()) + 3600
+        self.remaining = {}  # (token, resource) -> requests left
+        self.requests = {}  # endpoint kind -> count
+        self.log = []  # (method, path, status) of every request, in arrival order
+        self.failing_pages = set()  # `/pulls` listing pages answered with a 502
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _sleep(self, base):
+        with self._lock:
+            delay = base + self._random.uniform(0, self.jitter)
+        time.sleep(delay)
+
+    def _count(self, kind, size):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            self.bytes_sent += size
+
+    def _log(self, method, path, status):
+        with self._lock:
+            self.log.append((method, path, status))
+
+    def _take_quota(self, token, resource):
+        """Remaining quota after this request, or -1 when it is exhausted."""
+        with self._lock:
+            key = (token, resource)
+            left = self.remaining.get(key, self.rate_limit)
+            if left <= 0:
+                return -1
+            self.remaining[key] = left - 1
+            return left - 1
+
+    def rate_headers(self, token, resource, remaining=None):
+        if remaining is None:
+            remaining = self.remaining.get((token, resource), self.rate_limit)
+        return {"X-RateLimit-Limit": str(self.rate_limit), "X-RateLimit-Remaining": str(max(remaining, 0)),
+                "X-RateLimit-Used": str(self.rate_limit - max(remaining, 0)),
+                "X-RateLimit-Reset": str(self.reset_at), "X-RateLimit-Resource": resource}
+
+    def rate(self, token, resource):
+        """One `/rate_limit` entry."""
+        headers = self.rate_headers(token, resource)
+        return {"limit": self.rate_limit, "remaining": int(headers["X-RateLimit-Remaining"]),
+                "reset": self.reset_at, "used": int(headers["X-RateLimit-Used"])}
+
+    # Request routing
+
+    def github_get(self, path, query):
+        """`(status, body, link)` of a REST GET."""
+        match = re.fullmatch(r"/repos/([^/]+)/([^/]+)/(pulls|issues)(?:/(\d+)/(files|comments))?", path)
+        repo = match and self.repos.get((match.group(1), match.group(2)))
+        if repo is None:
+            return 404, {"message": "Not Found"}, None
+
+        per_page = min(int(query.get("per_page", 30)), self.page_size_cap)
+        page = int(query.get("page", 1))
+        if match.group(4):
+            number = int(match.group(4))
+            if number not in repo.times:
+                return 404, {"message": "Not Found"}, None
+            items = repo.files(number) if match.group(5) == "files" else repo.comments(number)
+        elif match.group(3) == "pulls":
+            if page in self.failing_pages:
+                return 502, {"message": "Bad Gateway"}, None
+            items = repo.listing(query.get("state", "open"), query.get("sort", "created"),
+                                 query.get("direction", "desc"))
+        else:
+            return 404, {"message": "Not Found"}, None
+
+        start = (page - 1) * per_page
+        body = items[start:start + per_page]
+        if not match.group(4):
+            body = [repo.pull(number) for number in body]
+        link = None
+        if start + per_page < len(items):
+            next_query = dict(query, page=page + 1, per_page=per_page)
+            link = f'<{self.url}{path}?{urlencode(next_query)}>; rel="next"'
+        return 200, body, link
+
+    def graphql(self, payload):
+        variables = payload.get("variables") or {}
+        repo = self.repos.get((variables.get("owner"), variables.get("name")))
+        if repo is None:
+            return {"data": {"repository": None}, "errors": [{"message": "Could not resolve to a Repository"}]}
+        query = payload.get("query", "")
+        nested = int(re.search(r"first: (\d+)", query.split("nodes", 1)[-1] if "pullRequests" in query else query)
+                     .group(1))
+
+        if "pullRequests(" in query:
+            states = variables.get("states") or ["OPEN"]
+            numbers = [number for number in repo.listing("all") if repo.graphql_state(number) in states]
+            page = connection(numbers, variables["pageSize"], variables.get("cursor"))
+            page["nodes"] = [repo.graphql_node(number, nested) for number in page["nodes"]]
+            return {"data": {"repository": {"pullRequests": page}}}
+
+        field = "files" if re.search(r"\bfiles\(", query) else "comments"
+        node = repo.graphql_node(variables["number"], 10 ** 6)
+        nodes = node[field]["nodes"]
+        return {"data": {"repository": {"pullRequest": {field: connection(nodes, nested, variables.get("cursor"))}}}}
+
+    def embeddings(self, payload):
+        inputs = payload["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dim = payload.get("dimensions") or self.embedding_dim
+        data, tokens = [], 0
+        for index, item in enumerate(inputs):
+            text = item if isinstance(item, str) else " ".join(map(str, item))
+            tokens += len(item) if not isinstance(item, str) else len(item) // 4 + 1
+            vector = fake_vector(text, dim)
+            embedding = (base64.b64encode(vector.tobytes()).decode("ascii")
+                         if payload.get("encoding_format") == "base64" else vector.tolist())
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        return {"object": "list", "data": data, "model": payload.get("model", "fake-embedding"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    def chat(self, payload):
+        prompt = "\n".join(str(message.get("content", "")) for message in payload.get("messages", []))
+        verdict = VERDICTS[zlib.crc32(prompt.encode("utf-8")) % len(VERDICTS)]
+        prompt_tokens = len(prompt) // 4 + 1
+        completion_tokens = len(verdict) // 4 + 1
+        return {
+            "id": f"chatcmpl-{hashlib.md5(prompt.encode('utf-8')).hexdigest()[:12]}", "object": "chat.completion",
+            "created": int(time.time()), "model": payload.get("model", "fake-chat"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": verdict},
+                         "finish_reason": "stop", "logprobs": None}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def _handler_class(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real APIs
+            disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                services._log(self.command, urlparse(self.path).path, status)
+                data = json.dumps(body).encode("utf-8") if body is not None else b""
+                self.send_response(status)
+                if body is not None:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+                return len(data)
+
+            def _token(self):
+                return self.headers.get("Authorization", "").rsplit(" ", 1)[-1]
+
+            def _github(self, resource, status, body, link=None):
+                token = self._token()
+                data = json.dumps(body).encode("utf-8")
+                etag = f'"{hashlib.md5(data).hexdigest()}"'
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    return self._send(304, None, dict(services.rate_headers(token, resource), ETag=etag))
+                remaining = services._take_quota(token, resource)
+                if remaining < 0:
+                    return self._send(403, {"message": "API rate limit exceeded"},
+                                      services.rate_headers(token, resource, 0))
+                headers = dict(services.rate_headers(token, resource, remaining), ETag=etag)
+                if link:
+                    headers["Link"] = link
+                return self._send(status, body, headers)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                services._sleep(services.latency)
+                if url.path == "/rate_limit":
+                    resources = {resource: services.rate(self._token(), resource) for resource in ("core", "graphql")}
+                    size = self._send(200, {"resources": resources, "rate": resources["core"]})
+                    return services._count("rate_limit", size)
+                status, body, link = services.github_get(url.path, query)
+                services._count("rest", self._github("core", status, body, link))
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                path = urlparse(self.path).path
+                if path.endswith("/graphql"):
+                    services._sleep(services.latency)
+                    services._count("graphql", self._github("graphql", 200, services.graphql(payload)))
+                elif path.endswith("/embeddings"):
+                    services._sleep(services.embed_latency)
+                    services._count("embeddings", self._send(200, services.embeddings(payload)))
+                elif path.endswith("/chat/completions"):
+                    services._sleep(services.llm_latency)
+                    services._count("chat", self._send(200, services.chat(payload)))
+                else:
+                    self._send(404, {"message": "Not Found"})
+
+        return Handler
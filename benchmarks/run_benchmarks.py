@@ -0,0 +1,432 @@
+# 🏁 Offline pipeline benchmarks: fetch, load/format/chunk, embed, retrieve and evaluate against local fake services
+"""
+Runs every stage of the pipeline on a synthetic repo served by
+`fake_services`, each stage in a fresh process (so its peak RSS is its
+own), and reports throughput, p50/p99 latency and peak RSS per stage.
+Results go to `benchmarks/results.json` and are compared with
+`benchmarks/baseline.json`; the exit code is 1 on a regression and 2 when
+the baseline was recorded with other settings (embedding backend included).
+
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --closed 5000 --open 200 --backend async --no-baseline
+    python -m benchmarks.run_benchmarks --update-baseline
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from .fake_services import FakeServices, SyntheticRepo
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+RESULTS_FILE = os.path.join(BENCH_DIR, "results.json")
+STAGES = ("fetch", "load", "embed", "retrieve", "evaluate")
+REPO_OWNER, REPO_NAME = "bench", "repo"
+# Metric -> (whether higher is better, change ignored below this absolute size); compared within --tolerance
+METRICS = {"throughput": (True, 0), "p50_ms": (False, 2), "p99_ms": (False, 10), "peak_rss_mb": (False, 10)}
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of `samples` (0 when empty)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024  # Bytes on macOS, KiB on Linux
+
+
+# Timing probes: they only measure, every call still goes through the real code path
+
+@contextmanager
+def timed_http(samples):
+    """Appends the round-trip seconds of every `requests` / `httpx` request sent inside the block."""
+    import httpx
+    import requests
+
+    send, async_send = requests.Session.send, httpx.AsyncClient.send
+
+    def timed_send(session, request, **kwargs):
+        started = time.perf_counter()
+        try:
+            return send(session, request, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - started)
+
+    async def timed_async_send(client, request, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await async_send(client, request, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - started)
+
+    requests.Session.send, httpx.AsyncClient.send = timed_send, timed_async_send
+    try:
+        yield samples
+    finally:
+        requests.Session.send, httpx.AsyncClient.send = send, async_send
+
+
+def timed_embeddings(embeddings, samples):
+    """`embeddings` with the seconds of each `embed_documents` / `embed_query` call appended to `samples`."""
+    from langchain_core.embeddings import Embeddings
+
+    class TimedEmbeddings(Embeddings):
+        def embed_documents(self, texts):
+            started = time.perf_counter()
+            try:
+                return embeddings.embed_documents(texts)
+            finally:
+                samples.append(time.perf_counter() - started)
+
+        def embed_query(self, text):
+            return self.embed_documents([text])[0]
+
+    return TimedEmbeddings()
+
+
+class TimedLLM:
+    """Chat client wrapper recording the seconds of each `ainvoke`."""
+
+    def __init__(self, llm, samples):
+        self.llm = llm
+        self.samples = samples
+
+    async def ainvoke(self, messages, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await self.llm.ainvoke(messages, **kwargs)
+        finally:
+            self.samples.append(time.perf_counter() - started)
+
+
+# Stages. Each runs in its own process on the data the previous stages left
+# in SMARTMERGE_DATA_DIR and returns `items`, `seconds` and latency `samples`.
+
+def _repo():
+    from smartmerge_ai.pr_records import repo_key
+    return repo_key(REPO_OWNER, REPO_NAME)
+
+
+def _load(state):
+    from smartmerge_ai.pr_records import pr_data_path
+    from smartmerge_ai.vector_store import load_pr_data
+    return load_pr_data(pr_data_path(state, _repo()))
+
+
+def bench_fetch(options):
+    """Full sync of both PR datasets over the chosen backend; latency per HTTP request."""
+    from smartmerge_ai.pr_dataset import iter_raw_prs
+    from smartmerge_ai.pr_sync import fetch_repo_prs
+
+    samples = []
+    started = time.perf_counter()
+    with timed_http(samples):
+        fetch_repo_prs(REPO_OWNER, REPO_NAME, "full", options["backend"])
+    seconds = time.perf_counter() - started
+    prs = sum(1 for state in ("closed", "open") for _ in iter_raw_prs(state, _repo()))
+    return {"items": prs, "unit": "PRs", "latency_of": "HTTP request", "seconds": seconds, "samples": samples}
+
+
+def bench_load(options):
+    """Reads the raw PR files, then formats and chunks PR by PR; latency per PR."""
+    from smartmerge_ai.vector_store import build_pr_documents
+
+    samples = []
+    chunks = 0
+    started = time.perf_counter()
+    prs = _load("closed") + _load("open")
+    for pr in prs:
+        pr_started = time.perf_counter()
+        texts, _ = build_pr_documents([pr])
+        chunks += len(texts)
+        samples.append(time.perf_counter() - pr_started)
+    seconds = time.perf_counter() - started
+    return {"items": len(prs), "unit": "PRs", "latency_of": "PR", "seconds": seconds, "samples": samples,
+            "chunks": chunks}
+
+
+def bench_embed(options):
+    """Embeds every chunk into fresh closed / open stores; latency per embedding request."""
+    from smartmerge_ai.embedding_cache import sync_texts
+    from smartmerge_ai.vector_store import build_pr_documents, embeddings_path, get_embeddings, open_pr_store
+
+    documents = {state: build_pr_documents(_load(state)) for state in ("closed", "open")}
+    samples = []
+    embeddings = timed_embeddings(get_embeddings(), samples)
+    started = time.perf_counter()
+    for state, (texts, metadatas) in documents.items():
+        store = open_pr_store(embeddings_path(state, _repo()), embeddings=embeddings)
+        sync_texts(store, texts, metadatas)
+        store.persist()
+    seconds = time.perf_counter() - started
+    return {"items": sum(len(texts) for texts, _ in documents.values()), "unit": "chunks",
+            "latency_of": "embedding request", "seconds": seconds, "samples": samples}
+
+
+def bench_retrieve(options):
+    """Top-k similar closed PR chunks for each open PR; latency per query (embedding + search)."""
+    from smartmerge_ai.config import CONTEXT_TOP_K
+    from smartmerge_ai.vector_store import embeddings_path, format_closed_prs, open_pr_store, search_prs
+
+    closed_db = open_pr_store(embeddings_path("closed", _repo()))
+    queries = format_closed_prs(_load("open"))
+    samples = []
+    started = time.perf_counter()
+    for query in queries:
+        query_started = time.perf_counter()
+        search_prs(closed_db, query, k=CONTEXT_TOP_K)
+        samples.append(time.perf_counter() - query_started)
+    seconds = time.perf_counter() - started
+    return {"items": len(queries), "unit": "queries", "latency_of": "query", "seconds": seconds,
+            "samples": samples}
+
+
+def bench_evaluate(options):
+    """LLM evaluation of every open PR (no triage, no verdict cache); latency per LLM call."""
+    from smartmerge_ai.ragLLM import get_llm, stream_evaluations
+    from smartmerge_ai.stats_index import StatsIndex
+    from smartmerge_ai.vector_store import embeddings_path, open_pr_store
+
+    closed_db = open_pr_store(embeddings_path("closed", _repo()))
+    open_prs = _load("open")
+    stats = StatsIndex(_repo())
+    samples = []
+    llm = TimedLLM(get_llm(), samples)
+
+    async def evaluate_all():
+        count = 0
+        async for _ in stream_evaluations(closed_db, open_prs, use_cache=False, stats=stats, llm=llm,
+                                          repo=_repo()):
+            count += 1
+        return count
+
+    started = time.perf_counter()
+    evaluated = asyncio.run(evaluate_all())
+    seconds = time.perf_counter() - started
+    return {"items": evaluated, "unit": "PRs", "latency_of": "LLM call", "seconds": seconds, "samples": samples}
+
+
+STAGE_FUNCTIONS = {"fetch": bench_fetch, "load": bench_load, "embed": bench_embed, "retrieve": bench_retrieve,
+                   "evaluate": bench_evaluate}
+
+
+def _stage_worker(stage, options, queue):
+    if not options["verbose"]:
+        sys.stdout = sys.stderr = open(os.devnull, "w")  # Pipeline progress and deprecation warnings
+    try:
+        result = STAGE_FUNCTIONS[stage](options)
+        samples = result.pop("samples")
+        seconds = result["seconds"]
+        result.update(
+            throughput=round(result["items"] / seconds, 2) if seconds else 0.0,
+            p50_ms=round(percentile(samples, 50) * 1000, 2),
+            p99_ms=round(percentile(samples, 99) * 1000, 2),
+            samples=len(samples),
+            seconds=round(seconds, 3),
+            peak_rss_mb=round(peak_rss_mb(), 1),
+        )
+    except Exception as e:
+        result = {"error": f"{type(e).__name__}: {e}"}
+    queue.put(result)
+
+
+def run_stage(stage, options, services):
+    """Runs one stage in a fresh process; adds the fake-service requests it caused."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    before = dict(services.requests)
+    process = context.Process(target=_stage_worker, args=(stage, options, queue))
+    process.start()
+    try:
+        result = queue.get(timeout=options["timeout"])
+    except Exception:
+        process.kill()
+        result = {"error": f"timed out after {options['timeout']}s"}
+    process.join()
+    result["service_requests"] = {kind: count - before.get(kind, 0) for kind, count in services.requests.items()
+                                  if count != before.get(kind, 0)}
+    return result
+
+
+def tiktoken_available():
+    """Whether the `cl100k_base` BPE file can be loaded (the OpenAI embedding client needs it)."""
+    try:
+        import tiktoken
+        tiktoken.get_encoding("cl100k_base")
+        return True
+    except Exception:
+        return False
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of `results` against `baseline`, as printable lines (empty when none)."""
+    regressions = []
+    for stage, result in results["stages"].items():
+        if "error" in result:
+            regressions.append(f"{stage}: failed ({result['error']})")
+            continue
+        base = baseline.get("stages", {}).get(stage)
+        if not base or "error" in base:
+            continue
+        for metric, (higher_is_better, noise) in METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None or abs(new - old) < noise:
+                continue
+            change = (new - old) / old
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                regressions.append(f"{stage}: {metric} {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def print_report(results, baseline=None):
+    print(f"{'Stage':<10}{'Items':>8}  {'Unit':<8}{'Seconds':>9}{'Throughput/s':>14}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'Peak RSS MB':>13}  Latency of")
+    for stage, result in results["stages"].items():
+        if "error" in result:
+            print(f"{stage:<10}ERROR {result['error']}")
+            continue
+        line = (f"{stage:<10}{result['items']:>8}  {result['unit']:<8}{result['seconds']:>9.2f}"
+                f"{result['throughput']:>14.1f}{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+                f"{result['peak_rss_mb']:>13.1f}  {result['latency_of']}")
+        base = (baseline or {}).get("stages", {}).get(stage)
+        if base and "error" not in base and base.get("throughput"):
+            line += f"  (throughput {result['throughput'] / base['throughput'] - 1:+.0%} vs baseline)"
+        print(line)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run_benchmarks", description=__doc__.split("\n\n")[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    repo = parser.add_argument_group("synthetic repo")
+    repo.add_argument("--closed", type=int, default=200, help="Closed PRs (default 200)")
+    repo.add_argument("--open", type=int, default=20, help="Open PRs (default 20)")
+    repo.add_argument("--files-per-pr", type=int, default=6, help="Average changed files per PR")
+    repo.add_argument("--comments-per-pr", type=int, default=4, help="Average comments per PR")
+    repo.add_argument("--seed", type=int, default=0)
+
+    services = parser.add_argument_group("fake services")
+    services.add_argument("--latency-ms", type=float, default=20, help="GitHub request latency (default 20)")
+    services.add_argument("--jitter-ms", type=float, default=5, help="Random extra latency, up to (default 5)")
+    services.add_argument("--embed-latency-ms", type=float, default=50, help="Embedding request latency")
+    services.add_argument("--llm-latency-ms", type=float, default=300, help="Chat completion latency")
+    services.add_argument("--rate-limit", type=int, default=5000, help="GitHub quota per token and resource")
+
+    pipeline = parser.add_argument_group("pipeline")
+    pipeline.add_argument("--backend", choices=("rest", "async", "graphql"), default="rest", help="Fetch backend")
+    pipeline.add_argument("--embeddings", choices=("openai", "hashing"), default="hashing",
+                          help="Embedding backend (default hashing, as in the baseline; openai = the fake endpoint, "
+                               "needs tiktoken's cl100k_base)")
+    pipeline.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES),
+                          help="Stages to run (each needs the ones before it)")
+
+    output = parser.add_argument_group("output")
+    output.add_argument("-o", "--output", default=RESULTS_FILE, help="Results JSON (default benchmarks/results.json)")
+    output.add_argument("--baseline", default=BASELINE_FILE, help="Baseline JSON to compare with")
+    output.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative change (default 0.25)")
+    output.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline")
+    output.add_argument("--no-baseline", action="store_true", help="Do not compare with a baseline")
+    output.add_argument("--timeout", type=int, default=1800, help="Seconds per stage")
+    output.add_argument("--keep-data", action="store_true", help="Keep the temporary data directory")
+    output.add_argument("-v", "--verbose", action="store_true", help="Show the pipeline's progress output")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    embeddings = args.embeddings
+    if embeddings == "openai" and not tiktoken_available():
+        parser.error("--embeddings openai needs tiktoken's cl100k_base, which is not available offline")
+
+    config = {"closed": args.closed, "open": args.open, "files_per_pr": args.files_per_pr,
+              "comments_per_pr": args.comments_per_pr, "seed": args.seed, "latency_ms": args.latency_ms,
+              "jitter_ms": args.jitter_ms, "embed_latency_ms": args.embed_latency_ms,
+              "llm_latency_ms": args.llm_latency_ms, "rate_limit": args.rate_limit, "backend": args.backend,
+              "embeddings": embeddings}
+    repo = SyntheticRepo(REPO_OWNER, REPO_NAME, args.closed, args.open, args.files_per_pr, args.comments_per_pr,
+                         args.seed)
+    data_dir = tempfile.mkdtemp(prefix="smartmerge-bench-")
+    options = {"backend": args.backend, "verbose": args.verbose, "timeout": args.timeout}
+
+    with FakeServices([repo], latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                      embed_latency=args.embed_latency_ms / 1000, llm_latency=args.llm_latency_ms / 1000,
+                      rate_limit=args.rate_limit) as services:
+        # Inherited by the stage processes; nothing reaches the real APIs or the real data/ directory
+        os.environ.update({
+            "SMARTMERGE_DATA_DIR": data_dir,
+            "GITHUB_API_URL": services.url,
+            "GITHUB_GRAPHQL_URL": f"{services.url}/graphql",
+            "GITHUB_TOKEN": "bench-token",
+            "GITHUB_TOKENS": "bench-token",
+            "OPENAI_API_KEY": "bench-key",
+            "OPENAI_BASE_URL": f"{services.url}/v1",
+            "OPENAI_API_BASE": f"{services.url}/v1",
+            "EMBEDDING_BACKEND": embeddings,
+            "VERDICT_CACHE": "false",
+        })
+        stages = {}
+        try:
+            for stage in STAGES:
+                if stage in args.stages:
+                    print(f"Running {stage}...")
+                    stages[stage] = run_stage(stage, options, services)
+        finally:
+            if args.keep_data:
+                print(f"Benchmark data kept in {data_dir}")
+            else:
+                shutil.rmtree(data_dir, ignore_errors=True)
+
+    results = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "config": config,
+        "stages": stages,
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not (args.update_baseline or args.no_baseline):
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+    print_report(results, baseline if baseline and baseline.get("config") == config else None)
+    print(f"Results saved in {args.output}")
+    if baseline and baseline.get("config") != config:
+        recorded = baseline.get("config", {})
+        print(f"❌ {args.baseline} was recorded with other settings:")
+        for key in sorted(set(config) | set(recorded)):
+            if config.get(key) != recorded.get(key):
+                print(f"  {key}: {recorded.get(key)} in the baseline, {config.get(key)} now")
+        print("Rerun with its settings, pass --no-baseline, or record a new one with --update-baseline")
+        return 2
+
+    if args.update_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Baseline updated: {args.baseline}")
+    regressions = compare(results, baseline or {}, args.tolerance)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("✅ No regressions" + (" against the baseline" if baseline else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
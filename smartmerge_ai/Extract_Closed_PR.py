@@ -1,125 +1,43 @@
 # Extracts key features from PRs (title, diff, comments, etc.) and generates 
-import requests
-import json
 import os
-import time
-from datetime import datetime
 from dotenv import load_dotenv
-import pytz
+
+from .github_client import (BASE_URL, check_rate_limit, fetch_file_changes, fetch_pr_comments, get_client,
+                            require_github_token)
+from .metrics import span
+from .pr_records import build_pr_info, repo_key
+from .pr_stream import PRStreamWriter
  
 # Load environment variables
 load_dotenv()
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
  
-if not GITHUB_TOKEN:
-    raise ValueError(
-        "GitHub token not found. Ensure .env file has GITHUB_TOKEN set.")
- 
-BASE_URL = "https://api.github.com"
-HEADERS = {
-    "Authorization": f"token {GITHUB_TOKEN}",
-    "Accept": "application/vnd.github.v3+json"
-}
- 
- 
-def check_rate_limit():
-    """Check GitHub API rate limits before making further requests."""
-    url = f"{BASE_URL}/rate_limit"
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200:
-        rate_limit = response.json()["rate"]
-        remaining = rate_limit["remaining"]
-        reset_time = datetime.fromtimestamp(
-            rate_limit["reset"], tz=pytz.UTC).strftime('%Y-%m-%d %H:%M:%S')
-        print(
-            f"GitHub API Rate Limit: {remaining} requests left. Resets at {reset_time}.")
-        if remaining < 10:
-            print("Nearing rate limit! Waiting for reset...")
-            time.sleep(60)  # Wait 1 minute before retrying
-    else:
-        print("Failed to fetch rate limit. Proceeding with caution.")
- 
- 
-def fetch_file_changes(pr_number, repo_owner, repo_name):
-    """Fetches all file changes in a PR, including added, modified, deleted files and their diffs."""
-    url = f"{BASE_URL}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}/files"
-    response = requests.get(url, headers=HEADERS)
- 
-    if response.status_code != 200:
-        print(
-            f"Error fetching file changes for PR #{pr_number}: {response.json()}")
-        return []
- 
-    file_changes = []
-    for file in response.json():
-        filename = file["filename"]
-        status = file["status"]  # added, modified, removed
-        patch = file.get("patch", "")  # Full patch/diff if available
- 
-        added_lines = []
-        removed_lines = []
-        patch_lines = patch.split("\n") if patch else []
- 
-        for line in patch_lines:
-            if line.startswith("+") and not line.startswith("+++"):
-                added_lines.append(line)
-            elif line.startswith("-") and not line.startswith("---"):
-                removed_lines.append(line)
- 
-        file_changes.append({
-            "Filename": filename,
-            "Status": status,
-            "Added Lines": added_lines,
-            "Removed Lines": removed_lines,
-            "Full Diff": patch_lines
-        })
- 
-    return file_changes
- 
- 
-def fetch_pr_comments(pr_number, repo_owner, repo_name):
-    """Fetches all comments on a PR and categorizes them as old or new."""
-    url = f"{BASE_URL}/repos/{repo_owner}/{repo_name}/issues/{pr_number}/comments"
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code != 200:
-        print(
-            f"Error fetching comments for PR #{pr_number}: {response.json()}")
-        return {"Old Comments": [], "New Comments": []}
- 
-    comments = response.json()
-    comments.sort(key=lambda x: x["created_at"])  # Sort by creation time
-    midpoint = len(comments) // 2
- 
-    old_comments = [{
-        "User": comment["user"]["login"],
-        "Created At": comment["created_at"],
-        "Body": comment["body"]
-    } for comment in comments[:midpoint]]
- 
-    new_comments = [{
-        "User": comment["user"]["login"],
-        "Created At": comment["created_at"],
-        "Body": comment["body"]
-    } for comment in comments[midpoint:]]
- 
-    return {"Old Comments": old_comments, "New Comments": new_comments}
- 
- 
+
 def fetch_all_closed_prs(repo_owner, repo_name):
-    """Fetches details of all closed PRs along with file changes, diffs, and comments."""
-    all_prs = []
-    page = 1
+    """
+    Fetches details of all closed PRs along with file changes, diffs, and comments.
+    Each PR is streamed to disk as it is fetched; an interrupted run resumes
+    from its checkpoint the next time it is called.
+    Returns True once every page was listed, False if the listing was cut short.
+    """
+    require_github_token()  # Checked on first use, not at import time
+    writer = PRStreamWriter("closed", repo_key(repo_owner, repo_name))
+    page = writer.resume_page
     per_page = 100  # Max allowed by GitHub API
+    if writer.checkpoint:
+        print(f"Resuming closed PR extraction from page {page} ({len(writer.written)} PRs already saved)")
  
     check_rate_limit()  # Check API rate limit before starting
  
     while True:
         url = f"{BASE_URL}/repos/{repo_owner}/{repo_name}/pulls?state=closed&per_page={per_page}&page={page}"
-        response = requests.get(url, headers=HEADERS)
+        response = get_client().get(url)
  
         if response.status_code != 200:
             print(f"Error fetching closed PRs: {response.json()}")
-            break
+            writer.close()
+            print(f"Extraction interrupted at page {page}; re-run to resume.")
+            return False
  
         data = response.json()
         if not data:
@@ -127,51 +45,32 @@ def fetch_all_closed_prs(repo_owner, repo_name):
  
         for pr in data:
             pr_number = pr["number"]
+            if writer.has(pr_number):
+                continue  # Already saved before the last interruption
             print(f"🔍 Processing Closed PR #{pr_number}")
  
-            file_changes = fetch_file_changes(pr_number, repo_owner, repo_name)
-            comments = fetch_pr_comments(pr_number, repo_owner, repo_name)
+            with span("pr.fetch", pr=pr_number, state="closed"):
+                file_changes = fetch_file_changes(pr_number, repo_owner, repo_name)
+                comments = fetch_pr_comments(pr_number, repo_owner, repo_name)
  
-            pr_info = {
-                "PR Number": pr_number,
-                "Title": pr["title"],
-                "State": pr["state"],  # Should always be "closed"
-                "Author": pr["user"]["login"],
-                "Created Date": pr["created_at"],
-                "Merged Date": pr.get("merged_at", "Not merged"),
-                "Base Branch": pr["base"]["ref"],
-                "Head Branch": pr["head"]["ref"],
-                "Merge Conflict": not pr.get("mergeable", True),
-                "File Changes": file_changes,
-                "Old Comments": comments["Old Comments"],
-                "New Comments": comments["New Comments"]
-            }
+            pr_info = build_pr_info(pr, file_changes, comments)
  
-            all_prs.append(pr_info)
+            writer.write(pr_info, page)
  
+        writer.complete_page(page)
         print(f"Fetched {len(data)} PRs from page {page}")
         page += 1  # Go to next page
  
-    if not all_prs:
+    if not writer.written:
+        writer.discard()
         print("No closed PRs found.")
-        return
+        return True
  
-    #os.makedirs("SmartMergeAI/data/raw/closed_pr", exist_ok=True)
-    BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    CLOSED_PR_PATH = os.path.join(BASE_DIR, "data", "raw", "closed_pr")
-
-    file_path = os.path.join(CLOSED_PR_PATH, f"{repo_name}_all_closed_prs.json")
-
-
-    if not os.path.exists(CLOSED_PR_PATH):
-        os.makedirs(CLOSED_PR_PATH)
-
-        
-    with open(file_path, "w", encoding="utf-8") as file:
-        json.dump(all_prs, file, indent=4)
+    file_path = writer.finalize()
  
     print(f"Fetched all closed PRs")
     print(f"PR details saved in {file_path}")
+    return True
 
 
  
@@ -5,19 +5,38 @@ SmartMergeAI Package
 Version: 0.1.0
 """
 
-from .Extract_Open_PR import fetch_all_open_prs
-from .Extract_Closed_PR import fetch_all_closed_prs
-from .vector_store import load_pr_data
-from .vector_store import initialize_and_persist_chromadb
-from .vector_store import format_closed_prs
-from .vector_store import initialize_retriever
-from .vector_store import truncate_text
-from .ragLLM import evaluate_open_pr
+import importlib
 
+# Public name -> submodule defining it. Submodules are imported on first
+# attribute access, so `import smartmerge_ai` stays cheap and needs no credentials.
+_LAZY_IMPORTS = {
+    "fetch_all_open_prs": "Extract_Open_PR",
+    "fetch_all_closed_prs": "Extract_Closed_PR",
+    "load_pr_data": "vector_store",
+    "initialize_and_persist_chromadb": "vector_store",
+    "iter_stored_prs": "vector_store",
+    "format_closed_prs": "vector_store",
+    "initialize_retriever": "vector_store",
+    "truncate_text": "vector_store",
+    "evaluate_open_pr": "ragLLM",
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_LAZY_IMPORTS[name]}", __name__), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
 
 
 __all__ = ["fetch_all_open_prs", "fetch_all_closed_prs","load_pr_data","format_closed_prs","initialize_retriever"
-           , "evaluate_open_pr","truncate_text","initialize_and_persist_chromadb"]
+           , "evaluate_open_pr","truncate_text","initialize_and_persist_chromadb",
+           "iter_stored_prs"]
 
 
 __version__ = "0.1.0"
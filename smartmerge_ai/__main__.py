@@ -0,0 +1,6 @@
+# ▶️ `python -m smartmerge_ai <fetch|embed|evaluate|all> ...`: the batch CLI
+import sys
+
+from .cli import main
+
+sys.exit(main())
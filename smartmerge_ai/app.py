@@ -1,10 +1,35 @@
-from fastapi import FastAPI, HTTPException
-from smartmerge_ai.Extract_Open_PR import fetch_all_open_prs
-from smartmerge_ai.Extract_Closed_PR import fetch_all_closed_prs
-from smartmerge_ai.vector_store import load_pr_data
-from smartmerge_ai.ragLLM import evaluate_open_pr
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Optional
 
-app = FastAPI()
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from smartmerge_ai.jobs import JobManager
+from smartmerge_ai.metrics import metrics
+from smartmerge_ai.repo_registry import RepoRegistry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Stores and clients stay open across requests, per owner/repo
+    app.state.registry = RepoRegistry()
+    app.state.jobs = JobManager(app.state.registry)
+    evictions = asyncio.create_task(app.state.registry.evict_idle())
+    yield
+    evictions.cancel()
+    await app.state.jobs.shutdown()
+    app.state.registry.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def get_job(request: Request, job_id: str):
+    job = request.app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
 
 
 @app.get("/")
@@ -12,28 +37,66 @@ def home():
     return {"message": "Welcome to SmartMergeAI API"}
 
 
+@app.get("/metrics")
+def export_metrics(format: Optional[str] = None, spans: int = 100):
+    """
+    Prometheus text: GitHub requests / bytes / rate-limit waits, embedding and
+    LLM calls & tokens, cache hits and latency histograms of every span
+    (stages, single PRs). `?format=json` returns the run summary and the last `spans` spans instead.
+    """
+    if format == "json":
+        return {**metrics.summary(), "recent_spans": list(metrics.spans)[-spans:] if spans > 0 else []}
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/jobs/{repo_owner}/{repo_name}", status_code=202)
+async def start_job(request: Request, repo_owner: str, repo_name: str, mode: Optional[str] = None,
+                    backend: Optional[str] = None):
+    """
+    Starts fetching & evaluating a repo's PRs in the background and returns the job ID.
+    `mode` is `full` or `incremental` (defaults to PR_SYNC_MODE) and
+    `backend` is `rest`, `async` or `graphql` (defaults to PR_FETCH_BACKEND).
+    While a job for the repo with the same mode and backend is queued or running, that job is
+    returned instead (`coalesced`); one with other settings queues behind it.
+    """
+    job, coalesced = request.app.state.jobs.submit(repo_owner, repo_name, mode, backend)
+    return {"job_id": job.id, "status": job.status, "coalesced": coalesced}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(request: Request, job_id: str):
+    """Status, current stage, per-stage progress and the predictions so far."""
+    return get_job(request, job_id).to_dict()
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(request: Request, job_id: str):
+    """
+    Server-Sent Events: `stage` as each stage starts, `prediction` as each
+    PR is decided, then `done` or `failed`. Past events are replayed first.
+    """
+    job = get_job(request, job_id)
+
+    async def stream():
+        async for event, data in job.follow():
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @app.get("/process_prs/{repo_owner}/{repo_name}")
-def process_prs(repo_owner: str, repo_name: str):
-    """
-    Fetches open & closed PRs and evaluates them automatically.
-    """
-    try:
-        # Fetch PR data
-        fetch_all_closed_prs(repo_owner, repo_name)
-        fetch_all_open_prs(repo_owner, repo_name)
-
-        # Load PR data
-        closed_prs = load_pr_data(
-            f"data/raw/closed_pr/{repo_name}_all_closed_prs.json")
-        open_prs = load_pr_data(
-            f"data/raw/open_pr/{repo_name}_all_open_prs.json")
-
-        # Evaluate PRs using RAG model
-        merge_predictions = evaluate_open_pr(closed_prs, open_prs)
-
-        return {
-            "message": "PRs processed successfully",
-            "merge_predictions": merge_predictions
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+async def process_prs(request: Request, repo_owner: str, repo_name: str, mode: Optional[str] = None,
+                      backend: Optional[str] = None):
+    """
+    Fetches open & closed PRs and evaluates them, answering once done.
+    Runs as a job (see `POST /jobs/...`) without holding a worker; prefer the job API for large repos.
+    """
+    job, _ = request.app.state.jobs.submit(repo_owner, repo_name, mode, backend)
+    await job.wait()
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    return {
+        "message": "PRs processed successfully",
+        "merge_predictions": job.results
+    }
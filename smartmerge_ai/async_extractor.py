@@ -0,0 +1,172 @@
+# ⚡ Concurrent PR extraction: per-PR files & comments fetched in parallel over one pooled client
+import asyncio
+import time
+
+import httpx
+
+from .config import GITHUB_API_URL, GITHUB_CONCURRENCY, GITHUB_MAX_RETRIES, GITHUB_TIMEOUT
+from .github_client import ResponseCache, github_headers, record_response
+from .metrics import inc, span
+from .rate_limiter import backoff_delay, get_scheduler
+from .pr_records import build_pr_info, parse_file_changes, repo_key, save_pr_data, split_comments
+
+PER_PAGE = 100  # Max allowed by GitHub API
+
+
+async def _send(client, semaphore, request):
+    """
+    Sends one request on the token the scheduler picks, retrying 5xx and
+    rate-limit responses as well as transport errors (timeouts included).
+    """
+    scheduler = get_scheduler()
+    for attempt in range(GITHUB_MAX_RETRIES + 1):
+        token = await scheduler.acquire_async()
+        request.headers.update(github_headers(token))
+        try:
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.send(request)
+        except httpx.TransportError as error:
+            inc("github_requests_total", resource="core", status=type(error).__name__)
+            if attempt == GITHUB_MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+        else:
+            record_response(response.status_code, len(response.content), time.perf_counter() - started)
+            scheduler.update(token, response.headers)
+
+            delay = scheduler.retry_delay(
+                token, response.status_code, response.headers, response.text, attempt)
+            if delay is None or attempt == GITHUB_MAX_RETRIES:
+                return response
+        inc("github_retries_total", resource="core")
+        await asyncio.sleep(delay)
+
+
+async def _get(client, semaphore, url, params=None):
+    """GETs one page while holding a concurrency slot, revalidating against the shared response cache."""
+    cache = client.response_cache
+    request = client.build_request("GET", url, params=params)
+    entry = cache.lookup(str(request.url))
+    request.headers.update(ResponseCache.conditional_headers(entry))
+
+    response = await _send(client, semaphore, request)
+    from_cache = response.status_code == 304 and entry is not None
+    inc("cache_requests_total", cache="github", result="hit" if from_cache else "miss")
+
+    if from_cache:
+        headers = {"Link": entry["link"]} if entry.get("link") else {}
+        return httpx.Response(200, json=entry["body"], headers=headers, request=request)
+    if response.status_code == 200:
+        cache.store(str(request.url), response.headers, response.json())
+    return response
+
+
+async def _get_all_pages(client, semaphore, url):
+    """GETs every page of a list endpoint by following the `Link: rel=next` header."""
+    items = []
+    params = {"per_page": PER_PAGE}
+    while url:
+        response = await _get(client, semaphore, url, params)
+        if response.status_code != 200:
+            return None, response
+        items.extend(response.json())
+        url = response.links.get("next", {}).get("url")
+        params = None  # The next link already carries the query string
+    return items, None
+
+
+async def fetch_file_changes_async(client, semaphore, pr_number, repo_owner, repo_name):
+    """Async counterpart of `fetch_file_changes`, following pagination."""
+    url = f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}/files"
+    files, error = await _get_all_pages(client, semaphore, url)
+    if error is not None:
+        print(f"Error fetching file changes for PR #{pr_number}: {error.text}")
+        return []
+    return parse_file_changes(files)
+
+
+async def fetch_pr_comments_async(client, semaphore, pr_number, repo_owner, repo_name):
+    """Async counterpart of `fetch_pr_comments`, following pagination."""
+    url = f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/issues/{pr_number}/comments"
+    comments, error = await _get_all_pages(client, semaphore, url)
+    if error is not None:
+        print(f"Error fetching comments for PR #{pr_number}: {error.text}")
+        return {"Old Comments": [], "New Comments": []}
+    return split_comments(comments)
+
+
+async def _fetch_pr_info(client, semaphore, pr, repo_owner, repo_name):
+    with span("pr.fetch", pr=pr["number"], state=pr["state"]):
+        file_changes, comments = await asyncio.gather(
+            fetch_file_changes_async(client, semaphore, pr["number"], repo_owner, repo_name),
+            fetch_pr_comments_async(client, semaphore, pr["number"], repo_owner, repo_name),
+        )
+        return build_pr_info(pr, file_changes, comments)
+
+
+async def fetch_prs_async(repo_owner, repo_name, state, concurrency=None):
+    """
+    Fetches every PR in `state` with its file changes and comments.
+    List pages are walked in order while the per-PR requests of every page
+    already seen run concurrently, capped at `concurrency` in-flight requests.
+    Returns `(prs, complete)`; `complete` is False (and `prs` empty) when a list page failed.
+    """
+    concurrency = concurrency or GITHUB_CONCURRENCY
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    tasks = []
+    complete = True
+
+    async with httpx.AsyncClient(headers=github_headers(), limits=limits, timeout=GITHUB_TIMEOUT) as client:
+        client.response_cache = ResponseCache()
+        url = f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/pulls"
+        page = 1
+        while True:
+            params = {"state": state, "per_page": PER_PAGE, "page": page}
+            response = await _get(client, semaphore, url, params)
+
+            if response.status_code != 200:
+                print(f"Error fetching {state} PRs: {response.text}")
+                complete = False
+                break
+
+            data = response.json()
+            if not data:
+                break  # No more PRs to fetch
+
+            for pr in data:
+                tasks.append(asyncio.create_task(
+                    _fetch_pr_info(client, semaphore, pr, repo_owner, repo_name)))
+
+            print(f"Fetched {len(data)} PRs from page {page}")
+            if len(data) < PER_PAGE:
+                break
+            page += 1
+
+        if not complete:  # The PRs seen so far are no full listing: drop them
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            return [], False
+        return list(await asyncio.gather(*tasks)), True
+
+
+def fetch_all_prs_concurrently(repo_owner, repo_name, state, concurrency=None):
+    """
+    Sync entry point: fetches all `open` or `closed` PRs concurrently and saves them like the REST extractors.
+    Returns True once every page was listed; a cut-short listing keeps the previous file.
+    """
+    all_prs, complete = asyncio.run(fetch_prs_async(repo_owner, repo_name, state, concurrency))
+
+    if not complete:
+        print(f"Listing of {state} PRs was cut short; keeping the previous data.")
+        return False
+    if not all_prs:
+        print(f"No {state} PRs found.")
+        return True
+
+    file_path = save_pr_data(all_prs, state, repo_key(repo_owner, repo_name))
+    print(f"Fetched all {state} PRs")
+    print(f"PR details saved in {file_path}")
+    return True
@@ -0,0 +1,27 @@
+# 🟣 Chroma vector store that also takes precomputed vectors (same `upsert_vectors` as MemmapIndex)
+import chromadb
+from langchain_community.vectorstores import Chroma
+
+
+class ChromaStore(Chroma):
+    """Chroma built on its own chromadb client, keeping the public collection handle for direct upserts."""
+
+    def __init__(self, collection_name="langchain", embedding_function=None, persist_directory=None,
+                 client=None, collection_metadata=None, **kwargs):
+        self._owns_client = client is None
+        if client is None:
+            client = chromadb.PersistentClient(path=persist_directory) if persist_directory else chromadb.EphemeralClient()
+        super().__init__(collection_name=collection_name, embedding_function=embedding_function,
+                         persist_directory=persist_directory, client=client,
+                         collection_metadata=collection_metadata, **kwargs)
+        self.collection = client.get_or_create_collection(
+            name=collection_name, embedding_function=None, metadata=collection_metadata)
+
+    def upsert_vectors(self, ids, embeddings, documents, metadatas=None):
+        """Upserts chunks with their precomputed vectors (no embedding pass)."""
+        self.collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def close(self):
+        """Releases the chromadb client this store opened (the system stops with the last client on its path)."""
+        if self._owns_client:
+            self._client.close()
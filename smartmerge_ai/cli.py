@@ -0,0 +1,298 @@
+# 🧰 Non-interactive batch CLI: fetch / embed / evaluate / all over many repos in parallel, JSON Lines output
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from textwrap import fill
+
+from .config import CLI_WORKERS, EXPERIMENT_LOG, HEURISTIC_TRIAGE
+from .metrics import metrics, span
+from .pr_records import pr_data_path, repo_key
+
+STAGES = ("fetch", "embed", "evaluate")
+
+
+# Stages of one repo. Heavy modules are imported inside, so `--help` and argument errors stay instant.
+
+def close_all(*resources):
+    """Closes the stats indexes and vector stores a stage opened (skipping None)."""
+    for resource in resources:
+        close = getattr(resource, "close", None)
+        if close:
+            close()
+
+
+def fetch_repo(repo_owner, repo_name, mode=None, backend=None):
+    """Refreshes the repo's raw PR files (and dataset / stats index); returns the stored PR counts."""
+    from .pr_dataset import iter_raw_prs
+    from .pr_sync import fetch_repo_prs
+
+    repo = repo_key(repo_owner, repo_name)
+    with span("stage.fetch", repo=repo):
+        fetch_repo_prs(repo_owner, repo_name, mode, backend)
+    return {state: sum(1 for _ in iter_raw_prs(state, repo)) for state in ("closed", "open")}
+
+
+def embed_repo(repo_owner, repo_name):
+    """Syncs the repo's closed PRs into its vector store and returns it (open PRs are read from disk)."""
+    from .vector_store import persist_closed_prs
+
+    repo = repo_key(repo_owner, repo_name)
+    with span("stage.embed", repo=repo):
+        return persist_closed_prs(pr_data_path("closed", repo), repo=repo)
+
+
+def evaluate_repo(repo_owner, repo_name, closed_db=None, concurrency=None, on_result=None):
+    """
+    Predicts every open PR of the repo: clear-cut ones with the heuristic
+    scorer, the rest with the LLM against the most similar closed PRs.
+    Without `closed_db`, the persisted closed-PR store of the repo (see `embed`)
+    is opened, and closed again with the stats index before returning.
+    Returns the predictions keyed by PR number.
+    """
+    from .vector_store import embeddings_path, iter_pr_data, open_pr_store
+
+    repo = repo_key(repo_owner, repo_name)
+    opened = closed_db is None
+    if opened:
+        if not os.path.isdir(embeddings_path("closed", repo)):
+            raise FileNotFoundError(f"No closed-PR vector store for {repo}; run the `embed` stage first")
+        closed_db = open_pr_store(embeddings_path("closed", repo))
+
+    from .merge_logic import triage_open_prs
+    from .ragLLM import evaluate_open_pr
+    from .stats_index import StatsIndex
+
+    stats = StatsIndex(repo)  # Kept up to date by fetch_repo_prs
+    try:
+        # Settle clear-cut PRs with the heuristic scorer; only the uncertain ones go to the LLM
+        merge_predictions = {}
+        if HEURISTIC_TRIAGE:
+            with span("stage.triage", repo=repo):
+                merge_predictions, _ = triage_open_prs(iter_pr_data(pr_data_path("open", repo)), stats)
+            for pr_number, prediction in merge_predictions.items():
+                if on_result:
+                    on_result(pr_number, prediction)
+
+        # Open PR dicts, streamed from disk, so prompts get the compact diff summary and merge history
+        open_prs = (pr for pr in iter_pr_data(pr_data_path("open", repo))
+                    if pr.get("PR Number") not in merge_predictions)
+        with span("stage.evaluate", repo=repo):
+            merge_predictions.update(evaluate_open_pr(closed_db, open_prs, concurrency, on_result=on_result,
+                                                      stats=stats, repo=repo))
+        return merge_predictions
+    finally:
+        # Long batch runs would otherwise hold every repo's SQLite handles until they end
+        close_all(stats, closed_db if opened else None)
+
+
+def run_repo(repo, stages, options):
+    """
+    Runs `stages` for one `owner/repo` (in a pool worker) and returns its
+    JSON Lines records: one per stage, plus one per prediction.
+    """
+    repo_owner, repo_name = repo.split("/", 1)
+    records = []
+    for stage in stages:
+        started = time.perf_counter()
+        record = {"type": "stage", "repo": repo, "stage": stage, "status": "ok"}
+        try:
+            if stage == "fetch":
+                record["prs"] = fetch_repo(repo_owner, repo_name, options.get("mode"), options.get("backend"))
+            elif stage == "embed":
+                closed_db = embed_repo(repo_owner, repo_name)
+                try:
+                    record["chunks"] = {"closed": len(closed_db.get(include=[])["ids"])}
+                finally:
+                    close_all(closed_db)
+            else:
+                predictions = evaluate_repo(repo_owner, repo_name, concurrency=options.get("llm_concurrency"))
+                records.extend({"type": "prediction", "repo": repo, "pr_number": pr_number, **prediction}
+                               for pr_number, prediction in predictions.items())
+                record["predictions"] = len(predictions)
+        except Exception as e:
+            record.update(status="error", error=f"{type(e).__name__}: {e}")
+        record["seconds"] = round(time.perf_counter() - started, 3)
+        records.append(record)
+        if record["status"] == "error":
+            break  # Later stages need this one's output
+    return records
+
+
+def read_repo_list(path):
+    """`owner/repo` per line; blank lines and `#` comments are skipped."""
+    with open(path, "r", encoding="utf-8") as file:
+        return [line.split("#", 1)[0].strip() for line in file if line.split("#", 1)[0].strip()]
+
+
+def _quiet_worker():
+    sys.stdout = sys.stderr  # Process workers: keep library prints off the JSON Lines stream
+
+
+def _run_repo_in_process(repo, stages, options):
+    """Process-pool entry: the repo's records plus the metrics it recorded, for the parent to merge."""
+    metrics.reset()
+    return run_repo(repo, stages, options), metrics.snapshot()
+
+
+def run_batch(repos, stages, options, workers=None, pool="thread", emit=None):
+    """
+    Runs `stages` over all `repos`, up to `workers` repos at once (each repo
+    keeps its own GitHub / embedding / LLM concurrency limits). `emit(record)`
+    receives every JSON Lines record as each repo finishes. Returns all records.
+    """
+    workers = max(1, min(workers or CLI_WORKERS, len(repos)))
+    in_processes = pool == "process"
+    executor_class = ProcessPoolExecutor if in_processes else ThreadPoolExecutor
+    extra = {"initializer": _quiet_worker} if in_processes else {}
+    records = []
+    with executor_class(max_workers=workers, **extra) as executor:
+        futures = [executor.submit(_run_repo_in_process if in_processes else run_repo, repo, stages, options)
+                   for repo in repos]
+        for future in as_completed(futures):
+            repo_records = future.result()
+            if in_processes:
+                repo_records, snapshot = repo_records
+                metrics.merge(snapshot)
+            for record in repo_records:
+                records.append(record)
+                if emit:
+                    emit(record)
+    return records
+
+
+def print_summary(records, console):
+    """The `rich` tables: one row per repo & stage, then the predictions."""
+    from rich.table import Table
+
+    stages = Table(title="🔹 Repos", show_lines=False)
+    for column in ("Repo", "Stage", "Status", "Seconds", "Details"):
+        stages.add_column(column)
+    for record in records:
+        if record["type"] == "stage":
+            details = record.get("error") or json.dumps({key: value for key, value in record.items()
+                                                         if key in ("prs", "chunks", "predictions")})
+            status = "[green]ok[/green]" if record["status"] == "ok" else "[red]error[/red]"
+            stages.add_row(record["repo"], record["stage"], status, f"{record['seconds']:.1f}", details)
+    console.print(stages)
+
+    predictions = [record for record in records if record["type"] == "prediction"]
+    if predictions:
+        table = Table(title="🔹 PR Merge Predictions", show_lines=True)
+        table.add_column("Repo", style="magenta")
+        table.add_column("PR #", justify="center", style="cyan", no_wrap=True)
+        table.add_column("Merge %", justify="center", style="green", no_wrap=True)
+        table.add_column("Recommendation", justify="left", style="yellow")
+        for record in predictions:
+            table.add_row(record["repo"], str(record["pr_number"]), str(record.get("merge_percentage", "N/A")),
+                          fill(record.get("response", "No response available"), width=60))
+        console.print(table)
+
+
+def print_timing_summary(summary, console):
+    """Where the run's wall time and spend went: span timings, then GitHub / embedding / LLM totals."""
+    from rich.table import Table
+
+    from .utils import format_bytes, format_rate, format_seconds
+
+    table = Table(title="⏱️ Timing", caption="pr.* spans overlap when PRs run concurrently")
+    for column in ("Span", "Count", "Total", "Mean", "p50", "p99", "Max", "Errors"):
+        table.add_column(column, justify="left" if column == "Span" else "right")
+    for name, stats in summary["spans"].items():
+        table.add_row(name, str(stats["count"]), *(format_seconds(stats[key])
+                                                   for key in ("total", "mean", "p50", "p99", "max")),
+                      str(stats["errors"] or ""))
+    console.print(table)
+
+    github, embedding, llm = summary["github"], summary["embedding"], summary["llm"]
+    console.print(f"GitHub: {github['requests']} requests, {format_bytes(github['bytes'])}, "
+                  f"cache hit rate {format_rate(github['cache_hit_rate'])}, {github['retries']} retries, "
+                  f"{format_seconds(github['rate_limit_wait_seconds'])} rate-limit wait")
+    console.print(f"Embeddings: {embedding['requests']} calls, {embedding['tokens']} tokens, "
+                  f"cache hit rate {format_rate(embedding['cache_hit_rate'])}")
+    console.print(f"LLM: {llm['requests']} calls, {llm['prompt_tokens']} prompt + {llm['completion_tokens']} "
+                  f"completion tokens, verdict cache hit rate {format_rate(llm['verdict_cache_hit_rate'])}")
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("repos", nargs="*", metavar="OWNER/REPO", help="Repos to process")
+    common.add_argument("-r", "--repo-list", help="File with one OWNER/REPO per line (# comments allowed)")
+    common.add_argument("-w", "--workers", type=int, default=CLI_WORKERS,
+                        help=f"Repos processed at once (default {CLI_WORKERS})")
+    common.add_argument("--pool", choices=("thread", "process"), default="thread",
+                        help="Run repos in threads (shared GitHub rate limiter) or processes")
+    common.add_argument("-o", "--output", default="-", help="JSON Lines output file (default: stdout)")
+    common.add_argument("--no-table", action="store_true", help="Skip the rich summary and timing tables on stderr")
+    common.add_argument("--log-run", action="store_true", default=EXPERIMENT_LOG,
+                        help="Append this run's timings to the experiment log (default EXPERIMENT_LOG)")
+
+    fetch = argparse.ArgumentParser(add_help=False)
+    fetch.add_argument("--mode", choices=("full", "incremental"), help="Sync mode (default PR_SYNC_MODE)")
+    fetch.add_argument("--backend", choices=("rest", "async", "graphql"),
+                       help="Fetch backend (default PR_FETCH_BACKEND)")
+
+    evaluate = argparse.ArgumentParser(add_help=False)
+    evaluate.add_argument("--llm-concurrency", type=int, help="LLM calls in flight per repo (default LLM_CONCURRENCY)")
+
+    parser = argparse.ArgumentParser(prog="smartmerge", description="Batch PR merge predictions over many repos.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("fetch", parents=[common, fetch], help="Fetch / sync PR data")
+    commands.add_parser("embed", parents=[common], help="Embed closed PRs into the vector store")
+    commands.add_parser("evaluate", parents=[common, evaluate], help="Predict merges of open PRs")
+    commands.add_parser("all", parents=[common, fetch, evaluate], help="fetch, embed, then evaluate")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    repos = list(args.repos)
+    if args.repo_list:
+        repos += read_repo_list(args.repo_list)
+    repos = list(dict.fromkeys(repos))  # A repo twice would race on its own files
+    invalid = [repo for repo in repos if repo.count("/") != 1 or not all(repo.split("/"))]
+    if invalid or not repos:
+        parser.error(f"expected OWNER/REPO, got {invalid}" if invalid else "no repos given")
+
+    from rich.console import Console
+    console = Console(stderr=True)
+    stages = STAGES if args.command == "all" else (args.command,)
+    options = {key: getattr(args, key, None) for key in ("mode", "backend", "llm_concurrency")}
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    def emit(record):
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+
+    started = time.perf_counter()
+    try:
+        # Library progress output goes to stderr so stdout stays machine-readable
+        with redirect_stdout(sys.stderr):
+            records = run_batch(repos, stages, options, args.workers, args.pool, emit)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    failed = sorted({record["repo"] for record in records if record.get("status") == "error"})
+    summary = metrics.summary()
+    if not args.no_table:
+        print_summary(records, console)
+        print_timing_summary(summary, console)
+    if args.log_run:
+        from .ml_flowtracking import log_run
+        params = {"command": args.command, "repos": repos, "workers": args.workers, "pool": args.pool, **options}
+        run_id = log_run(f"cli.{args.command}", params, summary, list(metrics.spans))
+        console.print(f"Run {run_id} added to the experiment log")
+    console.print(f"{len(repos) - len(failed)} of {len(repos)} repos done in {time.perf_counter() - started:.1f}s"
+                  + (f"; failed: {', '.join(failed)}" if failed else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
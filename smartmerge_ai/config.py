@@ -6,5 +6,69 @@ load_dotenv()
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-#MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI")
+MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI")  # Experiment runs also go to MLflow when set (and installed)
 # Add any other configuration constants
+
+# Root of raw PR files, datasets, caches and vector stores (defaults to data/ in the repo)
+DATA_DIR = os.getenv("SMARTMERGE_DATA_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+# GitHub extraction
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+# Comma-separated pool of tokens to spread load across (falls back to GITHUB_TOKEN)
+GITHUB_TOKENS = [t.strip() for t in os.getenv("GITHUB_TOKENS", "").split(",") if t.strip()] or [GITHUB_TOKEN]
+GITHUB_MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", "5"))  # Retries on 5xx / rate-limit responses
+GITHUB_PACE_BELOW = float(os.getenv("GITHUB_PACE_BELOW", "0.2"))  # Start spreading quota until reset below this fraction left
+GITHUB_CONCURRENCY = int(os.getenv("GITHUB_CONCURRENCY", "16"))  # Max in-flight GitHub requests
+GITHUB_TIMEOUT = float(os.getenv("GITHUB_TIMEOUT", "30"))  # Seconds a GitHub request may stall before it is retried
+GITHUB_GRAPHQL_URL = os.getenv("GITHUB_GRAPHQL_URL", f"{GITHUB_API_URL}/graphql")
+GITHUB_CACHE_DIR = os.getenv("GITHUB_CACHE_DIR")  # Defaults to data/cache/github
+PR_SYNC_MODE = os.getenv("PR_SYNC_MODE", "full")  # "full" re-downloads everything, "incremental" uses updated_at watermarks
+PR_FETCH_BACKEND = os.getenv("PR_FETCH_BACKEND", "rest")  # "rest", "async" or "graphql"
+GRAPHQL_PAGE_SIZE = int(os.getenv("GRAPHQL_PAGE_SIZE", "25"))  # PRs per GraphQL query
+GRAPHQL_PATCHES = os.getenv("GRAPHQL_PATCHES", "false").lower() == "true"  # GraphQL has no patch text; fetch it over REST
+PR_DATASET_BACKEND = os.getenv("PR_DATASET_BACKEND", "json")  # "json" files only, or also an indexed "sqlite" dataset
+COMPACT_DIFFS = os.getenv("COMPACT_DIFFS", "true").lower() == "true"  # Store one patch per file instead of Added/Removed/Full Diff lists
+
+# Embedding pipeline
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "100000"))  # Token budget per embedding request
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "2048"))  # Max inputs per embedding request (OpenAI limit)
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "8"))  # Embedding requests in flight
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))  # Retries per failed batch
+
+# LLM evaluation
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4")
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))  # Open PRs evaluated in parallel
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))  # Retries per PR on rate limits / timeouts / 5xx
+VERDICT_CACHE = os.getenv("VERDICT_CACHE", "true").lower() == "true"  # Reuse verdicts of unchanged PRs across runs
+VERDICT_CACHE_TTL = int(os.getenv("VERDICT_CACHE_TTL", str(7 * 24 * 3600)))  # Seconds before a verdict is re-asked
+VERDICT_CACHE_MAX_ENTRIES = int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", "50000"))  # Least recently used beyond this are evicted
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))  # Prompt tokens per open PR (PR summary + retrieved PRs)
+CONTEXT_OPEN_PR_TOKENS = int(os.getenv("CONTEXT_OPEN_PR_TOKENS", "1000"))  # Share of the budget for the open PR's own summary
+CONTEXT_TOP_K = int(os.getenv("CONTEXT_TOP_K", "5"))  # Similar closed PRs retrieved per open PR
+
+# Embeddings
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")  # "openai", or "hashing" (local, offline)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")  # OpenAI backend model
+HASHING_EMBEDDING_DIM = int(os.getenv("HASHING_EMBEDDING_DIM", "512"))  # Vector size of the hashing backend
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma")  # "chroma", or "memmap" (exact search over a memory-mapped .npy)
+
+# Heuristic merge scoring (merge_logic): open PRs scoring outside [LOW, HIGH] skip the LLM
+HEURISTIC_TRIAGE = os.getenv("HEURISTIC_TRIAGE", "true").lower() == "true"
+MERGE_SCORE_HIGH = float(os.getenv("MERGE_SCORE_HIGH", "0.85"))  # At or above: safe to merge without asking the LLM
+MERGE_SCORE_LOW = float(os.getenv("MERGE_SCORE_LOW", "0.15"))  # At or below: blocked without asking the LLM
+
+# API jobs
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "4"))  # Repos processed at once; further jobs wait in the queue
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "100"))  # Finished jobs kept for status queries
+REPO_CACHE_SIZE = int(os.getenv("REPO_CACHE_SIZE", "32"))  # Repos whose stores stay open; least recently used beyond this are closed
+REPO_IDLE_TTL = int(os.getenv("REPO_IDLE_TTL", "3600"))  # Seconds before an unused repo's stores are closed
+
+# Batch CLI
+CLI_WORKERS = int(os.getenv("CLI_WORKERS", "8"))  # Repos processed at once by `python -m smartmerge_ai`
+
+# Instrumentation
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"  # Counters, histograms and spans (see metrics.py)
+SPAN_HISTORY = int(os.getenv("SPAN_HISTORY", "2000"))  # Finished spans kept for /metrics?format=json and the experiment log
+EXPERIMENT_LOG = os.getenv("EXPERIMENT_LOG", "false").lower() == "true"  # Append each CLI run's timings to a local log
+EXPERIMENT_LOG_FILE = os.getenv("EXPERIMENT_LOG_FILE") or os.path.join(DATA_DIR, "experiments", "runs.jsonl")
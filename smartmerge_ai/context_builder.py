@@ -0,0 +1,147 @@
+# 🧩 Builds the token-budgeted prompt context of one open PR: compact diff summary + similar closed PRs
+import os
+
+from .config import CONTEXT_OPEN_PR_TOKENS, CONTEXT_TOKEN_BUDGET, CONTEXT_TOP_K
+from .diff_model import FileChange, line_counts, patch_of
+from .embedding_pipeline import count_tokens, truncate_to_tokens
+from .metrics import span
+from .vector_store import embeddings_path, get_stored_prs, open_pr_store, truncate_text
+
+MAX_HUNKS_PER_FILE = 3
+MAX_COMMENTS = 5
+MAX_RISKY_PATHS = 3
+SIMILAR_PRS_HEADER = "Similar past closed PRs:"
+
+
+def _file_stats(fc):
+    """(additions, deletions, hunk headers) of a compact or legacy `File Changes` entry."""
+    if isinstance(fc, FileChange):
+        return fc["Additions"], fc["Deletions"], list(fc.diff.hunk_headers())
+    hunks = [line for line in patch_of(fc).split("\n") if line.startswith("@@")]
+    return (*line_counts(fc), hunks)
+
+
+def summarize_files(file_changes):
+    """A `Files (n, +a/-d):` line, then one line per file with its +/- counts and first hunk headers."""
+    lines, total_added, total_removed = [], 0, 0
+    for fc in file_changes:
+        added, removed, hunks = _file_stats(fc)
+        total_added += added
+        total_removed += removed
+        lines.append(f"- {fc.get('Filename', 'Unknown')} ({fc.get('Status', 'Unknown')}, +{added}/-{removed})")
+        lines.extend(f"    {truncate_text(hunk, 120)}" for hunk in hunks[:MAX_HUNKS_PER_FILE])
+    return [f"Files ({len(file_changes)}, +{total_added}/-{total_removed}):"] + lines
+
+
+def summarize_pr(open_pr):
+    """
+    Compact, repr-free summary of an open PR: one header line, one line per
+    file with its +/- counts and first hunk headers, and the latest comments.
+    Stored PR texts are already summaries and are returned as they are.
+    """
+    if not isinstance(open_pr, dict):
+        return open_pr
+
+    conflict = "yes" if open_pr.get("Merge Conflict") else "no"
+    lines = [f"PR #{open_pr.get('PR Number', 'N/A')}: {truncate_text(open_pr.get('Title', 'No Title'))} "
+             f"by {open_pr.get('Author', 'Unknown')}, {open_pr.get('Head Branch', '?')} -> "
+             f"{open_pr.get('Base Branch', '?')}, merge conflict: {conflict}"]
+
+    lines.extend(summarize_files(open_pr.get("File Changes", [])))
+
+    comments = open_pr.get("Old Comments", []) + open_pr.get("New Comments", [])
+    if comments:
+        lines.append("Latest comments:")
+        lines.extend(f"- {c.get('User', 'Unknown')}: {truncate_text(c.get('Body') or '', 200)}"
+                     for c in comments[-MAX_COMMENTS:])
+    return "\n".join(lines)
+
+
+def _rate_line(label, stats):
+    return (f"{label}: {stats['merged']} of {stats['prs']} closed PRs merged "
+            f"({stats['merge_rate']:.0%}), {stats['conflicts']} with conflicts")
+
+
+def summarize_history(open_pr, stats):
+    """Merge history of the open PR's author, base branch and riskiest touched paths, from a `StatsIndex`."""
+    if not isinstance(open_pr, dict):
+        return []
+    lines = []
+    author = stats.author(open_pr.get("Author", ""))
+    if author:
+        lines.append(_rate_line(f"Author {open_pr['Author']}", author))
+    branch = stats.branch(open_pr.get("Base Branch", ""))
+    if branch:
+        lines.append(_rate_line(f"Base branch {open_pr['Base Branch']}", branch))
+    paths = [(path, stats.path(path)) for path in {fc.get("Filename", "") for fc in open_pr.get("File Changes", [])}]
+    risky = sorted(((path, s) for path, s in paths if s and s["merged"] < s["prs"]),
+                   key=lambda item: (item[1]["merge_rate"], -item[1]["prs"]))
+    lines.extend(_rate_line(f"Path {path}", s) for path, s in risky[:MAX_RISKY_PATHS])
+    return lines
+
+
+def resolve_closed_store(closed_prs, repo=None):
+    """The closed-PR vector store to retrieve from: the one passed in, else the persisted one of `repo` (if any)."""
+    if hasattr(closed_prs, "similarity_search"):
+        return closed_prs
+    if os.path.isdir(embeddings_path("closed", repo)):
+        return open_pr_store(embeddings_path("closed", repo))
+    return None
+
+
+def retrieve_similar_prs(closed_db, query, k=CONTEXT_TOP_K, exclude=None, where=None):
+    """
+    Top-`k` distinct closed PRs for `query` as `[(metadata, text)]`, best first.
+    Several chunks of the same PR count once; the whole PR text is returned.
+    """
+    with span("pr.retrieve", k=k):
+        docs = closed_db.similarity_search(query, k=k * 4, filter=where)
+        numbers, loose = [], []
+        for doc in docs:
+            number = doc.metadata.get("pr_number") if doc.metadata else None
+            if number is None:  # Chunk stored without PR metadata
+                if doc.page_content not in loose:
+                    loose.append(doc.page_content)
+            elif number != exclude and number not in numbers:
+                numbers.append(number)
+        similar = get_stored_prs(closed_db, numbers[:k]) if numbers else []
+    return similar + [({}, text) for text in loose[:k - len(similar)]]
+
+
+def assemble_context(open_pr, closed_db=None, budget=CONTEXT_TOKEN_BUDGET, k=CONTEXT_TOP_K,
+                     open_pr_tokens=CONTEXT_OPEN_PR_TOKENS, stats=None):
+    """
+    Prompt context for one open PR, at most `budget` tokens: its summary (capped
+    at `open_pr_tokens`), the merge history of its author, branch and paths
+    (with a `StatsIndex` in `stats`), then the `k` most similar closed PRs,
+    each cut to an even share of what is left.
+    """
+    summary = truncate_to_tokens(summarize_pr(open_pr), open_pr_tokens)
+    parts = [f"Open PR:\n{summary}"]
+    history = summarize_history(open_pr, stats) if stats is not None else []
+    if history:
+        parts.append("History:\n" + "\n".join(history))
+    remaining = budget - count_tokens("\n\n".join(parts))
+    if remaining <= 0 and len(parts) > 1:
+        parts = parts[:1]
+        remaining = budget - count_tokens(parts[0])
+    if closed_db is None or remaining <= 0:
+        return "\n\n".join(parts)
+
+    exclude = open_pr.get("PR Number") if isinstance(open_pr, dict) else None
+    similar = retrieve_similar_prs(closed_db, summary, k, exclude=exclude)
+    if not similar:
+        return "\n\n".join(parts)
+
+    remaining -= count_tokens(SIMILAR_PRS_HEADER) + 2
+    entries = []
+    for position, (_, text) in enumerate(similar):
+        share = remaining // (len(similar) - position)
+        if share <= 0:
+            break
+        entry = truncate_to_tokens(f"[{position + 1}] {text}", share)
+        entries.append(entry)
+        remaining -= count_tokens(entry) + 1
+    if entries:
+        parts.append(SIMILAR_PRS_HEADER + "\n" + "\n".join(entries))
+    return "\n\n".join(parts)
@@ -0,0 +1,145 @@
+# ✂️ Compact diff model: one patch buffer + line/hunk indexes, legacy line lists served lazily
+from array import array
+
+ADDED, REMOVED, HUNK, CONTEXT = b"+", b"-", b"@", b" "
+
+LEGACY_KEYS = ("Added Lines", "Removed Lines", "Full Diff")
+
+
+class CompactDiff:
+    """
+    A unified-diff patch kept as a single string. The first access builds
+    a line-offset index (4 bytes per line) and a one-byte kind per line, from
+    which added / removed lines and hunks are sliced out on demand instead of
+    being stored as separate lists.
+    """
+
+    __slots__ = ("patch", "_starts", "_kinds")
+
+    def __init__(self, patch):
+        self.patch = patch or ""
+        self._starts = None
+        self._kinds = None
+
+    def _index(self):
+        if self._starts is not None:
+            return
+        patch = self.patch
+        starts = array("I")
+        kinds = bytearray()
+        if patch:
+            position = 0
+            while True:
+                starts.append(position)
+                if patch.startswith("+", position) and not patch.startswith("+++", position):
+                    kinds += ADDED
+                elif patch.startswith("-", position) and not patch.startswith("---", position):
+                    kinds += REMOVED
+                elif patch.startswith("@@", position):
+                    kinds += HUNK
+                else:
+                    kinds += CONTEXT
+                newline = patch.find("\n", position)
+                if newline == -1:
+                    break
+                position = newline + 1
+        self._starts, self._kinds = starts, kinds
+
+    def __len__(self):
+        self._index()
+        return len(self._starts)
+
+    def line(self, number):
+        self._index()
+        start = self._starts[number]
+        end = self._starts[number + 1] - 1 if number + 1 < len(self._starts) else len(self.patch)
+        return self.patch[start:end]
+
+    def _lines_of(self, kind):
+        self._index()
+        position = self._kinds.find(kind)
+        while position != -1:
+            yield self.line(position)
+            position = self._kinds.find(kind, position + 1)
+
+    def lines(self):
+        """Every patch line (the legacy `Full Diff`)."""
+        return (self.line(number) for number in range(len(self)))
+
+    def added_lines(self):
+        return self._lines_of(ADDED)
+
+    def removed_lines(self):
+        return self._lines_of(REMOVED)
+
+    def hunk_headers(self):
+        return self._lines_of(HUNK)
+
+    def stats(self):
+        self._index()
+        return {"Additions": self._kinds.count(ADDED),
+                "Deletions": self._kinds.count(REMOVED),
+                "Hunks": self._kinds.count(HUNK)}
+
+
+class FileChange(dict):
+    """
+    One `File Changes` entry stored compactly as Filename / Status / Patch plus
+    Additions / Deletions / Hunks. Reading `Added Lines`, `Removed Lines` or
+    `Full Diff` still works: they are rebuilt from the patch when asked for
+    and never serialized.
+    """
+
+    @property
+    def diff(self):
+        diff = self.__dict__.get("_diff")
+        if diff is None:
+            diff = self.__dict__["_diff"] = CompactDiff(dict.get(self, "Patch", ""))
+        return diff
+
+    def __missing__(self, key):
+        if key == "Added Lines":
+            return list(self.diff.added_lines())
+        if key == "Removed Lines":
+            return list(self.diff.removed_lines())
+        if key == "Full Diff":
+            return list(self.diff.lines())
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in LEGACY_KEYS and not dict.__contains__(self, key):
+            return self[key]
+        return dict.get(self, key, default)
+
+    def __contains__(self, key):
+        return key in LEGACY_KEYS or dict.__contains__(self, key)
+
+
+def compact_file_change(filename, status, patch):
+    patch = patch or ""
+    file_change = FileChange(Filename=filename, Status=status, Patch=patch)
+    file_change.update(file_change.diff.stats())
+    return file_change
+
+
+def patch_of(file_change):
+    """The patch text of a compact or legacy `File Changes` entry."""
+    if "Patch" in file_change:
+        return file_change["Patch"]
+    return "\n".join(file_change.get("Full Diff", []))
+
+
+def line_counts(file_change):
+    """(additions, deletions) of a compact or legacy `File Changes` entry."""
+    if "Additions" in file_change and "Deletions" in file_change:
+        return file_change["Additions"], file_change["Deletions"]
+    return len(file_change.get("Added Lines", [])), len(file_change.get("Removed Lines", []))
+
+
+def with_diff_views(pr):
+    """Wraps a loaded PR's compact file changes so legacy keys stay readable."""
+    pr["File Changes"] = [
+        FileChange(fc) if "Patch" in fc and not isinstance(fc, FileChange) else fc
+        for fc in pr.get("File Changes", [])
+    ]
+    return pr
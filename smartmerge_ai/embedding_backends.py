@@ -0,0 +1,97 @@
+# 🔌 Pluggable embedding backends: OpenAI over the network, or a local NumPy hashing vectorizer (offline, CI)
+import re
+import zlib
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .config import EMBEDDING_BACKEND, EMBEDDING_MODEL, HASHING_EMBEDDING_DIM, OPENAI_API_KEY
+from .embedding_cache import CachedEmbeddings
+
+# Identifiers are split on snake_case / camelCase too, so `parse_file_changes` and `parseFileChanges` share features
+TOKEN_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+|[^\sA-Za-z\d]")
+
+
+class _TokenHashes(dict):
+    """token -> crc32, filled on first sight (the vocabulary of a repo is small)."""
+
+    def __missing__(self, token):
+        value = self[token] = zlib.crc32(token.encode("utf-8"))
+        return value
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Stateless CPU embeddings: unigrams and bigrams of lower-cased word pieces
+    are feature-hashed (crc32, signed) into `dim` buckets, log-scaled and
+    L2-normalized. No model, no fitting, no network; the same text always gets
+    the same vector in any process.
+    """
+
+    def __init__(self, dim=HASHING_EMBEDDING_DIM):
+        self.dim = dim
+        self._hashes = _TokenHashes()
+
+    def _matrix(self, texts):
+        """One row per text: all tokens of the batch are hashed, paired and binned in a few NumPy passes."""
+        hashes, lengths = [], []
+        for text in texts:
+            tokens = TOKEN_PATTERN.findall(text)
+            if tokens:
+                hashes.extend(map(self._hashes.__getitem__, "\0".join(tokens).lower().split("\0")))
+            lengths.append(len(tokens))
+
+        unigrams = np.array(hashes, dtype=np.uint64)
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+        same_text = rows[1:] == rows[:-1]  # Bigrams never span two texts
+        bigrams = ((unigrams[:-1] * np.uint64(0x9E3779B1) + unigrams[1:]) & np.uint64(0xFFFFFFFF))[same_text]
+        features = np.concatenate([unigrams, bigrams])
+        rows = np.concatenate([rows, rows[:-1][same_text]])
+
+        signs = np.where(features & np.uint64(0x80000000), 1.0, -1.0)
+        buckets = (features % np.uint64(self.dim)).astype(np.int64)
+        counts = np.bincount(rows * self.dim + buckets, weights=signs,
+                             minlength=len(texts) * self.dim).reshape(len(texts), self.dim)
+        matrix = (np.sign(counts) * np.log1p(np.abs(counts))).astype(np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def embed_documents(self, texts):
+        return self._matrix(texts).tolist() if texts else []
+
+    def embed_query(self, text):
+        return self._matrix([text])[0].tolist()
+
+
+def _openai_backend():
+    from langchain_openai import OpenAIEmbeddings
+    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL, openai_api_key=OPENAI_API_KEY)
+    return CachedEmbeddings(embeddings, EMBEDDING_MODEL)  # Unchanged chunks never hit the API twice
+
+
+def _hashing_backend():
+    return HashingEmbeddings()
+
+
+# Backend name -> factory; register new backends here
+EMBEDDING_BACKENDS = {
+    "openai": _openai_backend,
+    "hashing": _hashing_backend,
+}
+
+_instances = {}
+
+
+def get_embedding_backend(name=None):
+    """The (shared) embeddings of backend `name`, default EMBEDDING_BACKEND."""
+    name = name or EMBEDDING_BACKEND
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {name} (expected one of {', '.join(EMBEDDING_BACKENDS)})")
+    if name not in _instances:
+        _instances[name] = EMBEDDING_BACKENDS[name]()
+    return _instances[name]
+
+
+def collection_name(name=None):
+    """Chroma collection of backend `name`: vectors of different backends never mix."""
+    return f"prs_{name or EMBEDDING_BACKEND}"
@@ -0,0 +1,132 @@
+# 🧠 Content-hash embedding cache + idempotent Chroma upserts (no re-embedding, no duplicate vectors)
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .config import DATA_DIR
+from .embedding_pipeline import count_tokens, embed_and_store
+from .metrics import inc, observe, span
+
+EMBEDDING_CACHE_FILE = os.path.join(DATA_DIR, "embeddings", "embedding_cache.sqlite")
+CHROMA_BATCH_SIZE = 1000  # Well under Chroma's max batch size
+
+
+def content_hash(text, model_name=""):
+    """Stable key of one chunk: sha256 over the model name and the chunk text."""
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+def chunk_id(text, metadata=None):
+    """
+    Deterministic Chroma ID for a chunk, so re-adding the same chunk is a no-op.
+    Metadata is part of the ID: the same text from two PRs is two chunks.
+    """
+    if metadata:
+        text = f"{text}\0{json.dumps(metadata, sort_keys=True)}"
+    return content_hash(text)[:32]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps any LangChain `Embeddings` with a persistent SQLite cache keyed by
+    `content_hash(text, model_name)`. Only texts never embedded with this model
+    before reach the underlying provider; `hits` / `misses` count both sides.
+    """
+
+    def __init__(self, embeddings, model_name, cache_file=EMBEDDING_CACHE_FILE):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        self._connection = sqlite3.connect(cache_file, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, keys):
+        """Returns `{key: vector}` for the cached subset of `keys`."""
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            for start in range(0, len(keys), 500):  # Stay under SQLite's parameter limit
+                batch = keys[start:start + 500]
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch)
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def store(self, items):
+        """Saves `(key, vector)` pairs."""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items])
+
+    def embed_documents(self, texts):
+        keys = [content_hash(text, self.model_name) for text in texts]
+        cached = self.lookup(set(keys))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        inc("cache_requests_total", len(texts) - len(missing), cache="embedding", result="hit")
+        inc("cache_requests_total", len(missing), cache="embedding", result="miss")
+
+        if missing:
+            started = time.perf_counter()
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            observe("embedding_request_seconds", time.perf_counter() - started, model=self.model_name)
+            inc("embedding_requests_total", model=self.model_name)
+            inc("embedding_tokens_total", sum(map(count_tokens, missing.values())), model=self.model_name)
+            fresh = list(zip(missing.keys(), vectors))
+            self.store(fresh)
+            cached.update(fresh)
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def sync_texts(vector_db, texts, metadatas=None):
+    """
+    Makes `vector_db` hold exactly `texts`: chunks already stored (same ID) are
+    skipped, new ones go through the batched embedding pipeline, and vectors
+    whose chunk is no longer produced (e.g. its PR disappeared) are deleted.
+    """
+    with span("embed.sync", chunks=len(texts)) as attributes:
+        new_ids, stale_ids = _sync_texts(vector_db, texts, metadatas)
+        attributes.update(new=len(new_ids), stale=len(stale_ids))
+    return new_ids, stale_ids
+
+
+def _sync_texts(vector_db, texts, metadatas):
+    metadatas = metadatas or [None] * len(texts)
+    wanted = {}
+    for text, metadata in zip(texts, metadatas):
+        wanted.setdefault(chunk_id(text, metadata), (text, metadata))
+
+    stored = set(vector_db.get(include=[])["ids"])
+    new_ids = [id_ for id_ in wanted if id_ not in stored]
+    stale_ids = [id_ for id_ in stored if id_ not in wanted]
+
+    new_ids, failed_ids = embed_and_store(
+        vector_db, vector_db.embeddings, [(id_, *wanted[id_]) for id_ in new_ids])
+    for start in range(0, len(stale_ids), CHROMA_BATCH_SIZE):
+        vector_db.delete(ids=stale_ids[start:start + CHROMA_BATCH_SIZE])
+
+    print(f" {len(new_ids)} new chunks added, {len(stale_ids)} stale removed, "
+          f"{len(wanted) - len(new_ids) - len(failed_ids)} unchanged"
+          + (f", {len(failed_ids)} left for the next run" if failed_ids else ""))
+    return new_ids, stale_ids
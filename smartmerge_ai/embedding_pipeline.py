@@ -0,0 +1,118 @@
+# 🚚 Embedding pipeline stage: token-packed batches, embedded concurrently, retried alone, stored as they finish
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .config import EMBED_BATCH_TOKENS, EMBED_CONCURRENCY, EMBED_MAX_BATCH_SIZE, EMBED_MAX_RETRIES
+from .rate_limiter import backoff_delay
+
+_encoder = None
+
+
+def _get_encoder():
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:  # tiktoken missing or its BPE file cannot be downloaded
+            _encoder = False
+    return _encoder
+
+
+def count_tokens(text):
+    """Tokens in `text` with the OpenAI `cl100k_base` encoding, or a ~4 chars/token estimate offline."""
+    encoder = _get_encoder()
+    if encoder:
+        return len(encoder.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cuts `text` to at most `max_tokens` tokens (same counting as `count_tokens`)."""
+    encoder = _get_encoder()
+    if encoder:
+        tokens = encoder.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoder.decode(tokens[:max_tokens])
+    return text[:max(max_tokens - 1, 0) * 4]
+
+
+def pack_batches(items, max_tokens=EMBED_BATCH_TOKENS, max_items=EMBED_MAX_BATCH_SIZE):
+    """
+    Groups `(id, text, metadata)` items into batches of at most `max_tokens`
+    tokens and `max_items` inputs. An item bigger than the budget goes alone.
+    Yields `(batch, token_count)`.
+    """
+    batch, tokens = [], 0
+    for item in items:
+        item_tokens = count_tokens(item[1])
+        if batch and (tokens + item_tokens > max_tokens or len(batch) >= max_items):
+            yield batch, tokens
+            batch, tokens = [], 0
+        batch.append(item)
+        tokens += item_tokens
+    if batch:
+        yield batch, tokens
+
+
+def _embed_batch(embeddings, batch, max_retries):
+    """Embeds one batch, retrying it on its own with jittered backoff."""
+    texts = [text for _, text, _ in batch]
+    for attempt in range(max_retries + 1):
+        try:
+            return embeddings.embed_documents(texts)
+        except Exception as error:
+            if attempt == max_retries:
+                raise
+            delay = backoff_delay(attempt)
+            print(f"Embedding batch of {len(batch)} failed ({error}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _store_batch(vector_db, batch, vectors):
+    """Writes precomputed vectors straight into the vector store (no second embedding pass)."""
+    metadatas = [metadata for _, _, metadata in batch]
+    vector_db.upsert_vectors(  # MemmapIndex or ChromaStore
+        ids=[id_ for id_, _, _ in batch],
+        embeddings=vectors,
+        documents=[text for _, text, _ in batch],
+        metadatas=metadatas if any(metadatas) else None,
+    )
+
+
+def embed_and_store(vector_db, embeddings, items, concurrency=EMBED_CONCURRENCY,
+                    max_retries=EMBED_MAX_RETRIES):
+    """
+    Embeds `(id, text, metadata)` items in token-packed batches, up to
+    `concurrency` requests in flight, and upserts each batch into `vector_db`
+    as soon as it completes. A batch that still fails after its retries is
+    reported and skipped; its chunks are picked up again on the next sync.
+    Returns `(stored_ids, failed_ids)`.
+    """
+    stored, failed = [], []
+    chunks = tokens = 0
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(_embed_batch, embeddings, batch, max_retries): (batch, batch_tokens)
+            for batch, batch_tokens in pack_batches(items)
+        }
+        for future in as_completed(futures):
+            batch, batch_tokens = futures[future]
+            ids = [id_ for id_, _, _ in batch]
+            try:
+                _store_batch(vector_db, batch, future.result())
+            except Exception as error:
+                print(f"Giving up on a batch of {len(batch)} chunks: {error}")
+                failed.extend(ids)
+                continue
+            stored.extend(ids)
+            chunks += len(batch)
+            tokens += batch_tokens
+
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    if futures:
+        print(f" Embedded {chunks} chunks ({tokens} tokens) in {elapsed:.1f}s: "
+              f"{chunks / elapsed:.1f} chunks/s, {tokens / elapsed:.0f} tokens/s"
+              + (f", {len(failed)} failed" if failed else ""))
+    return stored, failed
@@ -0,0 +1,229 @@
+# 🔗 Shared GitHub REST client: keep-alive session + on-disk ETag/Last-Modified cache
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+import pytz
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import (DATA_DIR, GITHUB_API_URL, GITHUB_CACHE_DIR, GITHUB_CONCURRENCY, GITHUB_MAX_RETRIES,
+                     GITHUB_TIMEOUT, GITHUB_TOKENS)
+from .metrics import inc, observe
+from .pr_records import parse_file_changes, split_comments
+from .rate_limiter import backoff_delay, get_scheduler
+
+BASE_URL = GITHUB_API_URL
+GITHUB_CACHE_PATH = GITHUB_CACHE_DIR or os.path.join(DATA_DIR, "cache", "github")
+
+
+def require_github_token(token=None):
+    """The token to use; raises when none is configured (checked on first use, never at import)."""
+    token = token or GITHUB_TOKENS[0]
+    if not token:
+        raise ValueError(
+            "GitHub token not found. Ensure .env file has GITHUB_TOKEN set.")
+    return token
+
+
+class ListingError(RuntimeError):
+    """A PR listing page failed, so the listing is incomplete."""
+
+
+def github_headers(token=None):
+    """Auth headers for every GitHub call."""
+    token = require_github_token(token)
+    return {
+        "Authorization": f"token {token}",
+        "Accept": "application/vnd.github.v3+json"
+    }
+
+
+class ResponseCache:
+    """
+    On-disk cache of GitHub response bodies keyed by full URL.
+    Each entry keeps the `ETag` / `Last-Modified` validators so the next
+    request can be sent conditionally and answered with a 304.
+    """
+
+    def __init__(self, cache_dir=GITHUB_CACHE_PATH):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.json")
+
+    def lookup(self, url):
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, headers, body):
+        """Saves a 200 body if GitHub sent a validator for it."""
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"url": url, "etag": etag, "last_modified": last_modified,
+                       "link": headers.get("Link"), "body": body}, file)
+        os.replace(tmp_path, path)
+
+
+# Failures of the connection itself (refused, reset, stalled past GITHUB_TIMEOUT), retried like a 5xx
+NETWORK_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+
+def record_response(status_code, size, seconds, resource="core"):
+    """Counts one GitHub response (sync and async clients alike)."""
+    inc("github_requests_total", resource=resource, status=status_code)
+    inc("github_response_bytes_total", size, resource=resource)
+    observe("github_request_seconds", seconds, resource=resource)
+
+
+class GitHubClient:
+    """
+    Pooled keep-alive session that sends conditional requests.
+    A 304 is answered from the cache and returned as a normal 200 response,
+    with `response.from_cache` set, so callers never see the difference.
+    Every request is paced and retried through the shared rate-limit scheduler.
+    """
+
+    def __init__(self, cache=None, pool_size=GITHUB_CONCURRENCY, scheduler=None):
+        self.session = requests.Session()
+        self.session.headers.update(github_headers())
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.cache = cache if cache is not None else ResponseCache()
+        self.scheduler = scheduler or get_scheduler()
+
+    def request(self, method, url, resource="core", headers=None, **kwargs):
+        """
+        Sends one request on the token the scheduler picks, retrying 5xx and
+        rate-limit responses as well as dropped connections and timeouts.
+        """
+        kwargs.setdefault("timeout", GITHUB_TIMEOUT)
+        for attempt in range(GITHUB_MAX_RETRIES + 1):
+            token = self.scheduler.acquire(resource)
+            request_headers = dict(headers or {}, **github_headers(token))
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, headers=request_headers, **kwargs)
+            except NETWORK_ERRORS as error:
+                inc("github_requests_total", resource=resource, status=type(error).__name__)
+                if attempt == GITHUB_MAX_RETRIES:
+                    raise
+                delay, outcome = backoff_delay(attempt), f"{type(error).__name__} on GitHub request"
+            else:
+                record_response(response.status_code, len(response.content), time.perf_counter() - started, resource)
+                self.scheduler.update(token, response.headers, resource)
+                delay = self.scheduler.retry_delay(
+                    token, response.status_code, response.headers, response.text, attempt, resource)
+                if delay is None or attempt == GITHUB_MAX_RETRIES:
+                    return response
+                outcome = f"GitHub returned {response.status_code}"
+            inc("github_retries_total", resource=resource)
+            print(f"{outcome} for {url}, retrying ({attempt + 1}/{GITHUB_MAX_RETRIES})...")
+            time.sleep(delay)
+
+    def get(self, url, params=None):
+        full_url = requests.Request("GET", url, params=params).prepare().url
+        entry = self.cache.lookup(full_url)
+        response = self.request(
+            "GET", full_url, headers=ResponseCache.conditional_headers(entry))
+        response.from_cache = response.status_code == 304 and entry is not None
+        inc("cache_requests_total", cache="github", result="hit" if response.from_cache else "miss")
+
+        if response.from_cache:
+            response.status_code = 200
+            response._content = json.dumps(entry["body"]).encode("utf-8")
+            if entry.get("link"):
+                response.headers["Link"] = entry["link"]
+        elif response.status_code == 200:
+            self.cache.store(full_url, response.headers, response.json())
+        return response
+
+
+_client = None
+
+
+def get_client():
+    """Process-wide client shared by both extractors."""
+    global _client
+    if _client is None:
+        _client = GitHubClient()
+    return _client
+
+
+def check_rate_limit():
+    """
+    Seeds the scheduler with every token's quota before a run.
+    `/rate_limit` itself is free; pacing until the real reset time is then
+    left to the scheduler instead of a fixed sleep.
+    """
+    scheduler = get_client().scheduler
+    for token in scheduler.tokens:
+        try:
+            response = get_client().session.get(
+                f"{BASE_URL}/rate_limit", headers=github_headers(token), timeout=GITHUB_TIMEOUT)
+        except NETWORK_ERRORS as error:
+            print(f"Failed to fetch rate limit ({type(error).__name__}). Proceeding with caution.")
+            continue
+        if response.status_code != 200:
+            print("Failed to fetch rate limit. Proceeding with caution.")
+            continue
+
+        resources = response.json().get("resources", {})
+        for resource, rate_limit in resources.items():
+            scheduler.seed(token, rate_limit, resource)
+        rate_limit = response.json()["rate"]
+        scheduler.seed(token, rate_limit)
+
+        reset_time = datetime.fromtimestamp(
+            rate_limit["reset"], tz=pytz.UTC).strftime('%Y-%m-%d %H:%M:%S')
+        print(
+            f"GitHub API Rate Limit: {rate_limit['remaining']} requests left. Resets at {reset_time}.")
+
+
+def fetch_file_changes(pr_number, repo_owner, repo_name):
+    """Fetches all file changes in a PR, including added, modified, deleted files and their diffs."""
+    url = f"{BASE_URL}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}/files"
+    response = get_client().get(url)
+
+    if response.status_code != 200:
+        print(
+            f"Error fetching file changes for PR #{pr_number}: {response.json()}")
+        return []
+
+    return parse_file_changes(response.json())
+
+
+def fetch_pr_comments(pr_number, repo_owner, repo_name):
+    """Fetches all comments on a PR and categorizes them as old or new."""
+    url = f"{BASE_URL}/repos/{repo_owner}/{repo_name}/issues/{pr_number}/comments"
+    response = get_client().get(url)
+    if response.status_code != 200:
+        print(
+            f"Error fetching comments for PR #{pr_number}: {response.json()}")
+        return {"Old Comments": [], "New Comments": []}
+
+    return split_comments(response.json())
@@ -0,0 +1,175 @@
+# 🧬 GraphQL fetch backend: PR metadata, changed files and comments in batched, cursor-paginated queries
+from .config import GITHUB_GRAPHQL_URL, GRAPHQL_PAGE_SIZE, GRAPHQL_PATCHES
+from .github_client import ListingError, fetch_file_changes, get_client
+from .metrics import span
+from .pr_records import build_pr_info, parse_file_changes, repo_key, save_pr_data, split_comments
+
+NESTED_PAGE_SIZE = 100  # Max `first:` GitHub allows on a connection
+
+PR_FIELDS = """
+    number title state createdAt mergedAt updatedAt mergeable
+    author { login }
+    baseRefName headRefName headRefOid
+    files(first: %(nested)d) {
+        pageInfo { hasNextPage endCursor }
+        nodes { path changeType additions deletions }
+    }
+    comments(first: %(nested)d) {
+        pageInfo { hasNextPage endCursor }
+        nodes { author { login } createdAt body }
+    }
+""" % {"nested": NESTED_PAGE_SIZE}
+
+PRS_QUERY = """
+query($owner: String!, $name: String!, $states: [PullRequestState!], $pageSize: Int!, $cursor: String) {
+    repository(owner: $owner, name: $name) {
+        pullRequests(states: $states, first: $pageSize, after: $cursor,
+                     orderBy: {field: CREATED_AT, direction: DESC}) {
+            pageInfo { hasNextPage endCursor }
+            nodes { %s }
+        }
+    }
+}
+""" % PR_FIELDS
+
+# Follow-up query for PRs with more than NESTED_PAGE_SIZE files or comments
+NESTED_QUERY = """
+query($owner: String!, $name: String!, $number: Int!, $cursor: String) {
+    repository(owner: $owner, name: $name) {
+        pullRequest(number: $number) {
+            %(field)s(first: %(nested)d, after: $cursor) {
+                pageInfo { hasNextPage endCursor }
+                nodes { %(nodes)s }
+            }
+        }
+    }
+}
+"""
+NESTED_NODES = {
+    "files": "path changeType additions deletions",
+    "comments": "author { login } createdAt body",
+}
+
+GRAPHQL_STATES = {"open": ["OPEN"], "closed": ["CLOSED", "MERGED"]}
+CHANGE_TYPES = {"ADDED": "added", "DELETED": "removed", "MODIFIED": "modified",
+                "RENAMED": "renamed", "COPIED": "copied", "CHANGED": "changed"}
+
+
+def run_query(query, variables):
+    """POSTs one GraphQL query and returns its `data`, or None on error."""
+    response = get_client().request(
+        "POST", GITHUB_GRAPHQL_URL, resource="graphql",
+        json={"query": query, "variables": variables})
+    if response.status_code != 200:
+        print(f"GraphQL request failed ({response.status_code}): {response.text}")
+        return None
+    payload = response.json()
+    if payload.get("errors"):
+        print(f"GraphQL errors: {payload['errors']}")
+        return None
+    return payload["data"]
+
+
+def _all_nodes(connection, field, pr_number, repo_owner, repo_name):
+    """Returns every node of a nested connection, paging past the first batch if needed."""
+    nodes = list(connection["nodes"])
+    page_info = connection["pageInfo"]
+    query = NESTED_QUERY % {"field": field, "nested": NESTED_PAGE_SIZE, "nodes": NESTED_NODES[field]}
+
+    while page_info["hasNextPage"]:
+        data = run_query(query, {"owner": repo_owner, "name": repo_name,
+                                 "number": pr_number, "cursor": page_info["endCursor"]})
+        if data is None:
+            break
+        connection = data["repository"]["pullRequest"][field]
+        nodes.extend(connection["nodes"])
+        page_info = connection["pageInfo"]
+    return nodes
+
+
+def _login(actor):
+    return actor["login"] if actor else "ghost"  # Deleted accounts come back as null
+
+
+def to_pr_info(node, repo_owner, repo_name, with_patches=GRAPHQL_PATCHES):
+    """
+    Maps one GraphQL `PullRequest` node onto the REST-shaped payloads and
+    builds the same `pr_info` dict as the REST extractors.
+    GraphQL does not expose patch text, so `Full Diff` / `Added Lines` /
+    `Removed Lines` are only filled when `with_patches` fetches them over REST;
+    without it the line counts come from the files' `additions` / `deletions`.
+    """
+    pr_number = node["number"]
+    pr = {
+        "number": pr_number,
+        "title": node["title"],
+        "state": "open" if node["state"] == "OPEN" else "closed",
+        "user": {"login": _login(node["author"])},
+        "created_at": node["createdAt"],
+        "merged_at": node["mergedAt"],
+        "base": {"ref": node["baseRefName"]},
+        "head": {"ref": node["headRefName"], "sha": node.get("headRefOid")},
+        "mergeable": node["mergeable"] != "CONFLICTING",
+    }
+
+    if with_patches:
+        file_changes = fetch_file_changes(pr_number, repo_owner, repo_name)
+    else:
+        files = _all_nodes(node["files"], "files", pr_number, repo_owner, repo_name)
+        file_changes = parse_file_changes(
+            {"filename": f["path"], "status": CHANGE_TYPES.get(f["changeType"], f["changeType"].lower()),
+             "additions": f["additions"], "deletions": f["deletions"]}
+            for f in files)
+
+    comments = _all_nodes(node["comments"], "comments", pr_number, repo_owner, repo_name)
+    comments = split_comments(
+        {"user": {"login": _login(c["author"])}, "created_at": c["createdAt"], "body": c["body"]}
+        for c in comments)
+
+    return build_pr_info(pr, file_changes, comments)
+
+
+def iter_prs_graphql(repo_owner, repo_name, state, page_size=None):
+    """Yields `pr_info` dicts for every PR in `state` (`open` or `closed`), newest first (ListingError if a page fails)."""
+    variables = {"owner": repo_owner, "name": repo_name, "states": GRAPHQL_STATES[state],
+                 "pageSize": page_size or GRAPHQL_PAGE_SIZE, "cursor": None}
+    page = 1
+
+    while True:
+        data = run_query(PRS_QUERY, variables)
+        if data is None:
+            raise ListingError(f"GraphQL listing of {state} PRs failed at page {page}")
+        connection = data["repository"]["pullRequests"]
+
+        for node in connection["nodes"]:
+            print(f"🔍 Processing {state.capitalize()} PR #{node['number']}")
+            with span("pr.fetch", pr=node["number"], state=state):
+                pr_info = to_pr_info(node, repo_owner, repo_name)
+            yield pr_info
+
+        print(f"Fetched {len(connection['nodes'])} PRs from page {page}")
+        if not connection["pageInfo"]["hasNextPage"]:
+            return
+        variables["cursor"] = connection["pageInfo"]["endCursor"]
+        page += 1
+
+
+def fetch_all_prs_graphql(repo_owner, repo_name, state, page_size=None):
+    """
+    Fetches all `open` or `closed` PRs over GraphQL and saves them like the REST extractors.
+    Returns True once every page was listed; a cut-short listing keeps the previous file.
+    """
+    try:
+        all_prs = list(iter_prs_graphql(repo_owner, repo_name, state, page_size))
+    except ListingError as error:
+        print(f"{error}; keeping the previous data.")
+        return False
+
+    if not all_prs:
+        print(f"No {state} PRs found.")
+        return True
+
+    file_path = save_pr_data(all_prs, state, repo_key(repo_owner, repo_name))
+    print(f"Fetched all {state} PRs")
+    print(f"PR details saved in {file_path}")
+    return True
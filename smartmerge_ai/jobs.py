@@ -0,0 +1,227 @@
+# ⏳ Background PR-processing jobs for the API: fetch -> load -> embed -> triage -> evaluate, with per-stage progress and streamed results
+import asyncio
+import time
+import uuid
+
+from .config import HEURISTIC_TRIAGE, JOB_CONCURRENCY, JOB_HISTORY, PR_DATASET_BACKEND, PR_FETCH_BACKEND, PR_SYNC_MODE
+from .embedding_cache import sync_texts
+from .merge_logic import triage_open_prs
+from .metrics import metrics
+from .pr_dataset import load_pr_records
+from .pr_records import pr_data_path, repo_key
+from .pr_sync import fetch_repo_prs
+from .ragLLM import stream_evaluations
+from .repo_registry import RepoRegistry
+from .vector_store import build_pr_documents, iter_pr_data
+
+STAGES = ("fetch", "load", "embed", "triage", "evaluate")
+
+
+def load_repo_prs(repo, state):
+    """A repo's (`repo_key`) `open` or `closed` PR dicts, from the SQLite dataset or the raw files under DATA_DIR."""
+    if PR_DATASET_BACKEND == "sqlite":
+        return load_pr_records(repo, state=state)
+    return list(iter_pr_data(pr_data_path(state, repo)))
+
+
+def embed_closed_prs(resources, closed_prs):
+    """Brings the repo's closed-PR store in line with `closed_prs` (only new chunks are embedded)."""
+    texts, metadatas = build_pr_documents(closed_prs)
+    sync_texts(resources.closed_db, texts, metadatas)
+
+
+class Job:
+    """
+    One processing run of a repo. `events` is the append-only log that SSE
+    subscribers replay and then follow: `stage`, `prediction`, and finally
+    `done` or `failed`.
+    """
+
+    def __init__(self, repo_owner, repo_name, mode=None, backend=None):
+        self.id = uuid.uuid4().hex
+        self.repo_owner = repo_owner
+        self.repo_name = repo_name
+        self.mode = mode
+        self.backend = backend
+        self.status = "queued"  # queued -> running -> done | failed
+        self.stage = None
+        self.progress = {stage: {"status": "pending", "done": 0, "total": None} for stage in STAGES}
+        self.results = {}
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.events = []
+        self._changed = asyncio.Condition()
+        self._stage_started = None  # (wall, perf_counter) of the current stage, for its span
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def to_dict(self, with_results=True):
+        status = {
+            "job_id": self.id,
+            "repo": repo_key(self.repo_owner, self.repo_name),
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+        if with_results:
+            status["merge_predictions"] = self.results
+        return status
+
+    async def _emit(self, event, data):
+        async with self._changed:
+            self.events.append((event, data))
+            self._changed.notify_all()
+
+    def _end_stage(self, error=None):
+        """Files the current stage as a `stage.*` span."""
+        if self.stage and self._stage_started:
+            started, perf_started = self._stage_started
+            metrics.record_span(f"stage.{self.stage}", started, time.perf_counter() - perf_started, error,
+                                repo=repo_key(self.repo_owner, self.repo_name), job=self.id)
+
+    async def start_stage(self, stage, total=None):
+        if self.stage:
+            self.progress[self.stage]["status"] = "done"
+            self._end_stage()
+        self.stage = stage
+        self._stage_started = (time.time(), time.perf_counter())
+        self.progress[stage].update(status="running", total=total)
+        await self._emit("stage", {"stage": stage, "total": total})
+
+    async def add_result(self, pr_number, result):
+        self.results[pr_number] = result
+        if self.stage:
+            self.progress[self.stage]["done"] += 1
+        await self._emit("prediction", {"pr_number": pr_number, **result})
+
+    async def finish(self, error=None):
+        self._end_stage(error)
+        if self.stage and not error:
+            self.progress[self.stage]["status"] = "done"
+        elif self.stage:
+            self.progress[self.stage]["status"] = "failed"
+        self.status = "failed" if error else "done"
+        self.error = error
+        self.finished_at = time.time()
+        await self._emit(self.status, self.to_dict(with_results=False))
+
+    async def follow(self):
+        """Yields `(event, data)` from the first event on, then live ones, until the job finishes."""
+        position = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.events) > position)
+                events = self.events[position:]
+            position += len(events)
+            for event in events:
+                yield event
+                if event[0] in ("done", "failed"):
+                    return
+
+    async def wait(self):
+        async for _ in self.follow():
+            pass
+        return self
+
+
+async def run_pipeline(job, registry, resources):
+    """
+    Runs a job's stages on the repo's warm `resources`; blocking I/O goes to
+    worker threads so the event loop stays free.
+    """
+    await job.start_stage("fetch")
+    await asyncio.to_thread(fetch_repo_prs, job.repo_owner, job.repo_name, job.mode, job.backend)
+    resources.reload_stats()
+
+    await job.start_stage("load")
+    repo = repo_key(job.repo_owner, job.repo_name)
+    closed_prs = await asyncio.to_thread(load_repo_prs, repo, "closed")
+    open_prs = await asyncio.to_thread(load_repo_prs, repo, "open")
+    stats = await asyncio.to_thread(lambda: resources.stats)
+
+    await job.start_stage("embed", total=len(closed_prs))
+    await asyncio.to_thread(embed_closed_prs, resources, closed_prs)
+
+    # Settle clear-cut PRs with the heuristic scorer, the rest with the RAG model
+    if HEURISTIC_TRIAGE:
+        await job.start_stage("triage", total=len(open_prs))
+        decided, uncertain = await asyncio.to_thread(triage_open_prs, open_prs, stats)
+        for pr_number, result in decided.items():
+            await job.add_result(pr_number, result)
+        uncertain = set(uncertain)
+        open_prs = [pr for pr in open_prs if pr["PR Number"] in uncertain]
+
+    await job.start_stage("evaluate", total=len(open_prs))
+    async for pr_number, result in stream_evaluations(resources.closed_db, open_prs, stats=stats,
+                                                      llm=registry.llm, repo=repo):
+        await job.add_result(pr_number, result)
+
+
+class JobManager:
+    """
+    Runs jobs as asyncio tasks, at most JOB_CONCURRENCY at once and one at a
+    time per repo. A job submitted while one for the same repo, mode and
+    backend is queued or running joins it instead of starting a second; other
+    settings queue behind it. The last JOB_HISTORY finished jobs stay
+    queryable. Stores and clients come from `registry`, warm across jobs.
+    """
+
+    def __init__(self, registry=None, concurrency=JOB_CONCURRENCY, history=JOB_HISTORY):
+        self.registry = RepoRegistry() if registry is None else registry
+        self.jobs = {}  # job id -> Job, oldest first
+        self.active = {}  # (owner, repo, mode, backend) -> running or queued Job
+        self.history = history
+        self._slots = asyncio.Semaphore(concurrency)
+        self._repo_locks = {}  # (owner, repo) -> Lock; jobs of one repo share its files
+        self._tasks = set()
+
+    def submit(self, repo_owner, repo_name, mode=None, backend=None):
+        """Returns `(job, coalesced)`; must be called from the event loop."""
+        mode, backend = mode or PR_SYNC_MODE, backend or PR_FETCH_BACKEND
+        key = (repo_owner, repo_name, mode, backend)
+        if key in self.active:
+            return self.active[key], True
+        job = Job(repo_owner, repo_name, mode, backend)
+        self.jobs[job.id] = job
+        self.active[key] = job
+        self._repo_locks.setdefault((repo_owner, repo_name), asyncio.Lock())
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job, False
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    async def _run(self, job):
+        repo = (job.repo_owner, job.repo_name)
+        try:
+            async with self._repo_locks[repo], self._slots:
+                job.status = "running"
+                with self.registry.use(job.repo_owner, job.repo_name) as resources:
+                    await run_pipeline(job, self.registry, resources)
+            await job.finish()
+        except Exception as e:
+            print(f"Job {job.id} ({job.repo_owner}/{job.repo_name}) failed: {e}")
+            await job.finish(error=str(e))
+        finally:
+            self.active.pop((*repo, job.mode, job.backend), None)
+            if not any(key[:2] == repo for key in self.active):
+                self._repo_locks.pop(repo, None)
+            self._prune()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
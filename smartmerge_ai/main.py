@@ -1,25 +1,10 @@
-import uvicorn
 import sys
-import os
 from rich.console import Console
 from rich.table import Table
-from rich.markdown import Markdown
 from textwrap import fill
-from smartmerge_ai.Extract_Open_PR import fetch_all_open_prs
-from smartmerge_ai.Extract_Closed_PR import fetch_all_closed_prs
-from smartmerge_ai.vector_store import load_pr_data, initialize_and_persist_chromadb
-from smartmerge_ai.ragLLM import evaluate_open_pr
 
 console = Console()
 
-# Define paths for PR JSON data
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-CLOSED_PR_PATH = os.path.join(BASE_DIR, "data", "raw", "closed_pr")
-OPEN_PR_PATH = os.path.join(BASE_DIR, "data", "raw", "open_pr") 
-
-
-
-
 
 def format_text(text, width=80):
     """Formats text to a readable paragraph style"""
@@ -28,6 +13,9 @@ def format_text(text, width=80):
 
 def run_cli():
     """Runs the CLI version of SmartMergeAI"""
+    from smartmerge_ai.cli import embed_repo, evaluate_repo, fetch_repo, print_timing_summary
+    from smartmerge_ai.metrics import metrics
+
     console.print("\n[bold yellow]🚀 SmartMergeAI CLI[/bold yellow]\n")
 
     console.print("[cyan]📌 Fetch PR Data[/cyan]\n")
@@ -38,29 +26,26 @@ def run_cli():
     console.print("\n[blue]Fetching PR data...[/blue]\n")
 
     # Fetch PR Data
-    fetch_all_closed_prs(repo_owner, repo_name)  # Fetch closed PR data
-    fetch_all_open_prs(repo_owner, repo_name)  # Fetch open PR data
-
-    closed_pr_file = os.path.join(CLOSED_PR_PATH, f"{repo_name}_all_closed_prs.json")
-    open_pr_file = os.path.join(OPEN_PR_PATH, f"{repo_name}_all_open_prs.json")
+    fetch_repo(repo_owner, repo_name)  # Fetch closed & open PR data (PR_SYNC_MODE)
 
     console.print("\n[cyan]📊 Loading PR Data...[/cyan]\n")
 
-    #Initialise ChromaDB Storage
-    closed_prs_vector, open_prs_vector=initialize_and_persist_chromadb(closed_pr_file,open_pr_file)
+    #Initialise ChromaDB Storage (namespaced by owner/repo)
+    closed_prs_vector = embed_repo(repo_owner, repo_name)
 
     console.print(
         "\n[bold green]🤖 Evaluating PRs using RAG-based AI...[/bold green]\n")
     
 #///////////////////////////////////////////////////////////////////////
-    # Retrieve stored PR texts properly
-    def extract_pr_text(vector_store):
-        return [doc.page_content for doc in vector_store.similarity_search("", k=100)]
+    # Evaluated concurrently (LLM_CONCURRENCY); progress is printed as each PR completes
+    evaluated = []
 
-    closed_pr_texts = extract_pr_text(closed_prs_vector)
-    open_pr_texts = extract_pr_text(open_prs_vector)
+    def show_progress(pr_number, prediction):
+        evaluated.append(pr_number)
+        console.print(f"[dim]{len(evaluated)}. PR #{pr_number} → {prediction['merge_percentage']}[/dim]")
 
-    merge_predictions = evaluate_open_pr(closed_pr_texts, open_pr_texts)
+    # Clear-cut PRs are settled by the heuristic scorer, the rest compared against their most similar closed PRs
+    merge_predictions = evaluate_repo(repo_owner, repo_name, closed_prs_vector, on_result=show_progress)
 #////////////////////////////////////////////////////////////////////
 
     # Display structured table output
@@ -80,18 +65,25 @@ def run_cli():
             merge_percentage), formatted_response)
 
     console.print(table)
+    print_timing_summary(metrics.summary(), console)
 
     console.print("\n[bold green]✅ Analysis Complete![/bold green]\n")
 
 
 def run_fastapi():
     """Runs the FastAPI server"""
+    import uvicorn
+
     console.print("\n[bold cyan]🚀 Starting FastAPI Server...[/bold cyan]\n")
     uvicorn.run("smartmerge_ai.app:app",
                 host="127.0.0.1", port=8000, reload=True)
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:  # Non-interactive: `python -m smartmerge_ai.main all owner/repo ...` (see cli.py)
+        from smartmerge_ai.cli import main
+        sys.exit(main())
+
     console.print(
         "\n[bold magenta]Run as (1) CLI or (2) FastAPI?[/bold magenta]\n")
     choice = console.input("[green]Enter your choice (1/2): [/green]").strip()
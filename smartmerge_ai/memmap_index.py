@@ -0,0 +1,277 @@
+# 📐 Exact-similarity vector index: memory-mapped float32 .npy matrix + SQLite sidecar (ids, documents, metadata)
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from .embedding_cache import chunk_id
+
+VECTORS_FILE = "vectors.npy"
+SIDECAR_FILE = "index.sqlite"
+COMPACT_BELOW = 0.5  # Rewrite the matrix once fewer than half of its rows are live
+
+
+def _matches(metadata, where):
+    """Evaluates a Chroma-style `where` clause (`$and`, `$or`, `$eq`, `$ne`, `$in`, `$nin`, `$contains`)."""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_matches(metadata, clause) for clause in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches(metadata, clause) for clause in condition):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, operand in condition.items():
+            if operator == "$eq" and value != operand:
+                return False
+            if operator == "$ne" and value == operand:
+                return False
+            if operator == "$in" and value not in operand:
+                return False
+            if operator == "$nin" and value in operand:
+                return False
+            if operator == "$contains" and (not isinstance(value, list) or operand not in value):
+                return False
+    return True
+
+
+class MemmapIndex(VectorStore):
+    """
+    Brute-force cosine index. Vectors are L2-normalized and appended to a
+    memory-mapped `vectors.npy`; ids, documents and metadata live in a SQLite
+    sidecar. Updates and deletes tombstone the old row (append-only growth);
+    the matrix is compacted once most rows are dead. Queries are one float32
+    matrix product, for one query or many (`similarity_search_batch`).
+    Mirrors the parts of the Chroma API the rest of the code uses.
+    """
+
+    def __init__(self, embedding_function, persist_directory=None):
+        self.embedding_function = embedding_function
+        self.persist_directory = persist_directory or tempfile.mkdtemp(prefix="memmap_index_")
+        os.makedirs(self.persist_directory, exist_ok=True)
+        self._vectors_path = os.path.join(self.persist_directory, VECTORS_FILE)
+        self._connection = sqlite3.connect(os.path.join(self.persist_directory, SIDECAR_FILE),
+                                           check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, id TEXT, document TEXT, metadata TEXT)")
+        self._lock = threading.Lock()
+        self._load()
+
+    # Storage
+
+    def _load(self):
+        """Reads the live rows' ids and metadata into memory and maps the matrix."""
+        records = self._connection.execute("SELECT row, id, metadata FROM rows ORDER BY row").fetchall()
+        rows = [row for row, _, _ in records]
+        self._ids = dict(zip(rows, (id_ for _, id_, _ in records)))  # row -> id
+        self._rows = {id_: row for row, id_ in self._ids.items()}  # id -> row
+        # One JSON document for all rows decodes far faster than one per row
+        metadatas = json.loads("[" + ",".join(metadata or "{}" for _, _, metadata in records) + "]")
+        self._metadatas = dict(zip(rows, metadatas))  # row -> metadata
+        self._map()
+
+    def _map(self):
+        self._matrix = np.load(self._vectors_path, mmap_mode="r") if os.path.exists(self._vectors_path) else None
+        size = 0 if self._matrix is None else len(self._matrix)
+        self._live = np.zeros(size, dtype=bool)
+        self._live[list(self._metadatas)] = True
+
+    def _append(self, vectors):
+        """Appends rows to `vectors.npy` in place: data at the end, then the header's row count."""
+        size = 0 if self._matrix is None else len(self._matrix)
+        header = {"descr": "<f4", "fortran_order": False, "shape": (size + len(vectors), vectors.shape[1])}
+        if self._matrix is None:
+            with open(self._vectors_path, "wb") as file:
+                np.lib.format.write_array_header_1_0(file, header)
+                file.write(vectors.tobytes())
+            return
+        if self._matrix.shape[1] != vectors.shape[1]:
+            raise ValueError(f"Vector size {vectors.shape[1]} does not match the index ({self._matrix.shape[1]})")
+        self._matrix = None  # Release the map before writing
+        with open(self._vectors_path, "r+b") as file:
+            file.seek(0, os.SEEK_END)
+            file.write(vectors.tobytes())
+            file.seek(0)
+            np.lib.format.read_magic(file)
+            np.lib.format.read_array_header_1_0(file)
+            data_offset = file.tell()
+            file.seek(0)
+            np.lib.format.write_array_header_1_0(file, header)
+            if file.tell() != data_offset:  # Header is padded to 128 bytes; only absurd shapes could outgrow it
+                raise ValueError("vectors.npy header grew; rebuild the index")
+
+    def upsert_vectors(self, ids, embeddings, documents, metadatas=None):
+        """Adds precomputed vectors; ids already present are replaced."""
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        metadatas = metadatas or [None] * len(ids)
+
+        with self._lock, self._connection:
+            replaced = [self._rows[id_] for id_ in ids if id_ in self._rows]
+            self._tombstone(replaced)
+            start = 0 if self._matrix is None else len(self._matrix)
+            self._append(vectors)
+            self._connection.executemany(
+                "INSERT INTO rows (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                [(start + offset, id_, document, json.dumps(metadata) if metadata else None)
+                 for offset, (id_, document, metadata) in enumerate(zip(ids, documents, metadatas))])
+            for offset, (id_, metadata) in enumerate(zip(ids, metadatas)):
+                self._rows[id_] = start + offset
+                self._ids[start + offset] = id_
+                self._metadatas[start + offset] = metadata or {}
+            self._map()
+
+    def _tombstone(self, rows):
+        if rows:
+            self._connection.executemany("DELETE FROM rows WHERE row = ?", [(row,) for row in rows])
+            for row in rows:
+                del self._metadatas[row]
+                del self._rows[self._ids.pop(row)]
+
+    def compact(self):
+        """Rewrites the matrix with live rows only and renumbers the sidecar."""
+        with self._lock, self._connection:
+            rows = sorted(self._metadatas)
+            vectors = np.array(self._matrix[rows]) if rows else None
+            self._matrix = None
+            os.remove(self._vectors_path)
+            self._connection.execute("CREATE TEMP TABLE renumber (old INTEGER, new INTEGER)")
+            self._connection.executemany("INSERT INTO renumber VALUES (?, ?)", [(old, new) for new, old in enumerate(rows)])
+            self._connection.execute(
+                "UPDATE rows SET row = -1 - (SELECT new FROM renumber WHERE old = rows.row)")
+            self._connection.execute("UPDATE rows SET row = -1 - row")
+            self._connection.execute("DROP TABLE renumber")
+            if vectors is not None:
+                self._append(vectors)
+        self._load()
+
+    def delete(self, ids=None, **kwargs):
+        with self._lock, self._connection:
+            self._tombstone([self._rows[id_] for id_ in (ids or list(self._rows)) if id_ in self._rows])
+            self._map()
+        if len(self._live) and self._live.mean() < COMPACT_BELOW:
+            self.compact()
+        return True
+
+    def close(self):
+        self._connection.close()
+
+    def persist(self):
+        """Writes are durable as they happen; kept for parity with Chroma."""
+
+    def count(self):
+        return len(self._rows)
+
+    # Reading
+
+    @property
+    def embeddings(self):
+        return self.embedding_function
+
+    def _rows_matching(self, ids=None, where=None):
+        if ids is not None:
+            rows = [self._rows[id_] for id_ in ids if id_ in self._rows]
+        else:
+            rows = sorted(self._metadatas)
+        return [row for row in rows if _matches(self._metadatas[row], where)] if where else rows
+
+    def _documents(self, rows):
+        documents = {}
+        for start in range(0, len(rows), 500):  # Stay under SQLite's parameter limit
+            batch = rows[start:start + 500]
+            documents.update(self._connection.execute(
+                f"SELECT row, document FROM rows WHERE row IN ({','.join('?' * len(batch))})", batch))
+        return [documents[row] for row in rows]
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("documents", "metadatas")):
+        """Chroma-style `get`: `{"ids", "documents", "metadatas"}` of the matching rows, in insertion order."""
+        rows = self._rows_matching(ids, where)[offset or 0:]
+        rows = rows[:limit] if limit is not None else rows
+        return {
+            "ids": [self._ids[row] for row in rows],
+            "documents": self._documents(rows) if "documents" in include else None,
+            "metadatas": [self._metadatas[row] for row in rows] if "metadatas" in include else None,
+        }
+
+    def get_by_ids(self, ids):
+        found = self.get(ids=ids)
+        return [Document(page_content=text, metadata=metadata, id=id_)
+                for id_, text, metadata in zip(found["ids"], found["documents"], found["metadatas"])]
+
+    def _top_k(self, queries, k, where):
+        """`[(row, score)]` lists, one per query row, from a single matrix product."""
+        if self._matrix is None or not self._rows:
+            return [[] for _ in range(len(queries))]
+        mask = self._live.copy()
+        if where:
+            mask[:] = False
+            mask[self._rows_matching(where=where)] = True
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return [[] for _ in range(len(queries))]
+        queries = np.asarray(queries, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+        matrix = self._matrix if len(candidates) == len(self._matrix) else self._matrix[candidates]
+        scores = queries @ matrix.T
+        k = min(k, len(candidates))
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for query_scores, query_best in zip(scores, best):
+            order = query_best[np.argsort(-query_scores[query_best])]
+            results.append([(int(candidates[column]), float(query_scores[column])) for column in order])
+        return results
+
+    def _to_documents(self, hits):
+        texts = self._documents([row for row, _ in hits])
+        return [(Document(page_content=text, metadata=self._metadatas[row], id=self._ids[row]), score)
+                for (row, score), text in zip(hits, texts)]
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, filter=None):
+        return self._to_documents(self._top_k([embedding], k, filter)[0])
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        return self.similarity_search_by_vector_with_score(self.embedding_function.embed_query(query), k, filter)
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def similarity_search_batch(self, queries, k=4, filter=None):
+        """Top-`k` documents for each of many queries: one embedding batch, one matrix product."""
+        if not queries:
+            return []
+        vectors = self.embedding_function.embed_documents(list(queries))
+        return [[doc for doc, _ in self._to_documents(hits)] for hits in self._top_k(vectors, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1) / 2  # Cosine similarity -> [0, 1]
+
+    # Writing through the embedding function
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        ids = ids or [chunk_id(text, metadata) for text, metadata in zip(texts, metadatas or [None] * len(texts))]
+        self.upsert_vectors(ids, self.embedding_function.embed_documents(texts), texts, metadatas)
+        return ids
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, persist_directory=None, **kwargs):
+        index = cls(embedding, persist_directory=persist_directory)
+        if texts:
+            index.add_texts(texts, metadatas=metadatas, ids=ids)
+        return index
@@ -1 +1,161 @@
  # 📝 Defines conditions for auto-merging PRs
+import re
+
+import numpy as np
+import pandas as pd
+
+from .config import MERGE_SCORE_HIGH, MERGE_SCORE_LOW
+from .diff_model import line_counts
+from .pr_records import is_merged
+from .stats_index import COUNTERS, StatsIndex
+
+DOCS_PATTERN = re.compile(r"(?:^|/)(?:docs?/|README|CHANGELOG|LICENSE|CONTRIBUTING)|\.(?:md|rst|txt|adoc)$",
+                          re.IGNORECASE)
+PRIOR_STRENGTH = 5  # Pseudo-PRs pulling small-sample rates towards the repo-wide rate
+
+# Log-odds contribution of each feature; the intercept is the repo-wide merge rate
+WEIGHTS = {
+    "author_rate": 3.0,  # Author's smoothed merge rate minus the repo's
+    "branch_rate": 2.0,  # Base branch's smoothed merge rate minus the repo's
+    "path_risk": -3.0,  # Mean unmerged rate of the touched paths minus the repo's
+    "churn": -0.4,  # log1p(changed lines / 100)
+    "files": -0.15,  # log1p(files touched)
+    "merge_conflict": -2.5,
+    "docs_only": 1.5,
+    "age": -0.3,  # log1p(days open / 30)
+}
+
+
+def pr_features(prs):
+    """One row per PR dict with the scoring inputs (the file lists are not kept)."""
+    rows = []
+    for pr in prs:
+        file_changes = pr.get("File Changes", [])
+        counts = [line_counts(fc) for fc in file_changes]
+        paths = [fc.get("Filename", "") for fc in file_changes]
+        rows.append({
+            "pr_number": pr.get("PR Number"),
+            "author": pr.get("Author"),
+            "base_branch": pr.get("Base Branch"),
+            "created_date": pr.get("Created Date"),
+            "merge_conflict": bool(pr.get("Merge Conflict")),
+            "merged": is_merged(pr),
+            "files": len(file_changes),
+            "churn": sum(added + removed for added, removed in counts),
+            "paths": paths,
+        })
+    return pd.DataFrame(rows, columns=["pr_number", "author", "base_branch", "created_date", "merge_conflict",
+                                       "merged", "files", "churn", "paths"])
+
+
+def _smoothed_rates(keys, outcomes, prior):
+    """Per-key mean of `outcomes`, shrunk towards `prior` by PRIOR_STRENGTH pseudo-observations."""
+    grouped = outcomes.groupby(keys).agg(["sum", "count"])
+    return (grouped["sum"] + PRIOR_STRENGTH * prior) / (grouped["count"] + PRIOR_STRENGTH)
+
+
+class MergeHistory:
+    """Merge statistics of the closed PRs: per author, per base branch and per touched path."""
+
+    def __init__(self, closed_prs):
+        closed = pr_features(closed_prs)
+        merged = closed["merged"].astype(float)
+        self.merge_rate = float(merged.mean()) if len(closed) else 0.5
+        self.author_rate = _smoothed_rates(closed["author"], merged, self.merge_rate)
+        self.branch_rate = _smoothed_rates(closed["base_branch"], merged, self.merge_rate)
+        touched = closed[["paths", "merged"]].explode("paths").dropna(subset=["paths"])
+        self.path_unmerged = _smoothed_rates(
+            touched["paths"], 1.0 - touched["merged"].astype(float), 1.0 - self.merge_rate)
+        self.size = len(closed)
+
+    @classmethod
+    def from_index(cls, stats):
+        """The same history from a `StatsIndex`, without reading the closed PRs."""
+        history = cls.__new__(cls)
+        totals = stats.totals()
+        history.merge_rate = totals["merge_rate"] if totals["prs"] else 0.5
+        history.size = totals["prs"]
+
+        def smoothed(kind, unmerged=False):
+            counters = pd.DataFrame.from_dict(stats.counters(kind), orient="index", columns=COUNTERS)
+            prior = 1.0 - history.merge_rate if unmerged else history.merge_rate
+            hits = counters["prs"] - counters["merged"] if unmerged else counters["merged"]
+            return (hits + PRIOR_STRENGTH * prior) / (counters["prs"] + PRIOR_STRENGTH)
+
+        history.author_rate = smoothed("author")
+        history.branch_rate = smoothed("branch")
+        history.path_unmerged = smoothed("path", unmerged=True)
+        return history
+
+
+def score_prs(open_prs, history, now=None):
+    """
+    Merge probability of every open PR in one vectorized pass: a logistic
+    model over WEIGHTS whose intercept is the repo's merge rate.
+    Returns the features plus `score` in [0, 1].
+    """
+    frame = pr_features(open_prs)
+    base_rate = min(max(history.merge_rate, 0.01), 0.99)
+    features = pd.DataFrame(index=frame.index)
+    features["author_rate"] = frame["author"].map(history.author_rate).fillna(base_rate) - base_rate
+    features["branch_rate"] = frame["base_branch"].map(history.branch_rate).fillna(base_rate) - base_rate
+
+    touched = frame["paths"].explode().dropna()
+    path_unmerged = touched.map(history.path_unmerged).fillna(1.0 - base_rate)
+    path_unmerged = path_unmerged.groupby(level=0).mean().reindex(frame.index, fill_value=1.0 - base_rate)
+    features["path_risk"] = path_unmerged - (1.0 - base_rate)
+    docs = touched.astype(str).str.contains(DOCS_PATTERN).groupby(level=0).all()
+    features["docs_only"] = docs.reindex(frame.index, fill_value=False).astype(float)
+
+    features["churn"] = np.log1p(frame["churn"] / 100)
+    features["files"] = np.log1p(frame["files"])
+    features["merge_conflict"] = frame["merge_conflict"].astype(float)
+    now = now or pd.Timestamp.now(tz="UTC")
+    age_days = (now - pd.to_datetime(frame["created_date"], utc=True, errors="coerce")).dt.days.fillna(0)
+    features["age"] = np.log1p(age_days.clip(lower=0) / 30)
+
+    logit = np.log(base_rate / (1 - base_rate)) + features[list(WEIGHTS)].to_numpy() @ np.array(list(WEIGHTS.values()))
+    frame["score"] = 1 / (1 + np.exp(-logit))
+    return frame
+
+
+def decide(scores, high=MERGE_SCORE_HIGH, low=MERGE_SCORE_LOW):
+    """`merge` at or above `high`, `block` at or below `low`, `llm` in between."""
+    return np.select([scores >= high, scores <= low], ["merge", "block"], default="llm")
+
+
+def _heuristic_result(row):
+    reasons = [f"{row['files']} files, {row['churn']} changed lines"]
+    if row["merge_conflict"]:
+        reasons.append("has merge conflicts")
+    verdict = "Safe to merge" if row["decision"] == "merge" else "Do not merge yet"
+    return {
+        "response": f"{verdict} (heuristic score {row['score']:.2f}: {', '.join(reasons)}).",
+        "merge_percentage": f"{round(row['score'] * 100)}%",
+        "source": "heuristic",
+    }
+
+
+def triage_open_prs(open_prs, closed_prs, high=MERGE_SCORE_HIGH, low=MERGE_SCORE_LOW):
+    """
+    Scores the open PRs against the closed-PR history (closed PR dicts, a
+    `MergeHistory` or a `StatsIndex`) and settles the clear cases without
+    the LLM. Returns `(results, uncertain)`: LLM-shaped results of the
+    decided PRs keyed by PR number, and the numbers left for the LLM.
+    """
+    if isinstance(closed_prs, StatsIndex):
+        history = MergeHistory.from_index(closed_prs)
+    elif isinstance(closed_prs, MergeHistory):
+        history = closed_prs
+    else:
+        history = MergeHistory(closed_prs)
+    frame = score_prs(open_prs, history)
+    frame["decision"] = decide(frame["score"], high, low)
+
+    decided = frame[frame["decision"] != "llm"]
+    results = {row["pr_number"]: _heuristic_result(row) for row in decided.to_dict("records")}
+    uncertain = frame.loc[frame["decision"] == "llm", "pr_number"].tolist()
+    print(f" Heuristics settled {len(results)} of {len(frame)} open PRs "
+          f"({(decided['decision'] == 'merge').sum()} safe, {(decided['decision'] == 'block').sum()} blocked): "
+          f"{len(results)} LLM calls saved")
+    return results, uncertain
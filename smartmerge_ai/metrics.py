@@ -0,0 +1,264 @@
+# 📈 Built-in instrumentation: counters, latency histograms and spans, exported as Prometheus text or a run summary
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .config import METRICS_ENABLED, SPAN_HISTORY
+
+PREFIX = "smartmerge_"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Help text of each metric on /metrics
+DESCRIPTIONS = {
+    "github_requests_total": "GitHub API requests, by resource and HTTP status (or network error)",
+    "github_response_bytes_total": "Bytes of GitHub response bodies received",
+    "github_request_seconds": "GitHub request latency",
+    "github_retries_total": "GitHub requests retried after a 5xx, rate-limit response or network error",
+    "github_rate_limit_wait_seconds_total": "Seconds requests were held back by the rate-limit scheduler",
+    "cache_requests_total": "Cache lookups, by cache (github, embedding, verdict) and result (hit, miss)",
+    "embedding_requests_total": "Calls to the embedding provider (cache misses only)",
+    "embedding_tokens_total": "Tokens sent to the embedding provider",
+    "embedding_request_seconds": "Embedding provider call latency",
+    "llm_requests_total": "LLM calls, by model and status",
+    "llm_tokens_total": "LLM tokens, by model and kind (prompt, completion)",
+    "llm_request_seconds": "LLM call latency",
+    "span_seconds": "Duration of instrumented spans: stages (stage.*), single PRs (pr.*) and pipeline steps",
+    "span_errors_total": "Spans that ended with an exception",
+}
+
+_current_span = contextvars.ContextVar("smartmerge_span", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus layout) that also keeps count, sum and max."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate interpolated inside the bucket holding the q-th observation (as `histogram_quantile`)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.max
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = min(self.buckets[index], self.max)
+                return lower + (upper - lower) * max(rank - seen, 0) / count
+            seen += count
+        return self.max
+
+    def to_dict(self):
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "count": self.count, "sum": self.sum,
+                "max": self.max}
+
+    def merge(self, data):
+        if tuple(data["buckets"]) != self.buckets:
+            raise ValueError("Histogram buckets differ")
+        self.counts = [a + b for a, b in zip(self.counts, data["counts"])]
+        self.count += data["count"]
+        self.sum += data["sum"]
+        self.max = max(self.max, data["max"])
+
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}" if pairs else ""
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and histograms keyed by name + labels, plus the last
+    `span_history` finished spans. Thread-safe; a disabled registry records nothing.
+    Process-pool workers hand `snapshot()` back to the parent, which `merge()`s it.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED, span_history=SPAN_HISTORY):
+        self.enabled = enabled
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.spans = deque(maxlen=span_history)
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    def record_span(self, name, started, duration, error=None, parent=None, **attributes):
+        """Files one finished span: its duration goes to `span_seconds{span=name}`."""
+        if not self.enabled:
+            return
+        self.observe("span_seconds", duration, span=name)
+        if error:
+            self.inc("span_errors_total", span=name)
+        with self._lock:
+            self.spans.append({"name": name, "parent": parent, "start": started, "seconds": round(duration, 6),
+                               "error": error, "attributes": attributes})
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        Times the block as span `name` (e.g. `stage.fetch`, `pr.evaluate`).
+        Yields the span's `attributes` dict, which the block may extend.
+        Spans nest through a context variable, across threads started with
+        `asyncio.to_thread` and across asyncio tasks.
+        """
+        parent = _current_span.get()
+        token = _current_span.set(name)
+        started, wall_started = time.perf_counter(), time.time()
+        error = None
+        try:
+            yield attributes
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            self.record_span(name, wall_started, time.perf_counter() - started, error, parent, **attributes)
+
+    def counter(self, name, **labels):
+        """Sum of counter `name` over every label set matching `labels`."""
+        wanted = set(_labels(labels))
+        with self._lock:
+            return sum(value for (metric, metric_labels), value in self.counters.items()
+                       if metric == name and wanted <= set(metric_labels))
+
+    def hit_rate(self, cache):
+        hits = self.counter("cache_requests_total", cache=cache, result="hit")
+        total = self.counter("cache_requests_total", cache=cache)
+        return hits / total if total else None
+
+    def span_stats(self):
+        """Per span name: count, total / mean / p50 / p99 / max seconds and errors."""
+        with self._lock:
+            histograms = {dict(labels)["span"]: histogram for (name, labels), histogram in self.histograms.items()
+                          if name == "span_seconds"}
+        errors = {name: self.counter("span_errors_total", span=name) for name in histograms}
+        return {name: {"count": histogram.count, "total": histogram.sum, "mean": histogram.sum / histogram.count,
+                       "p50": histogram.quantile(0.5), "p99": histogram.quantile(0.99), "max": histogram.max,
+                       "errors": errors[name]}
+                for name, histogram in sorted(histograms.items()) if histogram.count}
+
+    def summary(self):
+        """Where wall time and spend went: span timings plus GitHub, embedding and LLM totals."""
+        return {
+            "spans": self.span_stats(),
+            "github": {
+                "requests": self.counter("github_requests_total"),
+                "bytes": self.counter("github_response_bytes_total"),
+                "retries": self.counter("github_retries_total"),
+                "rate_limit_wait_seconds": self.counter("github_rate_limit_wait_seconds_total"),
+                "cache_hit_rate": self.hit_rate("github"),
+            },
+            "embedding": {
+                "requests": self.counter("embedding_requests_total"),
+                "tokens": self.counter("embedding_tokens_total"),
+                "cache_hit_rate": self.hit_rate("embedding"),
+            },
+            "llm": {
+                "requests": self.counter("llm_requests_total"),
+                "prompt_tokens": self.counter("llm_tokens_total", kind="prompt"),
+                "completion_tokens": self.counter("llm_tokens_total", kind="completion"),
+                "verdict_cache_hit_rate": self.hit_rate("verdict"),
+            },
+        }
+
+    def snapshot(self):
+        """JSON-able copy of everything recorded (see `merge`)."""
+        with self._lock:
+            return {
+                "counters": [[name, list(map(list, labels)), value]
+                             for (name, labels), value in self.counters.items()],
+                "histograms": [[name, list(map(list, labels)), histogram.to_dict()]
+                               for (name, labels), histogram in self.histograms.items()],
+                "spans": list(self.spans),
+            }
+
+    def merge(self, snapshot):
+        """Adds another registry's `snapshot()` (e.g. from a pool worker) to this one."""
+        with self._lock:
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                self.counters[key] = self.counters.get(key, 0) + value
+            for name, labels, data in snapshot["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(data["buckets"])
+                self.histograms[key].merge(data)
+            self.spans.extend(snapshot["spans"])
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.spans.clear()
+
+    def render_prometheus(self):
+        """Everything in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+            lines = []
+            typed = set()
+            for (name, labels), value in counters:
+                if name not in typed:
+                    typed.add(name)
+                    if name in DESCRIPTIONS:
+                        lines.append(f"# HELP {PREFIX}{name} {DESCRIPTIONS[name]}")
+                    lines.append(f"# TYPE {PREFIX}{name} counter")
+                lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in histograms:
+                if name not in typed:
+                    typed.add(name)
+                    if name in DESCRIPTIONS:
+                        lines.append(f"# HELP {PREFIX}{name} {DESCRIPTIONS[name]}")
+                    lines.append(f"# TYPE {PREFIX}{name} histogram")
+                cumulative = 0
+                for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                    cumulative += count
+                    lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, [('le', str(bound))])} {cumulative}")
+                lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()  # Shared by every module of the process
+inc = metrics.inc
+observe = metrics.observe
+span = metrics.span
@@ -1 +1,50 @@
-# MLflow experiment tracking and model version logging
\ No newline at end of file
+# MLflow experiment tracking and model version logging
+import json
+import os
+import time
+import uuid
+
+from .config import EXPERIMENT_LOG_FILE, MLFLOW_TRACKING_URI
+
+
+def flatten_summary(summary):
+    """Numeric leaves of `metrics.summary()` as `{"github.requests": 12, "spans.stage.fetch.total": 3.1, ...}`."""
+    flat = {}
+
+    def walk(prefix, value):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                walk(f"{prefix}.{key}" if prefix else key, child)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix] = value
+
+    walk("", summary)
+    return flat
+
+
+def log_run(name, params, summary, spans=None, log_file=EXPERIMENT_LOG_FILE):
+    """
+    Appends one run (its parameters, the `metrics.summary()` and optionally
+    the finished spans) to the local JSON Lines experiment log; returns the
+    run ID. With MLFLOW_TRACKING_URI set and mlflow installed, the parameters
+    and flattened metrics are logged to MLflow as well.
+    """
+    run_id = uuid.uuid4().hex
+    record = {"run_id": run_id, "name": name, "logged_at": time.time(), "params": params, "summary": summary}
+    if spans is not None:
+        record["spans"] = spans
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    with open(log_file, "a", encoding="utf-8") as file:
+        file.write(json.dumps(record) + "\n")
+
+    if MLFLOW_TRACKING_URI:
+        try:
+            import mlflow  # Optional dependency
+        except ImportError:
+            print("MLFLOW_TRACKING_URI is set but mlflow is not installed; run logged locally only")
+            return run_id
+        mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+        with mlflow.start_run(run_name=name):
+            mlflow.log_params({key: str(value) for key, value in params.items()})
+            mlflow.log_metrics(flatten_summary(summary))
+    return run_id
@@ -0,0 +1,242 @@
+# 🗃️ Columnar PR dataset: PR metadata in an indexed SQLite table, file changes & comments in child tables
+import json
+import os
+import sqlite3
+from contextlib import closing
+
+from .diff_model import line_counts, patch_of
+from .config import DATA_DIR
+from .pr_records import parse_file_changes, pr_data_path, pr_stream_path
+from .pr_stream import iter_jsonl
+
+DATASET_PATH = os.path.join(DATA_DIR, "dataset")
+BATCH_SIZE = 1000  # PRs written per transaction
+
+# Column name in the store -> key in the legacy `pr_info` dict
+PR_COLUMNS = {
+    "pr_number": "PR Number",
+    "title": "Title",
+    "state": "State",
+    "author": "Author",
+    "created_date": "Created Date",
+    "merged_date": "Merged Date",
+    "base_branch": "Base Branch",
+    "head_branch": "Head Branch",
+    "head_sha": "Head SHA",
+    "merge_conflict": "Merge Conflict",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prs (
+    pr_number INTEGER PRIMARY KEY,
+    title TEXT, state TEXT, author TEXT,
+    created_date TEXT, merged_date TEXT,
+    base_branch TEXT, head_branch TEXT, head_sha TEXT,
+    merge_conflict INTEGER,
+    file_count INTEGER, comment_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS prs_author ON prs (author);
+CREATE INDEX IF NOT EXISTS prs_state ON prs (state);
+CREATE INDEX IF NOT EXISTS prs_created ON prs (created_date);
+
+CREATE TABLE IF NOT EXISTS file_changes (
+    pr_number INTEGER, position INTEGER,
+    filename TEXT, status TEXT, patch TEXT,
+    additions INTEGER, deletions INTEGER
+);
+CREATE INDEX IF NOT EXISTS file_changes_pr ON file_changes (pr_number);
+CREATE INDEX IF NOT EXISTS file_changes_filename ON file_changes (filename);
+
+CREATE TABLE IF NOT EXISTS comments (
+    pr_number INTEGER, position INTEGER, is_new INTEGER,
+    user TEXT, created_at TEXT, body TEXT
+);
+CREATE INDEX IF NOT EXISTS comments_pr ON comments (pr_number);
+"""
+
+
+def dataset_path(repo_name):
+    return os.path.join(DATASET_PATH, f"{repo_name}_prs.sqlite")
+
+
+def _connect(repo_name):
+    os.makedirs(os.path.dirname(dataset_path(repo_name)), exist_ok=True)
+    connection = sqlite3.connect(dataset_path(repo_name))
+    connection.executescript(SCHEMA)
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(prs)")}
+    if "head_sha" not in columns:  # Datasets built before Head SHA was recorded
+        connection.execute("ALTER TABLE prs ADD COLUMN head_sha TEXT")
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(file_changes)")}
+    for column in ("additions", "deletions"):  # Datasets built before line counts were recorded
+        if column not in columns:
+            connection.execute(f"ALTER TABLE file_changes ADD COLUMN {column} INTEGER DEFAULT 0")
+    return connection
+
+
+def _write_batch(connection, prs):
+    """Replaces the rows of a batch of `pr_info` dicts (idempotent by PR number)."""
+    pr_rows, file_rows, comment_rows = [], [], []
+    for pr in prs:
+        pr_number = pr["PR Number"]
+        row = {column: pr.get(key) for column, key in PR_COLUMNS.items()}
+        row["merge_conflict"] = int(bool(row["merge_conflict"]))
+        row["file_count"] = len(pr.get("File Changes", []))
+        row["comment_count"] = len(pr.get("Old Comments", [])) + len(pr.get("New Comments", []))
+        pr_rows.append(row)
+
+        for position, fc in enumerate(pr.get("File Changes", [])):
+            additions, deletions = line_counts(fc)
+            file_rows.append({"pr_number": pr_number, "position": position,
+                              "filename": fc.get("Filename"), "status": fc.get("Status"),
+                              "patch": patch_of(fc), "additions": additions, "deletions": deletions})
+        old_comments = pr.get("Old Comments", [])
+        for position, comment in enumerate(old_comments + pr.get("New Comments", [])):
+            comment_rows.append({"pr_number": pr_number, "position": position,
+                                 "is_new": int(position >= len(old_comments)),
+                                 "user": comment.get("User"), "created_at": comment.get("Created At"),
+                                 "body": comment.get("Body")})
+
+    import pandas as pd  # Imported on first use: fetching alone never needs it
+
+    numbers = [(row["pr_number"],) for row in pr_rows]
+    with connection:
+        for table in ("prs", "file_changes", "comments"):
+            connection.executemany(f"DELETE FROM {table} WHERE pr_number = ?", numbers)
+        pd.DataFrame(pr_rows).to_sql("prs", connection, if_exists="append", index=False)
+        if file_rows:
+            pd.DataFrame(file_rows).to_sql("file_changes", connection, if_exists="append", index=False)
+        if comment_rows:
+            pd.DataFrame(comment_rows).to_sql("comments", connection, if_exists="append", index=False)
+
+
+def upsert_prs(prs, repo_name):
+    """Streams `pr_info` dicts into the dataset in batches, replacing PRs already stored."""
+    count = 0
+    batch = []
+    with closing(_connect(repo_name)) as connection:
+        for pr in prs:
+            batch.append(pr)
+            if len(batch) >= BATCH_SIZE:
+                _write_batch(connection, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            _write_batch(connection, batch)
+            count += len(batch)
+    return count
+
+
+def iter_raw_prs(state, repo_name):
+    """Streams the raw JSON Lines file, falling back to the legacy JSON array."""
+    if os.path.exists(pr_stream_path(state, repo_name)):
+        yield from iter_jsonl(pr_stream_path(state, repo_name))
+    elif os.path.exists(pr_data_path(state, repo_name)):
+        with open(pr_data_path(state, repo_name), "r", encoding="utf-8") as file:
+            yield from json.load(file)
+
+
+def build_dataset(repo_name):
+    """(Re)builds the dataset from the raw open & closed PR files without loading them whole."""
+    if os.path.exists(dataset_path(repo_name)):
+        os.remove(dataset_path(repo_name))
+    count = 0
+    for state in ("closed", "open"):
+        count += upsert_prs(iter_raw_prs(state, repo_name), repo_name)
+    print(f"Stored {count} PRs in {dataset_path(repo_name)}")
+    return count
+
+
+def update_dataset(repo_name, prs):
+    """Upserts synced PRs; builds the dataset from the raw files first if there is none yet (full history)."""
+    if not os.path.exists(dataset_path(repo_name)):
+        return build_dataset(repo_name)
+    return upsert_prs(prs, repo_name)
+
+
+def _where(pr_numbers=None, author=None, state=None, created_from=None, created_to=None):
+    clauses, params = [], []
+    if pr_numbers is not None:
+        pr_numbers = list(pr_numbers)
+        clauses.append(f"pr_number IN ({','.join('?' * len(pr_numbers))})")
+        params.extend(pr_numbers)
+    if author is not None:
+        clauses.append("author = ?")
+        params.append(author)
+    if state is not None:
+        clauses.append("state = ?")
+        params.append(state)
+    if created_from is not None:
+        clauses.append("created_date >= ?")
+        params.append(created_from)
+    if created_to is not None:
+        clauses.append("created_date < ?")
+        params.append(created_to)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def query_prs(repo_name, columns=None, **filters):
+    """
+    Returns PR metadata as a DataFrame, reading only `columns` (default: all).
+    Filters: `pr_numbers`, `author`, `state`, `created_from` / `created_to`
+    (ISO dates, half-open range); each one is served by an index.
+    """
+    import pandas as pd
+
+    select = ", ".join(columns) if columns else "*"
+    where, params = _where(**filters)
+    with closing(_connect(repo_name)) as connection:
+        return pd.read_sql_query(
+            f"SELECT {select} FROM prs{where} ORDER BY pr_number DESC", connection, params=params)
+
+
+def _query_children(table, repo_name, columns, filters):
+    import pandas as pd
+
+    select = ", ".join(columns) if columns else "*"
+    where, params = _where(**filters)
+    with closing(_connect(repo_name)) as connection:
+        return pd.read_sql_query(
+            f"SELECT {select} FROM {table} WHERE pr_number IN (SELECT pr_number FROM prs{where}) "
+            f"ORDER BY pr_number, position", connection, params=params)
+
+
+def query_file_changes(repo_name, columns=None, **filters):
+    """File changes (`filename`, `status`, `patch`, `additions`, `deletions`) of the PRs matching the `query_prs` filters."""
+    return _query_children("file_changes", repo_name, columns, filters)
+
+
+def query_comments(repo_name, columns=None, **filters):
+    """Comments of the PRs matching the `query_prs` filters; `is_new` marks the `New Comments` half."""
+    return _query_children("comments", repo_name, columns, filters)
+
+
+def _to_comment(row):
+    return {"User": row["user"], "Created At": row["created_at"], "Body": row["body"]}
+
+
+def load_pr_records(repo_name, **filters):
+    """Rebuilds the legacy `pr_info` dicts for the PRs matching `filters` (same keys as the JSON files)."""
+    prs = query_prs(repo_name, **filters)
+    file_groups = dict(iter(query_file_changes(repo_name, **filters).groupby("pr_number")))
+    comment_groups = dict(iter(query_comments(repo_name, **filters).groupby("pr_number")))
+
+    records = []
+    for row in prs.to_dict("records"):
+        number = row["pr_number"]
+        pr_info = {key: row[column] for column, key in PR_COLUMNS.items()}
+        pr_info["Merge Conflict"] = bool(pr_info["Merge Conflict"])
+        if pr_info["State"] != "closed":
+            del pr_info["Merged Date"]
+
+        group = file_groups.get(number)
+        pr_info["File Changes"] = [] if group is None else parse_file_changes(
+            {"filename": fc["filename"], "status": fc["status"], "patch": fc["patch"],
+             "additions": int(fc["additions"]), "deletions": int(fc["deletions"])}
+            for fc in group.to_dict("records"))
+
+        group = comment_groups.get(number)
+        group = [] if group is None else group.to_dict("records")
+        pr_info["Old Comments"] = [_to_comment(c) for c in group if not c["is_new"]]
+        pr_info["New Comments"] = [_to_comment(c) for c in group if c["is_new"]]
+        records.append(pr_info)
+    return records
@@ -0,0 +1,141 @@
+# 🧱 Builds the PR records shared by every extractor (REST, async, ...)
+import json
+import os
+
+from .config import COMPACT_DIFFS, DATA_DIR
+from .diff_model import compact_file_change
+
+RAW_DATA_PATH = os.path.join(DATA_DIR, "raw")
+
+
+def parse_file_changes(files, compact=COMPACT_DIFFS):
+    """
+    Turns the GitHub `/pulls/{n}/files` payload into the `File Changes` list.
+    With `compact`, each entry keeps the patch once plus its stats (see diff_model).
+    A file without a patch (binary, too large, GraphQL) keeps GitHub's own
+    `additions` / `deletions` counts.
+    """
+    file_changes = []
+    for file in files:
+        filename = file["filename"]
+        status = file["status"]  # added, modified, removed
+        patch = file.get("patch", "")  # Full patch/diff if available
+
+        counts = {}
+        if not patch and "additions" in file:
+            counts = {"Additions": file["additions"], "Deletions": file["deletions"]}
+
+        if compact:
+            file_changes.append(compact_file_change(filename, status, patch))
+            file_changes[-1].update(counts)
+            continue
+
+        added_lines = []
+        removed_lines = []
+        patch_lines = patch.split("\n") if patch else []
+
+        for line in patch_lines:
+            if line.startswith("+") and not line.startswith("+++"):
+                added_lines.append(line)
+            elif line.startswith("-") and not line.startswith("---"):
+                removed_lines.append(line)
+
+        file_changes.append({
+            "Filename": filename,
+            "Status": status,
+            "Added Lines": added_lines,
+            "Removed Lines": removed_lines,
+            "Full Diff": patch_lines,
+            **counts
+        })
+
+    return file_changes
+
+
+def split_comments(comments):
+    """Sorts PR comments by creation time and splits them into old and new halves."""
+    comments = sorted(comments, key=lambda x: x["created_at"])
+    midpoint = len(comments) // 2
+
+    old_comments = [{
+        "User": comment["user"]["login"],
+        "Created At": comment["created_at"],
+        "Body": comment["body"]
+    } for comment in comments[:midpoint]]
+
+    new_comments = [{
+        "User": comment["user"]["login"],
+        "Created At": comment["created_at"],
+        "Body": comment["body"]
+    } for comment in comments[midpoint:]]
+
+    return {"Old Comments": old_comments, "New Comments": new_comments}
+
+
+def build_pr_info(pr, file_changes, comments):
+    """Builds the `pr_info` dict stored for one PR (closed PRs also carry `Merged Date`)."""
+    pr_info = {
+        "PR Number": pr["number"],
+        "Title": pr["title"],
+        "State": pr["state"],
+        "Author": pr["user"]["login"],
+        "Created Date": pr["created_at"],
+    }
+    if pr["state"] == "closed":
+        pr_info["Merged Date"] = pr.get("merged_at", "Not merged")
+    pr_info.update({
+        "Base Branch": pr["base"]["ref"],
+        "Head Branch": pr["head"]["ref"],
+        "Head SHA": pr["head"].get("sha"),
+        "Merge Conflict": not pr.get("mergeable", True),
+        "File Changes": file_changes,
+        "Old Comments": comments["Old Comments"],
+        "New Comments": comments["New Comments"]
+    })
+    return pr_info
+
+
+def is_merged(pr_info):
+    """Whether a stored closed PR was merged (unmerged ones carry no date, or "Not merged")."""
+    merged_date = pr_info.get("Merged Date")
+    return bool(merged_date) and merged_date != "Not merged"
+
+
+def path_prefixes(paths):
+    """Every directory touched by `paths`, with a trailing slash ("src/", "src/core/", ...)."""
+    prefixes = set()
+    for path in paths:
+        parts = path.split("/")[:-1]
+        for depth in range(1, len(parts) + 1):
+            prefixes.add("/".join(parts[:depth]) + "/")
+    return sorted(prefixes)
+
+
+def repo_key(repo_owner, repo_name):
+    """Storage namespace of a repo, `owner/repo`: same-named repos of different owners never share files."""
+    return f"{repo_owner}/{repo_name}"
+
+
+def pr_data_path(state, repo_name):
+    """Returns the raw JSON path for a repo's `open` or `closed` PRs (`repo_name` is its `repo_key`)."""
+    return os.path.join(RAW_DATA_PATH, f"{state}_pr", f"{repo_name}_all_{state}_prs.json")
+
+
+def pr_stream_path(state, repo_name):
+    """JSON Lines twin of `pr_data_path`, one PR per line, for streaming readers."""
+    return pr_data_path(state, repo_name)[:-len(".json")] + ".jsonl"
+
+
+def save_pr_data(all_prs, state, repo_name):
+    """Writes the extracted PRs to `data/raw/{state}_pr/` (JSON and JSON Lines) and returns the JSON path."""
+    file_path = pr_data_path(state, repo_name)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump(all_prs, file, indent=4)
+
+    with open(pr_stream_path(state, repo_name), "w", encoding="utf-8") as file:
+        for pr in all_prs:
+            file.write(json.dumps(pr) + "\n")
+
+    return file_path
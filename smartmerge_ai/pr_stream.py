@@ -0,0 +1,126 @@
+# 💾 Streaming, checkpointed PR output: one JSON Lines record per PR, resumable after a crash
+import json
+import os
+
+from .pr_records import pr_data_path, pr_stream_path
+
+
+class PRStreamWriter:
+    """
+    Appends each PR to `{repo}_all_{state}_prs.partial.jsonl` as soon as it is
+    fetched and keeps `.checkpoint.json` next to it with the last completed page
+    and PR. If a checkpoint is left behind (crash, 403, Ctrl-C), the next run
+    resumes from that page and skips the PRs already on disk. The last complete
+    `.jsonl` is only replaced by `finalize`, so readers never see a partial run.
+    """
+
+    def __init__(self, state, repo_name):
+        self.state = state
+        self.repo_name = repo_name
+        self.path = pr_stream_path(state, repo_name)
+        self.partial_path = partial_stream_path(self.path)
+        self.checkpoint_path = checkpoint_path(self.path)
+        self.checkpoint = self._load_checkpoint()
+        self.written = set()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if self.checkpoint and os.path.exists(self.partial_path):
+            self._recover()
+            mode = "a"
+        else:
+            self.checkpoint = None
+            mode = "w"
+        self.file = open(self.partial_path, mode, encoding="utf-8")
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def _recover(self):
+        """Drops a half-written last line and remembers which PRs are already stored."""
+        with open(self.partial_path, "rb+") as file:
+            data = file.read()
+            end = data.rfind(b"\n") + 1
+            if end != len(data):
+                file.truncate(end)
+        for record in iter_jsonl(self.partial_path):
+            self.written.add(record["PR Number"])
+
+    @property
+    def resume_page(self):
+        """Page to (re)start listing from; the last completed page is re-listed to catch shifted PRs."""
+        if not self.checkpoint:
+            return 1
+        if self.checkpoint["last_pr"] is None:  # Saved by complete_page as the page after it
+            return max(self.checkpoint["page"] - 1, 1)
+        return self.checkpoint["page"]
+
+    def has(self, pr_number):
+        return pr_number in self.written
+
+    def write(self, pr_info, page):
+        self.file.write(json.dumps(pr_info) + "\n")
+        self.file.flush()
+        self.written.add(pr_info["PR Number"])
+        self._save_checkpoint(page, pr_info["PR Number"])
+
+    def complete_page(self, page):
+        self._save_checkpoint(page + 1, None)
+
+    def _save_checkpoint(self, page, last_pr):
+        self.checkpoint = {"page": page, "last_pr": last_pr, "count": len(self.written)}
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.checkpoint, file)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def close(self):
+        self.file.close()
+
+    def finalize(self):
+        """
+        Marks the run complete: moves the stream over the last complete `.jsonl`,
+        writes the legacy indent-4 JSON array record by record (never holding the
+        whole repo in memory) and drops the checkpoint.
+        """
+        self.close()
+        os.replace(self.partial_path, self.path)
+        file_path = pr_data_path(self.state, self.repo_name)
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write("[")
+            for index, record in enumerate(iter_jsonl(self.path)):
+                body = json.dumps(record, indent=4).replace("\n", "\n    ")
+                file.write(("," if index else "") + "\n    " + body)
+            file.write("\n]" if self.written else "]")
+        os.replace(tmp_path, file_path)
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        return file_path
+
+    def discard(self):
+        """Removes the partial stream and checkpoint of a run that found nothing."""
+        self.close()
+        for path in (self.partial_path, self.checkpoint_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def checkpoint_path(stream_path):
+    """`.checkpoint.json` of a `.jsonl` stream; present while a run is in progress."""
+    return stream_path[:-len(".jsonl")] + ".checkpoint.json"
+
+
+def partial_stream_path(stream_path):
+    """`.partial.jsonl` a run in progress appends to, until `finalize` moves it over the `.jsonl`."""
+    return stream_path[:-len(".jsonl")] + ".partial.jsonl"
+
+
+def iter_jsonl(path):
+    """Yields one PR record per JSON Lines row."""
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
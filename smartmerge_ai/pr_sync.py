@@ -0,0 +1,167 @@
+# 🔁 Incremental PR sync: only re-fetch PRs updated since the last run (updated_at watermark)
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from .async_extractor import fetch_all_prs_concurrently
+from .config import PR_DATASET_BACKEND, PR_FETCH_BACKEND, PR_SYNC_MODE
+from .Extract_Closed_PR import fetch_all_closed_prs
+from .Extract_Open_PR import fetch_all_open_prs
+from .github_client import BASE_URL, ListingError, fetch_file_changes, fetch_pr_comments, get_client
+from .graphql_extractor import fetch_all_prs_graphql
+from .metrics import span
+from .pr_dataset import build_dataset, update_dataset
+from .pr_records import RAW_DATA_PATH, build_pr_info, pr_data_path, repo_key, save_pr_data
+from .stats_index import build_stats, update_stats
+
+SYNC_STATE_FILE = os.path.join(RAW_DATA_PATH, "sync_state.json")
+CLOCK_SKEW_SECONDS = 300  # A full refresh's watermark is backdated by this much against local/GitHub clock skew
+
+
+def load_watermark(repo_owner, repo_name):
+    """Returns the `updated_at` high-water mark of the last sync, or None."""
+    if not os.path.exists(SYNC_STATE_FILE):
+        return None
+    with open(SYNC_STATE_FILE, "r", encoding="utf-8") as file:
+        return json.load(file).get(repo_key(repo_owner, repo_name))
+
+
+def save_watermark(repo_owner, repo_name, updated_at):
+    state = {}
+    if os.path.exists(SYNC_STATE_FILE):
+        with open(SYNC_STATE_FILE, "r", encoding="utf-8") as file:
+            state = json.load(file)
+    state[repo_key(repo_owner, repo_name)] = updated_at
+
+    os.makedirs(os.path.dirname(SYNC_STATE_FILE), exist_ok=True)
+    tmp_path = f"{SYNC_STATE_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(state, file, indent=4)
+    os.replace(tmp_path, SYNC_STATE_FILE)
+
+
+def _load_existing(state, repo_name):
+    file_path = pr_data_path(state, repo_name)
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path, "r", encoding="utf-8") as file:
+        return {pr["PR Number"]: pr for pr in json.load(file)}
+
+
+def fetch_updated_prs(repo_owner, repo_name, since=None):
+    """
+    Yields the raw PR payloads updated at or after `since`, newest first.
+    Listing is `state=all&sort=updated&direction=desc`, so paging stops at the
+    first PR older than the watermark. Raises ListingError if a page fails.
+    """
+    page = 1
+    per_page = 100  # Max allowed by GitHub API
+
+    while True:
+        url = (f"{BASE_URL}/repos/{repo_owner}/{repo_name}/pulls?state=all&sort=updated"
+               f"&direction=desc&per_page={per_page}&page={page}")
+        response = get_client().get(url)
+
+        if response.status_code != 200:
+            raise ListingError(f"Error fetching updated PRs at page {page} "
+                               f"({response.status_code}): {response.text}")
+
+        data = response.json()
+        for pr in data:
+            # Equal timestamps are re-fetched: cheap, and nothing is missed.
+            if since and pr["updated_at"] < since:
+                return
+            yield pr
+
+        print(f"Fetched {len(data)} PRs from page {page}")
+        if len(data) < per_page:
+            return
+        page += 1
+
+
+def sync_prs(repo_owner, repo_name):
+    """
+    Brings `data/raw/{open,closed}_pr/{owner}/` up to date with the PRs updated since
+    the stored watermark and merges them in by `PR Number`. A PR that changed
+    state moves between the open and closed datasets. The SQLite dataset and
+    the merge statistics index are updated with the changed PRs only, or
+    built from the raw files when missing. If a listing page fails, the PRs
+    fetched so far are still saved but the watermark is kept, so the next run
+    lists them again, and the ListingError is re-raised.
+    """
+    since = load_watermark(repo_owner, repo_name)
+    print(f"Syncing PRs updated since {since or 'the beginning'}")
+
+    repo = repo_key(repo_owner, repo_name)
+    datasets = {"open": _load_existing("open", repo),
+                "closed": _load_existing("closed", repo)}
+    high_water = since
+    changed = []
+    listing_error = None
+
+    try:
+        for pr in fetch_updated_prs(repo_owner, repo_name, since):
+            pr_number = pr["number"]
+            print(f"🔍 Processing {pr['state'].capitalize()} PR #{pr_number}")
+
+            with span("pr.fetch", pr=pr_number, state=pr["state"]):
+                file_changes = fetch_file_changes(pr_number, repo_owner, repo_name)
+                comments = fetch_pr_comments(pr_number, repo_owner, repo_name)
+
+            for prs in datasets.values():
+                prs.pop(pr_number, None)
+            pr_info = build_pr_info(pr, file_changes, comments)
+            datasets[pr["state"]][pr_number] = pr_info
+            changed.append(pr_info)
+
+            high_water = max(high_water or pr["updated_at"], pr["updated_at"])
+    except ListingError as error:
+        listing_error = error
+
+    for state, prs in datasets.items():
+        if prs or os.path.exists(pr_data_path(state, repo)):
+            ordered = [prs[number] for number in sorted(prs, reverse=True)]
+            save_pr_data(ordered, state, repo)
+
+    if PR_DATASET_BACKEND == "sqlite":
+        update_dataset(repo, changed)
+    update_stats(repo, changed).close()
+    if listing_error:
+        print(f"{listing_error}; watermark kept at {since or 'the beginning'}")
+        raise listing_error
+    if high_water:
+        save_watermark(repo_owner, repo_name, high_water)
+    print(f"Synced {len(changed)} updated PRs "
+          f"({len(datasets['open'])} open, {len(datasets['closed'])} closed stored)")
+    return len(changed)
+
+
+def fetch_repo_prs(repo_owner, repo_name, mode=None, backend=None):
+    """
+    Refreshes both PR datasets, either fully (`full`) or from the watermark (`incremental`).
+    A full refresh runs on the `rest`, `async` or `graphql` backend; the
+    incremental sync always lists over REST, where the ETag cache applies.
+    A complete full refresh records its start time (less CLOCK_SKEW_SECONDS) as the watermark.
+    """
+    mode = mode or PR_SYNC_MODE
+    backend = backend or PR_FETCH_BACKEND
+    started = datetime.now(timezone.utc) - timedelta(seconds=CLOCK_SKEW_SECONDS)
+    if mode == "incremental":
+        sync_prs(repo_owner, repo_name)
+        return
+    if mode != "full":
+        raise ValueError(f"Unknown sync mode: {mode!r} (expected 'full' or 'incremental')")
+    if backend == "rest":
+        complete = [fetch_all_closed_prs(repo_owner, repo_name), fetch_all_open_prs(repo_owner, repo_name)]
+    elif backend == "async":
+        complete = [fetch_all_prs_concurrently(repo_owner, repo_name, state) for state in ("closed", "open")]
+    elif backend == "graphql":
+        complete = [fetch_all_prs_graphql(repo_owner, repo_name, state) for state in ("closed", "open")]
+    else:
+        raise ValueError(f"Unknown fetch backend: {backend!r} (expected 'rest', 'async' or 'graphql')")
+
+    if PR_DATASET_BACKEND == "sqlite":
+        build_dataset(repo_key(repo_owner, repo_name))
+    build_stats(repo_key(repo_owner, repo_name)).close()
+    if all(complete):
+        save_watermark(repo_owner, repo_name, started.strftime("%Y-%m-%dT%H:%M:%SZ"))
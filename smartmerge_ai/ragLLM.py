@@ -1,32 +1,24 @@
  # Retrieves similar past conflicts from the vector database based on embeddings
-from langchain_community.vectorstores import FAISS
-from langchain_openai import ChatOpenAI
-from langchain.chains import RetrievalQA
 from dotenv import load_dotenv
+import asyncio
+import hashlib
 import os
+import re
+import time
+from functools import cache
 
 from .vector_store import format_closed_prs
-from .vector_store import initialize_retriever
-from .vector_store import truncate_text
+from .config import LLM_CONCURRENCY, LLM_MAX_RETRIES, LLM_MODEL, VERDICT_CACHE
+from .metrics import inc, observe, span
+from .rate_limiter import backoff_delay
+from .verdict_cache import get_verdict_cache, pr_fingerprint
+from .context_builder import SIMILAR_PRS_HEADER, assemble_context, resolve_closed_store
 
 #Load openai KEY
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 
-# Define RAG-based prompt
-def generate_prompt(open_pr):
-    return (
-        f"Analyze the following open PR based on past closed PRs and provide a merge recommendation.\n\n"
-        f"Open PR Details:\n"
-        f"PR Number: {open_pr['PR Number']}, Title: {truncate_text(open_pr['Title'])}, State: {open_pr['State']}, "
-        f"Author: {open_pr['Author']}, Created Date: {open_pr['Created Date']}, "
-        f"Base Branch: {open_pr['Base Branch']}, Head Branch: {open_pr['Head Branch']}, Merge Conflict: {open_pr['Merge Conflict']}, "
-        f"File Changes: {truncate_text(str(open_pr['File Changes']))}\n\n"
-        f"- If a merge conflict exists, assess if it can be resolved based on past cases.\n"
-        f"- Provide insights on risks, necessary fixes, and best practices before merging."
-    )
-
 def extract_merge_percentage(response_text):
     """
     Parses the AI response to assign a merge confidence percentage.
@@ -61,31 +53,190 @@ def extract_merge_percentage(response_text):
 
 
 
-def evaluate_open_pr(closed_pr_texts, open_pr_texts):
-    """
-    Evaluates open PRs using extracted text instead of raw vectors.
-    """
-    llm = ChatOpenAI(model_name="gpt-4", openai_api_key=OPENAI_API_KEY, temperature=0)
+SYSTEM_PROMPT = "You are an AI that evaluates PRs and provides a merge recommendation."
+EVALUATION_PROMPT = "Analyze the following open PR{reference} and provide a merge recommendation:\n\n{open_pr_text}"
+REFERENCE_CLAUSE = ", using the similar past closed PRs below as reference,"
 
-    results = {}
-    for open_pr_text in open_pr_texts:
-        prompt = f"Analyze the following open PR and provide a merge recommendation:\n\n{open_pr_text}"
-        response = llm.invoke([
-            {"role": "system", "content": "You are an AI that evaluates PRs and provides a merge recommendation."},
-            {"role": "user", "content": prompt}
-        ])
+PR_NUMBER_PATTERN = re.compile(r"PR Number: (\d+)")
 
-        response_text = response.content
-        merge_confidence = extract_merge_percentage(response_text)
+@cache
+def transient_errors():
+    """Errors worth retrying: rate limits, timeouts, dropped connections and 5xx (openai is imported on first use)."""
+    import openai
+    return (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
 
-        results[open_pr_text[:50]] = {  # Use first 50 chars as an identifier
-            "response": response_text,
-            "merge_percentage": f"{merge_confidence}%"
-        }
 
-    return results
+def get_llm():
+    from langchain_openai import ChatOpenAI  # Heavy; only needed once an evaluation runs
+
+    # Retries are ours (see _evaluate_one) so they share the concurrency limit
+    return ChatOpenAI(model_name=LLM_MODEL, openai_api_key=OPENAI_API_KEY, temperature=0, max_retries=0)
+
+
+def build_messages(open_pr_text):
+    """Chat messages for one PR context; the prompt only points at similar PRs when the context holds some."""
+    reference = REFERENCE_CLAUSE if f"\n\n{SIMILAR_PRS_HEADER}\n" in open_pr_text else ""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": EVALUATION_PROMPT.format(reference=reference, open_pr_text=open_pr_text)}
+    ]
+
+
+def to_result(response_text):
+    return {
+        "response": response_text,
+        "merge_percentage": f"{extract_merge_percentage(response_text)}%"
+    }
+
+
+def error_result(error):
+    """Result of a PR whose evaluation failed for good; it is never cached, so the next run retries it."""
+    message = f"{type(error).__name__}: {error}"
+    return {"response": f"Evaluation failed ({message})", "merge_percentage": "N/A", "error": message}
+
 
+def pr_text(open_pr):
+    """Text sent to the LLM: stored PR texts as they are, PR dicts formatted like the stored chunks."""
+    return format_closed_prs([open_pr])[0] if isinstance(open_pr, dict) else open_pr
 
 
+def pr_key(open_pr, open_pr_text):
+    """Result key of an open PR: its number, or a digest of its text when it carries none."""
+    if isinstance(open_pr, dict) and "PR Number" in open_pr:
+        return open_pr["PR Number"]
+    match = PR_NUMBER_PATTERN.search(open_pr_text)
+    return int(match.group(1)) if match else hashlib.sha256(open_pr_text.encode("utf-8")).hexdigest()[:12]
 
 
+def record_usage(response):
+    """Counts the prompt / completion tokens an LLM response reports."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    inc("llm_tokens_total", usage.get("input_tokens", 0), model=LLM_MODEL, kind="prompt")
+    inc("llm_tokens_total", usage.get("output_tokens", 0), model=LLM_MODEL, kind="completion")
+
+
+async def _call_llm(llm, messages, max_retries):
+    """One LLM call, retrying transient provider errors with jittered backoff."""
+    for attempt in range(max_retries + 1):
+        started = time.perf_counter()
+        try:
+            response = await llm.ainvoke(messages)
+        except transient_errors() as error:
+            inc("llm_requests_total", model=LLM_MODEL, status=type(error).__name__)
+            if attempt == max_retries:
+                raise
+            delay = backoff_delay(attempt)
+            print(f"LLM call failed ({type(error).__name__}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        observe("llm_request_seconds", time.perf_counter() - started, model=LLM_MODEL)
+        inc("llm_requests_total", model=LLM_MODEL, status="ok")
+        record_usage(response)
+        return response
+
+
+async def _evaluate_one(llm, open_pr, max_retries, cache, closed_db, stats=None, repo=None):
+    """
+    Evaluates one open PR against its most similar closed PRs in `closed_db`,
+    retrying transient provider errors with jittered backoff.
+    Returns `(key, result, cached)`; unchanged PRs come from `cache`, where
+    they are filed under `repo` (a repo_key) so PR numbers of repos never clash.
+    A PR that still fails gets an `error_result` instead of failing the run.
+    """
+    open_pr_text = pr_text(open_pr)
+    key = pr_key(open_pr, open_pr_text)
+    with span("pr.evaluate", pr=key, repo=repo) as attributes:
+        cache_key = f"{repo}#{key}" if repo else key
+        fingerprint = pr_fingerprint(open_pr, open_pr_text, SYSTEM_PROMPT + EVALUATION_PROMPT + REFERENCE_CLAUSE,
+                                     LLM_MODEL)
+        if cache is not None:
+            result = cache.get(cache_key, fingerprint)
+            if result is not None:
+                attributes["cached"] = True
+                return key, result, True
+
+        attributes["cached"] = False
+        try:
+            context = await asyncio.to_thread(assemble_context, open_pr, closed_db, stats=stats)
+            response = await _call_llm(llm, build_messages(context), max_retries)
+        except Exception as error:
+            print(f"Evaluation of PR {key} failed ({type(error).__name__}: {error})")
+            attributes["failure"] = type(error).__name__
+            return key, error_result(error), False
+
+        result = to_result(response.content)
+        if cache is not None:
+            cache.put(cache_key, fingerprint, result)
+        return key, result, False
+
+
+async def stream_evaluations(closed_pr_texts, open_pr_texts, concurrency=None, max_retries=LLM_MAX_RETRIES,
+                             use_cache=VERDICT_CACHE, stats=None, llm=None, repo=None):
+    """
+    Evaluates open PRs (stored texts or PR dicts) with up to `concurrency` LLM
+    calls in flight and yields `(pr_number, result)` as each one completes
+    (completion order). Each prompt holds the PR summary and the most similar
+    PRs of `closed_pr_texts` (a closed-PR vector store; anything else falls
+    back to the persisted one) within CONTEXT_TOKEN_BUDGET. `open_pr_texts`
+    may be a generator: it is consumed only as slots free up. With
+    `use_cache`, PRs whose fingerprint is in the verdict cache are answered
+    without an LLM call. With a `StatsIndex` in `stats`, prompts also carry
+    the author's, branch's and paths' merge history. A PR that fails for good
+    yields an `error_result` and the others carry on. `llm` reuses a chat
+    client (a new one is built otherwise); `repo` (a repo_key) selects that
+    repo's persisted store and cache namespace.
+    """
+    llm = llm or get_llm()
+    # Opening the store and the cache touches disk: keep it off the event loop
+    closed_db = await asyncio.to_thread(resolve_closed_store, closed_pr_texts, repo)
+    cache = await asyncio.to_thread(get_verdict_cache) if use_cache else None
+    limit = concurrency or LLM_CONCURRENCY
+    texts = iter(open_pr_texts)
+    pending = set()
+    cached = called = failed = 0
+    try:
+        while True:
+            for text in texts:
+                pending.add(asyncio.create_task(
+                    _evaluate_one(llm, text, max_retries, cache, closed_db, stats, repo)))
+                if len(pending) >= limit:
+                    break
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                key, result, from_cache = task.result()
+                cached += from_cache
+                called += not from_cache
+                failed += "error" in result
+                yield key, result
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if cache is not None:
+        await asyncio.to_thread(cache.evict)
+        print(f" {cached} verdicts reused from cache, {called} LLM evaluations")
+    if failed:
+        print(f" {failed} PR evaluations failed; they are retried on the next run")
+
+
+async def evaluate_open_pr_async(closed_pr_texts, open_pr_texts, concurrency=None, on_result=None, stats=None,
+                                 repo=None):
+    """Async `evaluate_open_pr`; `on_result(pr_number, result)` is called as each PR finishes."""
+    results = {}
+    async for key, result in stream_evaluations(closed_pr_texts, open_pr_texts, concurrency, stats=stats, repo=repo):
+        if on_result:
+            on_result(key, result)
+        results[key] = result
+    return results
+
+
+def evaluate_open_pr(closed_pr_texts, open_pr_texts, concurrency=None, on_result=None, stats=None, repo=None):
+    """
+    Evaluates open PRs using extracted text instead of raw vectors.
+    Results are keyed by PR number. Runs up to `concurrency` (default
+    LLM_CONCURRENCY) evaluations at once; call `evaluate_open_pr_async`
+    instead from code already inside an event loop.
+    """
+    return asyncio.run(evaluate_open_pr_async(closed_pr_texts, open_pr_texts, concurrency, on_result, stats, repo))
@@ -0,0 +1,173 @@
+# ⏱️ Adaptive GitHub rate-limit scheduler shared by every GitHub call (sync and async)
+import asyncio
+import random
+import threading
+import time
+
+from .config import GITHUB_CONCURRENCY, GITHUB_PACE_BELOW, GITHUB_TOKENS
+from .metrics import inc
+
+RETRYABLE_STATUS = {500, 502, 503, 504}
+SECONDARY_LIMIT_WAIT = 60  # GitHub asks for at least a minute when no Retry-After is sent
+MAX_BACKOFF = 120
+
+
+def backoff_delay(attempt, base=1.0, cap=MAX_BACKOFF):
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class _Bucket:
+    """Quota state of one token on one GitHub resource (`core`, `graphql`, ...)."""
+
+    def __init__(self, burst):
+        self.burst = burst
+        self.allowance = burst
+        self.remaining = None  # Unknown until the first response
+        self.limit = None
+        self.reset = None
+        self.blocked_until = 0.0
+        self.updated = time.monotonic()
+
+    def rate(self, now):
+        """
+        Requests per second that spread the remaining quota evenly until reset.
+        None (unpaced) while more than GITHUB_PACE_BELOW of the limit is left,
+        so short runs are not slowed down by a quota they will never exhaust.
+        """
+        if self.remaining is None or self.reset is None:
+            return None
+        if not self.limit or self.remaining > self.limit * GITHUB_PACE_BELOW:
+            return None
+        return max(self.remaining, 0) / max(self.reset - now, 1.0)
+
+    def next_start(self, now, wall_now):
+        """Earliest time (monotonic) a request could start on this bucket."""
+        start = max(now, self.blocked_until)
+        if self.remaining is not None and self.remaining <= 0 and self.reset:
+            start = max(start, now + (self.reset - wall_now) + 1)
+        rate = self.rate(wall_now)
+        if rate:
+            allowance = min(self.burst, self.allowance + (now - self.updated) * rate)
+            if allowance < 1:
+                start = max(start, now + (1 - allowance) / rate)
+        return start
+
+    def consume(self, now, wall_now):
+        rate = self.rate(wall_now)
+        if rate:
+            self.allowance = min(self.burst, self.allowance + (now - self.updated) * rate) - 1
+        else:
+            self.allowance = self.burst  # Unpaced requests build up no debt
+        self.updated = now
+        if self.remaining is not None:
+            self.remaining -= 1
+
+
+class RateLimitScheduler:
+    """
+    Paces GitHub requests so the quota of every configured token lasts until
+    its reset. Each response feeds `X-RateLimit-*` / `Retry-After` back in;
+    `reserve()` hands out the token that can start soonest and how long to
+    wait first (a token bucket refilled at remaining / seconds-until-reset).
+    """
+
+    def __init__(self, tokens=None, burst=GITHUB_CONCURRENCY):
+        self.tokens = [token for token in (tokens or GITHUB_TOKENS) if token]
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.waited = 0.0  # Total seconds callers were told to wait
+
+    def _bucket(self, token, resource):
+        key = (token, resource)
+        if key not in self._buckets:
+            self._buckets[key] = _Bucket(self.burst)
+        return self._buckets[key]
+
+    def reserve(self, resource="core"):
+        """Picks a token and returns `(token, seconds_to_wait)`; the slot is already booked."""
+        if not self.tokens:
+            raise ValueError(
+                "GitHub token not found. Ensure .env file has GITHUB_TOKEN set.")
+        with self._lock:
+            now, wall_now = time.monotonic(), time.time()
+            token = min(self.tokens,
+                        key=lambda t: self._bucket(t, resource).next_start(now, wall_now))
+            bucket = self._bucket(token, resource)
+            wait = max(bucket.next_start(now, wall_now) - now, 0.0)
+            bucket.consume(now + wait, wall_now + wait)
+            self.waited += wait
+        if wait:
+            inc("github_rate_limit_wait_seconds_total", wait, resource=resource)
+        return token, wait
+
+    def acquire(self, resource="core"):
+        token, wait = self.reserve(resource)
+        if wait:
+            time.sleep(wait)
+        return token
+
+    async def acquire_async(self, resource="core"):
+        token, wait = self.reserve(resource)
+        if wait:
+            await asyncio.sleep(wait)
+        return token
+
+    def update(self, token, headers, resource="core"):
+        """Refreshes a token's quota from the `X-RateLimit-*` response headers."""
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        resource = headers.get("X-RateLimit-Resource", resource)
+        if remaining is None or reset is None:
+            return
+        with self._lock:
+            bucket = self._bucket(token, resource)
+            bucket.remaining = int(remaining)
+            bucket.reset = float(reset)
+            if headers.get("X-RateLimit-Limit"):
+                bucket.limit = int(headers["X-RateLimit-Limit"])
+
+    def seed(self, token, rate_limit, resource="core"):
+        """Seeds a bucket from the `/rate_limit` payload (`{"remaining": .., "reset": ..}`)."""
+        with self._lock:
+            bucket = self._bucket(token, resource)
+            bucket.remaining = int(rate_limit["remaining"])
+            bucket.reset = float(rate_limit["reset"])
+            bucket.limit = rate_limit.get("limit")
+
+    def retry_delay(self, token, status_code, headers, body, attempt, resource="core"):
+        """
+        Seconds to sleep before retrying, or None if the response is final.
+        Primary and secondary rate limits block the token for every caller
+        instead, so the retry's own `reserve()` does the waiting.
+        """
+        limited = status_code == 429 or (status_code == 403 and (
+            headers.get("X-RateLimit-Remaining") == "0" or "rate limit" in body.lower()))
+
+        if limited:
+            if headers.get("Retry-After"):
+                delay = float(headers["Retry-After"])
+            elif headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset"):
+                delay = max(float(headers["X-RateLimit-Reset"]) - time.time(), 0) + 1
+            else:
+                delay = SECONDARY_LIMIT_WAIT + backoff_delay(attempt)
+            with self._lock:
+                bucket = self._bucket(token, resource)
+                bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + delay)
+            return 0.0  # The next reserve() waits out the block, or moves to a free token
+
+        if status_code in RETRYABLE_STATUS:
+            return backoff_delay(attempt)
+        return None
+
+
+_scheduler = None
+
+
+def get_scheduler():
+    """Process-wide scheduler shared by the REST, async and GraphQL paths."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RateLimitScheduler()
+    return _scheduler
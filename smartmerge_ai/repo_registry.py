@@ -0,0 +1,130 @@
+# 🔥 Warm per-repo resources for the API: vector stores and stats opened once per owner/repo, shared clients, LRU eviction
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .config import REPO_CACHE_SIZE, REPO_IDLE_TTL
+from .pr_records import repo_key
+from .ragLLM import get_llm
+from .stats_index import StatsIndex
+from .vector_store import embeddings_path, open_pr_store
+
+
+class RepoResources:
+    """The open stores of one repo, created on first use."""
+
+    def __init__(self, repo):
+        self.repo = repo  # repo_key
+        self.users = 0  # Jobs currently holding the resources; never evicted while > 0
+        self.last_used = time.time()
+        self._closed_db = None
+        self._stats = None
+        self._lock = threading.Lock()
+
+    @property
+    def closed_db(self):
+        with self._lock:
+            if self._closed_db is None:
+                self._closed_db = open_pr_store(embeddings_path("closed", self.repo))
+            return self._closed_db
+
+    @property
+    def stats(self):
+        with self._lock:
+            if self._stats is None:
+                self._stats = StatsIndex(self.repo)
+            return self._stats
+
+    def reload_stats(self):
+        """Drops the in-memory stats so the next use reads what a sync just wrote."""
+        with self._lock:
+            if self._stats is not None:
+                self._stats.close()
+            self._stats = None
+
+    def close(self):
+        with self._lock:
+            for resource in (self._closed_db, self._stats):
+                close = getattr(resource, "close", None)
+                if close:
+                    close()
+            self._closed_db = self._stats = None
+
+
+class RepoRegistry:
+    """
+    Process-wide cache of RepoResources keyed by `owner/repo`, plus the chat
+    client every repo shares. Repos unused for `idle_ttl` seconds, and the
+    least recently used beyond `max_repos`, are closed unless a job is still
+    using them; `evict_idle` keeps doing so while no job comes by.
+    """
+
+    def __init__(self, max_repos=REPO_CACHE_SIZE, idle_ttl=REPO_IDLE_TTL):
+        self.max_repos = max_repos
+        self.idle_ttl = idle_ttl
+        self._repos = OrderedDict()  # Least recently used first
+        self._lock = threading.Lock()
+        self._llm = None
+
+    @property
+    def llm(self):
+        with self._lock:
+            if self._llm is None:
+                self._llm = get_llm()
+            return self._llm
+
+    @contextmanager
+    def use(self, repo_owner, repo_name):
+        """Holds a repo's resources for the duration of a job."""
+        resources = self._checkout(repo_key(repo_owner, repo_name))
+        try:
+            yield resources
+        finally:
+            with self._lock:
+                resources.users -= 1
+                resources.last_used = time.time()
+            self.evict()
+
+    def _checkout(self, repo):
+        with self._lock:
+            resources = self._repos.pop(repo, None) or RepoResources(repo)
+            self._repos[repo] = resources
+            resources.users += 1
+            resources.last_used = time.time()
+        self.evict()
+        return resources
+
+    def evict(self):
+        """Closes idle repos: expired ones first, then the least recently used above `max_repos`."""
+        expired = []
+        with self._lock:
+            now = time.time()
+            idle = [repo for repo, resources in self._repos.items() if not resources.users]
+            for repo in idle:
+                if now - self._repos[repo].last_used > self.idle_ttl or len(self._repos) > self.max_repos:
+                    expired.append(self._repos.pop(repo))
+        for resources in expired:
+            resources.close()
+        return len(expired)
+
+    async def evict_idle(self):
+        """Runs `evict` every `idle_ttl` seconds until cancelled, so a quiet API still closes idle repos."""
+        while True:
+            await asyncio.sleep(max(self.idle_ttl, 1))
+            await asyncio.to_thread(self.evict)
+
+    def __contains__(self, repo):
+        with self._lock:
+            return repo in self._repos
+
+    def __len__(self):
+        with self._lock:
+            return len(self._repos)
+
+    def close(self):
+        with self._lock:
+            repos, self._repos = list(self._repos.values()), OrderedDict()
+        for resources in repos:
+            resources.close()
@@ -0,0 +1,175 @@
+# 📊 Aggregate merge statistics of the closed PRs (per path, directory, author, base branch), updated incrementally
+import json
+import os
+import sqlite3
+import threading
+
+from .diff_model import line_counts
+from .pr_dataset import BATCH_SIZE, DATASET_PATH, iter_raw_prs
+from .pr_records import is_merged, path_prefixes
+
+# Kinds of keys; "repo" holds the totals under the empty key
+STATS_KINDS = ("repo", "path", "dir", "author", "branch")
+COUNTERS = ("prs", "merged", "conflicts", "churn")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stats (
+    kind TEXT, key TEXT,
+    prs INTEGER, merged INTEGER, conflicts INTEGER, churn INTEGER,
+    PRIMARY KEY (kind, key)
+);
+CREATE TABLE IF NOT EXISTS contributions (
+    pr_number INTEGER PRIMARY KEY,
+    entries TEXT
+);
+"""
+
+
+def stats_path(repo_name):
+    return os.path.join(DATASET_PATH, f"{repo_name}_stats.sqlite")
+
+
+def pr_contribution(pr):
+    """`[(kind, key, prs, merged, conflicts, churn)]` a closed PR adds to the index; nothing for an open PR."""
+    if pr.get("State") != "closed":
+        return []
+    merged = int(is_merged(pr))
+    conflict = int(bool(pr.get("Merge Conflict")))
+    churn_by_path = {}
+    for fc in pr.get("File Changes", []):
+        added, removed = line_counts(fc)
+        path = fc.get("Filename", "")
+        churn_by_path[path] = churn_by_path.get(path, 0) + added + removed
+    total = sum(churn_by_path.values())
+
+    entries = [("repo", "", 1, merged, conflict, total)]
+    entries.extend(("path", path, 1, merged, conflict, churn) for path, churn in churn_by_path.items())
+    for prefix in path_prefixes(churn_by_path):
+        churn = sum(c for path, c in churn_by_path.items() if path.startswith(prefix))
+        entries.append(("dir", prefix, 1, merged, conflict, churn))
+    if pr.get("Author"):
+        entries.append(("author", pr["Author"], 1, merged, conflict, total))
+    if pr.get("Base Branch"):
+        entries.append(("branch", pr["Base Branch"], 1, merged, conflict, total))
+    return entries
+
+
+def _as_stats(counters):
+    prs, merged, conflicts, churn = counters
+    return {"prs": prs, "merged": merged, "conflicts": conflicts, "churn": churn,
+            "merge_rate": merged / prs if prs else None}
+
+
+class StatsIndex:
+    """
+    Per-path, per-directory, per-author and per-base-branch counts of closed
+    PRs, merges, merge conflicts and changed lines, persisted in
+    `data/dataset/{repo}_stats.sqlite` and held in memory for O(1) lookups.
+    `update` applies synced PRs as deltas: each PR's previous contribution is
+    stored, subtracted and replaced, so re-synced or reopened PRs never count twice.
+    """
+
+    def __init__(self, repo_name, path=None):
+        self.stats_file = path or stats_path(repo_name)
+        os.makedirs(os.path.dirname(self.stats_file), exist_ok=True)
+        self._connection = sqlite3.connect(self.stats_file, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._stats = {(kind, key): list(counters) for kind, key, *counters
+                       in self._connection.execute(f"SELECT kind, key, {', '.join(COUNTERS)} FROM stats")}
+
+    def close(self):
+        self._connection.close()
+
+    def update(self, prs):
+        """Applies PR dicts (any state) in transactions of BATCH_SIZE; returns how many were applied."""
+        count, batch = 0, []
+        for pr in prs:
+            batch.append(pr)
+            if len(batch) >= BATCH_SIZE:
+                count += self._apply(batch)
+                batch = []
+        if batch:
+            count += self._apply(batch)
+        return count
+
+    def _apply(self, prs):
+        with self._lock, self._connection:
+            numbers = [pr["PR Number"] for pr in prs]
+            previous = dict(self._connection.execute(
+                f"SELECT pr_number, entries FROM contributions WHERE pr_number IN ({','.join('?' * len(numbers))})",
+                numbers))
+            touched = set()
+            for pr in prs:
+                old = json.loads(previous.pop(pr["PR Number"], "[]"))
+                new = pr_contribution(pr)
+                for sign, entries in ((-1, old), (1, new)):
+                    for kind, key, *deltas in entries:
+                        counters = self._stats.setdefault((kind, key), [0] * len(COUNTERS))
+                        for position, delta in enumerate(deltas):
+                            counters[position] += sign * delta
+                        touched.add((kind, key))
+                previous[pr["PR Number"]] = json.dumps(new) if new else None
+
+            self._connection.executemany(
+                "DELETE FROM contributions WHERE pr_number = ?",
+                [(number,) for number, entries in previous.items() if entries is None])
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO contributions (pr_number, entries) VALUES (?, ?)",
+                [(number, entries) for number, entries in previous.items() if entries is not None])
+
+            emptied = [key for key in touched if self._stats[key][0] <= 0]
+            for key in emptied:
+                del self._stats[key]
+            self._connection.executemany("DELETE FROM stats WHERE kind = ? AND key = ?", emptied)
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO stats (kind, key, {', '.join(COUNTERS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                [(kind, key, *self._stats[kind, key]) for kind, key in touched if (kind, key) in self._stats])
+        return len(prs)
+
+    # Lookups: `{"prs", "merged", "conflicts", "churn", "merge_rate"}`, or None for an unseen key
+
+    def lookup(self, kind, key):
+        counters = self._stats.get((kind, key))
+        return _as_stats(counters) if counters else None
+
+    def totals(self):
+        return self.lookup("repo", "") or _as_stats([0] * len(COUNTERS))
+
+    def path(self, path):
+        return self.lookup("path", path)
+
+    def directory(self, directory):
+        return self.lookup("dir", directory if directory.endswith("/") else directory + "/")
+
+    def author(self, author):
+        return self.lookup("author", author)
+
+    def branch(self, branch):
+        return self.lookup("branch", branch)
+
+    def counters(self, kind):
+        """`{key: (prs, merged, conflicts, churn)}` of every key of `kind`."""
+        return {key: tuple(counters) for (k, key), counters in self._stats.items() if k == kind}
+
+    def __len__(self):
+        return self.totals()["prs"]
+
+
+def build_stats(repo_name):
+    """(Re)builds the index from the raw closed-PR file, streaming it."""
+    if os.path.exists(stats_path(repo_name)):
+        os.remove(stats_path(repo_name))
+    stats = StatsIndex(repo_name)
+    stats.update(iter_raw_prs("closed", repo_name))
+    print(f"Indexed merge statistics of {len(stats)} closed PRs in {stats.stats_file}")
+    return stats
+
+
+def update_stats(repo_name, prs):
+    """Applies synced PRs to the index; builds it from the raw files first if there is none yet."""
+    if not os.path.exists(stats_path(repo_name)):
+        return build_stats(repo_name)
+    stats = StatsIndex(repo_name)
+    stats.update(prs)
+    return stats
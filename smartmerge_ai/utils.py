@@ -1 +1,24 @@
- # 🛠️ Helper functions (logging, formatting)
\ No newline at end of file
+ # 🛠️ Helper functions (logging, formatting)
+
+
+def format_seconds(seconds):
+    """`850ms`, `12.3s` or `4m05s`."""
+    if seconds < 1:
+        return f"{seconds * 1000:.0f}ms"
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, seconds = divmod(round(seconds), 60)
+    return f"{minutes}m{seconds:02d}s"
+
+
+def format_bytes(size):
+    """`512 B`, `3.4 KB`, `1.2 MB`, ..."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_rate(rate):
+    """A hit rate as `87%`, or `-` when nothing was looked up."""
+    return "-" if rate is None else f"{rate:.0%}"
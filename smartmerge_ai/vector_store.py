@@ -2,24 +2,38 @@
 import os
 import json
 from dotenv import load_dotenv
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from .diff_model import with_diff_views
+from .config import DATA_DIR, VECTOR_STORE_BACKEND
+from .embedding_backends import collection_name, get_embedding_backend
+from .embedding_cache import sync_texts
+from .metrics import span
+from .pr_records import is_merged, path_prefixes
+from .pr_stream import iter_jsonl
 
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 # Correct paths for ChromaDB storage
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))   # Get current working directory
-CLOSED_PR_DB_PATH = os.path.join(BASE_DIR, "data", "embeddings", "closed_pr")
-OPEN_PR_DB_PATH = os.path.join(BASE_DIR, "data", "embeddings", "open_pr") 
+CLOSED_PR_DB_PATH = os.path.join(DATA_DIR, "embeddings", "closed_pr")
+OPEN_PR_DB_PATH = os.path.join(DATA_DIR, "embeddings", "open_pr") 
 
 
 # Load PR Data
 def load_pr_data(json_file):
     with open(json_file, 'r') as file:
-        return json.load(file)
+        return [with_diff_views(pr) for pr in json.load(file)]
+
+
+# Stream PR Data one record at a time (JSON Lines written by the extractors,
+# only ever replaced by a complete run)
+def iter_pr_data(pr_file):
+    jsonl_file = pr_file if pr_file.endswith(".jsonl") else pr_file[:-len(".json")] + ".jsonl"
+    if os.path.exists(jsonl_file):
+        yield from (with_diff_views(pr) for pr in iter_jsonl(jsonl_file))
+    else:
+        yield from load_pr_data(jsonl_file[:-len(".jsonl")] + ".json")
 
 
 
@@ -49,44 +63,209 @@ def format_closed_prs(closed_prs):
 
 # Split large text into smaller chunks
 def chunk_data(data, chunk_size=500):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter  # Heavy; imported on first use
     splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=50)
     return splitter.split_text("\n".join(data))
 
-# Initialize RAG-based retrieval system with chunked data
-def initialize_retriever(closed_pr_texts):
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-large", openai_api_key=OPENAI_API_KEY)
-    chunked_texts = chunk_data(closed_pr_texts)
-    vector_store = Chroma.from_texts(chunked_texts, embeddings)
-    return vector_store.as_retriever()
 
+def pr_metadata(pr):
+    """Chroma metadata of a PR's chunks; `paths` / `dirs` are left out when empty (Chroma rejects empty lists)."""
+    metadata = {
+        "pr_number": int(pr.get("PR Number", 0)),
+        "state": pr.get("State", "unknown"),
+        "author": pr.get("Author", "unknown"),
+        "base_branch": pr.get("Base Branch", "unknown"),
+        "merged": is_merged(pr),
+    }
+    if pr.get("Head SHA"):
+        metadata["head_sha"] = pr["Head SHA"]
+    paths = [fc["Filename"] for fc in pr.get("File Changes", []) if fc.get("Filename")]
+    dirs = path_prefixes(paths)
+    if paths:
+        metadata["paths"] = paths
+    if dirs:
+        metadata["dirs"] = dirs
+    return metadata
 
 
-def initialize_and_persist_chromadb(closed_pr_file, open_pr_file):
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-large", openai_api_key=OPENAI_API_KEY)
+# Chunk each PR on its own so chunks never straddle two PRs and carry the PR's metadata
+def build_pr_documents(prs, chunk_size=500):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=50, add_start_index=True)
+    texts, metadatas = [], []
+    for pr in prs:
+        metadata = pr_metadata(pr)
+        documents = splitter.create_documents(format_closed_prs([pr]))
+        for position, document in enumerate(documents):
+            texts.append(document.page_content)
+            metadatas.append({**metadata, "chunk": position, "start": document.metadata["start_index"]})
+    return texts, metadatas
 
-    # Load and format PRs
-    print("Loading PR data")
-    closed_prs = format_closed_prs(load_pr_data(closed_pr_file))
-    open_prs = format_closed_prs(load_pr_data(open_pr_file))
 
-    print(f" Loaded {len(closed_prs)} closed PRs and {len(open_prs)} open PRs.")
+def pr_filter(pr_number=None, state=None, author=None, base_branch=None, merged=None, path_prefix=None):
+    """
+    Builds a Chroma `where` clause from PR attributes, e.g.
+    `pr_filter(state="closed", base_branch="main", path_prefix="src/core/")`.
+    `path_prefix` matches a touched directory (trailing slash) or an exact file path.
+    """
+    clauses = [{key: value} for key, value in (
+        ("pr_number", pr_number), ("state", state), ("author", author),
+        ("base_branch", base_branch), ("merged", merged)) if value is not None]
+    if path_prefix is not None:
+        key = "dirs" if path_prefix.endswith("/") else "paths"
+        clauses.append({key: {"$contains": path_prefix}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
 
-    # Split into smaller chunks
-    print(" Chunking PR data...")
-    closed_chunks = chunk_data(closed_prs)
-    open_chunks = chunk_data(open_prs)
 
-    print(f" Created {len(closed_chunks)} chunks for closed PRs and {len(open_chunks)} for open PRs.")
+def search_prs(vector_db, query, k=5, **filters):
+    """Similarity search restricted to the PR chunks matching `pr_filter(**filters)`."""
+    return vector_db.similarity_search(query, k=k, filter=pr_filter(**filters))
 
-    # Store in ChromaDB
-    print("Storing embeddings in ChromaDB...")
-    closed_db = Chroma.from_texts(closed_chunks, embeddings, persist_directory=CLOSED_PR_DB_PATH)
-    open_db = Chroma.from_texts(open_chunks, embeddings, persist_directory=OPEN_PR_DB_PATH)
 
+def stored_pr_numbers(vector_db, where=None, page_size=1000):
+    """PR numbers present in `vector_db`, in storage order, read page by page from the metadata alone."""
+    seen = set()
+    offset = 0
+    while True:
+        page = vector_db.get(where=where, limit=page_size, offset=offset, include=["metadatas"])
+        for metadata in page["metadatas"]:
+            number = (metadata or {}).get("pr_number")
+            if number is not None and number not in seen:
+                seen.add(number)
+                yield number
+        if len(page["ids"]) < page_size:
+            return
+        offset += page_size
+
+
+def join_chunks(parts):
+    """
+    Rebuilds a PR text from its `(start, chunk)` parts, sorted by start offset,
+    dropping the overlap the splitter repeated between neighbours.
+    """
+    text, end = "", 0  # `end`: offset in the original text where `text` stops
+    for start, chunk in parts:
+        if start is None or start < 0 or start > end:  # Unknown position, or whitespace stripped between chunks
+            text = text + "\n" + chunk if text else chunk
+        else:
+            text += chunk[end - start:]
+        end = max(end, (start or 0) + len(chunk))
+    return text
+
+
+def get_stored_prs(vector_db, pr_numbers):
+    """Returns `[(metadata, text)]` for the given PR numbers (in that order), chunks joined back in order."""
+    page = vector_db.get(where={"pr_number": {"$in": list(pr_numbers)}}, include=["documents", "metadatas"])
+    chunks = {}
+    for text, metadata in zip(page["documents"], page["metadatas"]):
+        chunks.setdefault(metadata["pr_number"], []).append((metadata.get("chunk", 0), text, metadata))
+    prs = []
+    for number in pr_numbers:
+        parts = sorted(chunks.get(number, []), key=lambda part: part[0])
+        if parts:
+            metadata = {key: value for key, value in parts[0][2].items() if key not in ("chunk", "start")}
+            prs.append((metadata, join_chunks((part.get("start"), text) for _, text, part in parts)))
+    return prs
+
+
+def iter_stored_prs(vector_db, where=None, page_size=100):
+    """
+    Streams every PR stored in `vector_db` exactly once as `(metadata, text)`,
+    the text being its chunks joined back in order. Reads the collection
+    directly (no embedding call, no vector search) and holds at most
+    `page_size` PRs' chunks at a time. The texts of an open-PR store built by
+    `initialize_and_persist_chromadb` can go straight to `evaluate_open_pr`.
+    """
+    numbers = stored_pr_numbers(vector_db, where)
+    while True:
+        batch = [number for _, number in zip(range(page_size), numbers)]
+        if not batch:
+            return
+        yield from get_stored_prs(vector_db, batch)
+
+# Embeddings of the configured backend (EMBEDDING_BACKEND), one shared instance per backend
+def get_embeddings(backend=None):
+    return get_embedding_backend(backend)
+
+
+# Vector store implementation: Chroma, or the memory-mapped exact index (VECTOR_STORE_BACKEND)
+def vector_store_class(name=None):
+    name = name or VECTOR_STORE_BACKEND
+    if name == "chroma":
+        from .chroma_store import ChromaStore  # Pulls in chromadb; imported on first use
+        return ChromaStore
+    if name == "memmap":
+        from .memmap_index import MemmapIndex
+        return MemmapIndex
+    raise ValueError(f"Unknown vector store backend: {name} (expected chroma or memmap)")
+
+
+# Persist directory of a repo's `open` or `closed` PR store (`repo` is its repo_key; None = the shared legacy store)
+def embeddings_path(state, repo=None):
+    if repo is None:
+        return CLOSED_PR_DB_PATH if state == "closed" else OPEN_PR_DB_PATH
+    return os.path.join(DATA_DIR, "embeddings", repo, f"{state}_pr")
+
+
+# Persisted PR store of one embedding backend: each backend keeps its own collection
+# (`embeddings` overrides the backend's shared instance, e.g. a wrapper around it)
+def open_pr_store(persist_directory, backend=None, embeddings=None):
+    store_class = vector_store_class()
+    embeddings = embeddings or get_embeddings(backend)
+    if VECTOR_STORE_BACKEND == "memmap":
+        return store_class(embeddings, os.path.join(persist_directory, collection_name(backend)))
+    return store_class(collection_name=collection_name(backend), embedding_function=embeddings,
+                  persist_directory=persist_directory)
+
+# Initialize RAG-based retrieval system with chunked data
+# (`closed_prs` are PR dicts or already formatted texts; `where` narrows retrieval, see pr_filter)
+def initialize_retriever(closed_prs, where=None):
+    embeddings = get_embeddings()
+    if closed_prs and isinstance(closed_prs[0], dict):
+        texts, metadatas = build_pr_documents(closed_prs)
+    else:
+        texts, metadatas = chunk_data(closed_prs), None
+    vector_store = vector_store_class().from_texts(texts, embeddings, metadatas=metadatas)
+    return vector_store.as_retriever(search_kwargs={"filter": where} if where else {})
+
+
+
+def persist_closed_prs(closed_pr_file, backend=None, repo=None):
+    """
+    Syncs the closed PRs of `closed_pr_file` into the repo's closed-PR store
+    (only new chunks are embedded) and returns the store. Open PRs are
+    evaluated straight from their data file, so this is all a run embeds.
+    """
+    print("Loading closed PR data")
+    with span("vector_store.load"):
+        closed_prs = load_pr_data(closed_pr_file)
+    print(f" Loaded {len(closed_prs)} closed PRs.")
+
+    with span("vector_store.chunk", prs=len(closed_prs)):
+        closed_chunks, closed_metadatas = build_pr_documents(closed_prs)
+    print(f" Created {len(closed_chunks)} chunks for closed PRs.")
+
+    print("Storing embeddings in ChromaDB...")
+    closed_db = open_pr_store(embeddings_path("closed", repo), backend)
+    sync_texts(closed_db, closed_chunks, closed_metadatas)
     closed_db.persist()
-    open_db.persist()
     print("✅ ChromaDB storage complete!")
+    return closed_db
+
 
-    return closed_db,open_db
+def initialize_and_persist_chromadb(closed_pr_file, open_pr_file, backend=None, repo=None):
+    """Builds both the closed- and the open-PR store; returns `(closed_db, open_db)`."""
+    closed_db = persist_closed_prs(closed_pr_file, backend, repo)
 
+    with span("vector_store.load"):
+        open_prs = load_pr_data(open_pr_file)
+    with span("vector_store.chunk", prs=len(open_prs)):
+        open_chunks, open_metadatas = build_pr_documents(open_prs)
+    print(f" Created {len(open_chunks)} chunks for {len(open_prs)} open PRs.")
 
+    open_db = open_pr_store(embeddings_path("open", repo), backend)
+    sync_texts(open_db, open_chunks, open_metadatas)
+    open_db.persist()
+    return closed_db, open_db
@@ -0,0 +1,104 @@
+# 🗳️ Persistent LLM verdict cache: unchanged PRs are never re-evaluated (TTL + LRU size eviction)
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .config import DATA_DIR, VERDICT_CACHE_MAX_ENTRIES, VERDICT_CACHE_TTL
+from .diff_model import patch_of
+from .metrics import inc
+
+VERDICT_CACHE_FILE = os.path.join(DATA_DIR, "cache", "verdicts.sqlite")
+
+
+def pr_fingerprint(open_pr, open_pr_text, prompt_template, model_name):
+    """
+    sha256 over everything a verdict depends on: the model, the prompt
+    template, the text sent to the LLM and, for PR dicts, the head SHA,
+    every patch and every comment.
+    """
+    parts = [model_name, prompt_template, open_pr_text]
+    if isinstance(open_pr, dict):
+        parts.append(open_pr.get("Head SHA"))
+        parts.extend([fc.get("Filename"), fc.get("Status"), patch_of(fc)]
+                     for fc in open_pr.get("File Changes", []))
+        parts.extend([c.get("User"), c.get("Created At"), c.get("Body")]
+                     for c in open_pr.get("Old Comments", []) + open_pr.get("New Comments", []))
+    return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+
+class VerdictCache:
+    """
+    SQLite store of evaluation results keyed by `(pr_number, fingerprint)`.
+    Entries older than `ttl` seconds are ignored and purged; beyond
+    `max_entries` the least recently used ones are evicted.
+    """
+
+    def __init__(self, cache_file=VERDICT_CACHE_FILE, ttl=VERDICT_CACHE_TTL, max_entries=VERDICT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        self._connection = sqlite3.connect(cache_file, check_same_thread=False)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS verdicts (
+                pr_number TEXT, fingerprint TEXT, result TEXT,
+                created_at REAL, used_at REAL,
+                PRIMARY KEY (pr_number, fingerprint)
+            );
+            CREATE INDEX IF NOT EXISTS verdicts_used ON verdicts (used_at);
+        """)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, pr_number, fingerprint):
+        """Returns the cached result, or None when missing or expired."""
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT result FROM verdicts WHERE pr_number = ? AND fingerprint = ? AND created_at >= ?",
+                (str(pr_number), fingerprint, now - self.ttl)).fetchone()
+            if row is None:
+                self.misses += 1
+                inc("cache_requests_total", cache="verdict", result="miss")
+                return None
+            self._connection.execute(
+                "UPDATE verdicts SET used_at = ? WHERE pr_number = ? AND fingerprint = ?",
+                (now, str(pr_number), fingerprint))
+        self.hits += 1
+        inc("cache_requests_total", cache="verdict", result="hit")
+        return json.loads(row[0])
+
+    def put(self, pr_number, fingerprint, result):
+        """Stores a result (superseded fingerprints of the PR age out through TTL / LRU eviction)."""
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO verdicts (pr_number, fingerprint, result, created_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                (str(pr_number), fingerprint, json.dumps(result), now, now))
+
+    def evict(self):
+        """Drops expired entries, then the least recently used ones above `max_entries`."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM verdicts WHERE created_at < ?", (time.time() - self.ttl,))
+            self._connection.execute(
+                "DELETE FROM verdicts WHERE rowid IN "
+                "(SELECT rowid FROM verdicts ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,))
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+
+
+_cache = None
+
+
+def get_verdict_cache():
+    """Process-wide VerdictCache."""
+    global _cache
+    if _cache is None:
+        _cache = VerdictCache()
+    return _cache
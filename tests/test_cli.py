@@ -1,4 +1,100 @@
- # 🖥️ Tests CLI commands
+# 🖥️ Tests CLI commands
+import json
+
 import pytest
 
-pytest.RunResult()
\ No newline at end of file
+from smartmerge_ai import cli
+
+
+class FakeStore:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def get(self, include=None):
+        return {"ids": [f"chunk-{n}" for n in range(self.chunks)]}
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    """Stubs the three stages; records the calls they receive."""
+    calls = []
+
+    def fetch_repo(owner, name, mode=None, backend=None):
+        calls.append(("fetch", f"{owner}/{name}", mode, backend))
+        if owner == "broken":
+            raise RuntimeError("GitHub said no")
+        return {"closed": 3, "open": 2}
+
+    def embed_repo(owner, name):
+        calls.append(("embed", f"{owner}/{name}"))
+        return FakeStore(5)
+
+    def evaluate_repo(owner, name, concurrency=None):
+        calls.append(("evaluate", f"{owner}/{name}", concurrency))
+        return {7: {"response": "Safe to merge.", "merge_percentage": "85%"},
+                8: {"response": "Needs review.", "merge_percentage": "60%"}}
+
+    monkeypatch.setattr(cli, "fetch_repo", fetch_repo)
+    monkeypatch.setattr(cli, "embed_repo", embed_repo)
+    monkeypatch.setattr(cli, "evaluate_repo", evaluate_repo)
+    return calls
+
+
+def read_records(path):
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+@pytest.mark.parametrize("argv, message", [
+    (["fetch"], "no repos given"),
+    (["fetch", "not-a-repo"], "expected OWNER/REPO"),
+    (["evaluate", "owner/"], "expected OWNER/REPO"),
+    (["fetch", "a/b", "--mode", "sometimes"], "invalid choice"),
+    (["embed", "a/b", "--backend", "rest"], "unrecognized arguments"),
+])
+def test_argument_errors(argv, message, capsys):
+    with pytest.raises(SystemExit) as error:
+        cli.main(argv)
+    assert error.value.code == 2
+    assert message in capsys.readouterr().err
+
+
+def test_all_writes_json_lines(stages, tmp_path):
+    output = tmp_path / "out.jsonl"
+    code = cli.main(["all", "a/one", "b/two", "a/one", "--mode", "incremental", "--backend", "graphql",
+                     "--llm-concurrency", "3", "--no-table", "-o", str(output)])
+    assert code == 0
+
+    records = read_records(output)
+    for repo in ("a/one", "b/two"):
+        repo_records = [record for record in records if record["repo"] == repo]
+        assert [(record["type"], record.get("stage")) for record in repo_records] == [
+            ("stage", "fetch"), ("stage", "embed"), ("prediction", None), ("prediction", None), ("stage", "evaluate")]
+        fetch, embed, first, second, evaluate = repo_records
+        assert fetch["status"] == "ok" and fetch["prs"] == {"closed": 3, "open": 2}
+        assert embed["chunks"] == {"closed": 5}
+        assert first == {"type": "prediction", "repo": repo, "pr_number": 7, "response": "Safe to merge.",
+                         "merge_percentage": "85%"}
+        assert second["pr_number"] == 8
+        assert evaluate["predictions"] == 2
+        assert all(record["seconds"] >= 0 for record in (fetch, embed, evaluate))
+
+    assert sorted(stages) == sorted([
+        ("fetch", "a/one", "incremental", "graphql"), ("embed", "a/one"), ("evaluate", "a/one", 3),
+        ("fetch", "b/two", "incremental", "graphql"), ("embed", "b/two"), ("evaluate", "b/two", 3)])
+
+
+def test_failed_stage_stops_its_repo_only(stages, tmp_path, capsys):
+    repo_list = tmp_path / "repos.txt"
+    repo_list.write_text("# Repos to refresh\nbroken/repo\n\nok/repo  # fine\n")
+    code = cli.main(["all", "-r", str(repo_list), "--no-table", "-w", "1"])
+    assert code == 1
+
+    captured = capsys.readouterr()
+    records = [json.loads(line) for line in captured.out.splitlines()]
+    broken = [record for record in records if record["repo"] == "broken/repo"]
+    assert broken == [{"type": "stage", "repo": "broken/repo", "stage": "fetch", "status": "error",
+                       "error": "RuntimeError: GitHub said no", "seconds": broken[0]["seconds"]}]
+    assert [record.get("stage") for record in records if record["repo"] == "ok/repo"] == [
+        "fetch", "embed", None, None, "evaluate"]
+    assert "failed: broken/repo" in captured.err
@@ -0,0 +1,40 @@
+# 🧩 Tests the prompt context of one open PR: compact summary and merge history
+from smartmerge_ai.context_builder import assemble_context
+from smartmerge_ai.diff_model import compact_file_change
+from smartmerge_ai.ragLLM import REFERENCE_CLAUSE, build_messages
+from smartmerge_ai.stats_index import StatsIndex
+
+
+def make_pr(number, state, author, paths, merged=False, conflict=False):
+    return {
+        "PR Number": number, "Title": f"Change {number}", "State": state, "Author": author,
+        "Created Date": "2024-01-01T00:00:00Z", "Merged Date": "2024-01-02T00:00:00Z" if merged else "Not merged",
+        "Base Branch": "main", "Head Branch": f"feature/{number}", "Merge Conflict": conflict,
+        "File Changes": [compact_file_change(path, "modified", "@@ -1,1 +1,2 @@\n-old\n+new\n+more")
+                         for path in paths],
+        "Old Comments": [], "New Comments": [{"User": "reviewer", "Body": "Looks fine"}],
+    }
+
+
+def test_prompt_from_pr_dict_carries_summary_and_history(tmp_path):
+    stats = StatsIndex("owner/repo", path=str(tmp_path / "stats.sqlite"))
+    stats.update([
+        make_pr(1, "closed", "alice", ["src/core/db.py"], merged=True),
+        make_pr(2, "closed", "alice", ["src/core/db.py"], conflict=True),
+        make_pr(3, "closed", "bob", ["docs/index.md"], merged=True),
+    ])
+    open_pr = make_pr(10, "open", "alice", ["src/core/db.py", "docs/index.md"])
+
+    context = assemble_context(open_pr, None, stats=stats)
+    prompt = build_messages(context)[1]["content"]
+    stats.close()
+
+    assert "PR #10: Change 10 by alice, feature/10 -> main, merge conflict: no" in prompt
+    assert "Files (2, +4/-2):" in prompt
+    assert "- reviewer: Looks fine" in prompt
+    assert "History:" in prompt
+    assert "Author alice: 1 of 2 closed PRs merged (50%), 1 with conflicts" in prompt
+    assert "Base branch main: 2 of 3 closed PRs merged (67%), 1 with conflicts" in prompt
+    assert "Path src/core/db.py: 1 of 2 closed PRs merged (50%), 1 with conflicts" in prompt
+    assert "Path docs/index.md" not in prompt  # Always merged, so not a risky path
+    assert REFERENCE_CLAUSE not in prompt  # No closed store, so no similar PRs to point at
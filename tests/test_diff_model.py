@@ -0,0 +1,59 @@
+# ✂️ Tests the compact diff model against the legacy Added / Removed / Full Diff parse
+import json
+
+import pytest
+
+from smartmerge_ai.diff_model import CompactDiff, FileChange, line_counts, patch_of, with_diff_views
+from smartmerge_ai.pr_records import parse_file_changes
+
+SAMPLE_PATCH = "\n".join([
+    "@@ -1,5 +1,6 @@",
+    " import os",
+    "-import sys",
+    "+import json",
+    "+import time",
+    " ",
+    "@@ -20,4 +21,4 @@ def main():",
+    "-    return sys.argv",
+    "+    return json.dumps(os.environ)",
+    "---- a line of dashes removed",
+    "++++ a line of pluses added",
+    "\\ No newline at end of file",
+    "",
+])
+
+FILES = [
+    {"filename": "src/app.py", "status": "modified", "patch": SAMPLE_PATCH},
+    {"filename": "assets/logo.png", "status": "added"},  # Binary: no patch
+]
+
+
+@pytest.mark.parametrize("file", FILES, ids=lambda file: file["filename"])
+def test_compact_views_match_legacy_parse(file):
+    legacy, = parse_file_changes([file], compact=False)
+    compact, = parse_file_changes([file], compact=True)
+
+    assert isinstance(compact, FileChange)
+    for key in ("Added Lines", "Removed Lines", "Full Diff"):
+        assert compact[key] == legacy[key]
+        assert compact.get(key) == legacy[key]
+        assert key in compact
+    assert line_counts(compact) == line_counts(legacy)
+    assert patch_of(compact) == patch_of(legacy) == file.get("patch", "")
+
+
+def test_stats_and_hunks():
+    diff = CompactDiff(SAMPLE_PATCH)
+    assert diff.stats() == {"Additions": 3, "Deletions": 2, "Hunks": 2}
+    assert list(diff.hunk_headers()) == ["@@ -1,5 +1,6 @@", "@@ -20,4 +21,4 @@ def main():"]
+    assert diff.line(2) == "-import sys"
+
+
+def test_legacy_keys_are_never_serialized():
+    compact, = parse_file_changes(FILES[:1], compact=True)
+    stored = json.loads(json.dumps([compact]))[0]
+    assert set(stored) == {"Filename", "Status", "Patch", "Additions", "Deletions", "Hunks"}
+
+    reloaded = with_diff_views({"File Changes": [stored]})["File Changes"][0]
+    legacy, = parse_file_changes(FILES[:1], compact=False)
+    assert reloaded["Added Lines"] == legacy["Added Lines"]
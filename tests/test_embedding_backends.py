@@ -0,0 +1,47 @@
+# 🔌 Tests that hashing embeddings are deterministic and each backend keeps its own collection
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from smartmerge_ai import vector_store
+from smartmerge_ai.embedding_backends import HashingEmbeddings, collection_name, get_embedding_backend
+from smartmerge_ai.embedding_cache import sync_texts
+from smartmerge_ai.vector_store import open_pr_store
+
+TEXT = "Fix parse_file_changes for renamed files"
+
+
+def test_hashing_vectors_are_the_same_in_every_process():
+    vector = HashingEmbeddings(dim=32).embed_query(TEXT)
+    script = ("import json; from smartmerge_ai.embedding_backends import HashingEmbeddings; "
+              f"print(json.dumps(HashingEmbeddings(dim=32).embed_query({TEXT!r})))")
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    assert np.allclose(json.loads(output), vector)
+    assert len(vector) == 32 and np.linalg.norm(vector) == pytest.approx(1.0)
+
+
+def test_identifier_styles_share_features():
+    embeddings = HashingEmbeddings(dim=256)
+    snake, camel, other = np.array(embeddings.embed_documents(
+        ["parse_file_changes", "parseFileChanges", "update the README badge"]))
+    assert snake @ camel > 0.25 > abs(snake @ other)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown embedding backend"):
+        get_embedding_backend("word2vec")
+
+
+def test_each_backend_gets_its_own_collection(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "VECTOR_STORE_BACKEND", "chroma")
+    assert collection_name("hashing") != collection_name("openai")
+    hashing = open_pr_store(str(tmp_path), "hashing")
+    openai = open_pr_store(str(tmp_path), "openai", embeddings=HashingEmbeddings(dim=8))  # No API key needed
+    sync_texts(hashing, ["PR Number: 1, Title: Change 1"])
+    assert hashing.collection.name == "prs_hashing" and hashing.collection.count() == 1
+    assert openai.collection.name == "prs_openai" and openai.collection.count() == 0
+    hashing.close()
+    openai.close()
@@ -0,0 +1,65 @@
+# 🧠 Tests that chunks are embedded once per content hash and re-syncing a store is a no-op
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from smartmerge_ai.embedding_cache import CachedEmbeddings, sync_texts
+from smartmerge_ai.memmap_index import MemmapIndex
+
+
+class CountingEmbeddings(Embeddings):
+    """Tiny deterministic vectors; `calls` holds the texts of every provider request."""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), float(sum(map(ord, text)) % 97), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@pytest.fixture
+def provider():
+    return CountingEmbeddings()
+
+
+@pytest.fixture
+def cache_file(tmp_path):
+    return str(tmp_path / "cache" / "embeddings.sqlite")
+
+
+def test_only_texts_never_seen_reach_the_provider(provider, cache_file):
+    embeddings = CachedEmbeddings(provider, "model-a", cache_file)
+    first = embeddings.embed_documents(["alpha", "beta", "alpha"])
+    assert provider.calls == [["alpha", "beta"]]
+    assert first[0] == first[2]
+
+    assert embeddings.embed_documents(["beta", "gamma"])[0] == first[1]
+    assert provider.calls[-1] == ["gamma"]
+    assert (embeddings.hits, embeddings.misses) == (2, 3)
+
+    reopened = CachedEmbeddings(provider, "model-a", cache_file)
+    assert reopened.embed_documents(["alpha", "gamma"]) == [first[0], embeddings.embed_query("gamma")]
+    assert len(provider.calls) == 2  # Served from the cache file
+
+    CachedEmbeddings(provider, "model-b", cache_file).embed_documents(["alpha"])
+    assert provider.calls[-1] == ["alpha"]  # Another model never reuses these vectors
+
+
+def test_sync_is_idempotent_and_drops_stale_chunks(provider, cache_file, tmp_path):
+    store = MemmapIndex(CachedEmbeddings(provider, "model-a", cache_file), str(tmp_path / "index"))
+    texts = ["chunk one", "chunk two", "chunk one"]
+    metadatas = [{"pr_number": 1}, {"pr_number": 1}, {"pr_number": 2}]  # Same text, other PR: its own chunk
+
+    new_ids, stale_ids = sync_texts(store, texts, metadatas)
+    assert (len(new_ids), stale_ids, store.count()) == (3, [], 3)
+    assert provider.calls == [["chunk one", "chunk two"]]
+
+    assert sync_texts(store, texts, metadatas) == ([], [])
+    assert store.count() == 3 and len(provider.calls) == 1
+
+    new_ids, stale_ids = sync_texts(store, texts[:2], metadatas[:2])
+    assert (new_ids, len(stale_ids), store.count()) == ([], 1, 2)
+    store.close()
@@ -0,0 +1,60 @@
+# 🚚 Tests token-packed embedding batches and that a failing batch only loses its own chunks
+import pytest
+
+from smartmerge_ai import embedding_pipeline
+from smartmerge_ai.embedding_pipeline import embed_and_store, pack_batches
+
+
+@pytest.fixture(autouse=True)
+def one_token_per_char(monkeypatch):
+    monkeypatch.setattr(embedding_pipeline, "count_tokens", len)
+    monkeypatch.setattr(embedding_pipeline, "backoff_delay", lambda attempt: 0)
+
+
+def items(*texts):
+    return [(f"id-{n}", text, None) for n, text in enumerate(texts)]
+
+
+def test_batches_fill_up_to_the_token_budget():
+    batches = list(pack_batches(items("aaaa", "bbbb", "cc", "d"), max_tokens=10, max_items=100))
+    assert [([id_ for id_, _, _ in batch], tokens) for batch, tokens in batches] == [
+        (["id-0", "id-1", "id-2"], 10),  # Exactly at the budget
+        (["id-3"], 1),
+    ]
+
+
+def test_oversized_items_go_alone_and_max_items_caps_a_batch():
+    batches = list(pack_batches(items("a", "x" * 25, "b", "c", "d"), max_tokens=10, max_items=2))
+    assert [[text for _, text, _ in batch] for batch, _ in batches] == [["a"], ["x" * 25], ["b", "c"], ["d"]]
+
+
+class Store:
+    def __init__(self):
+        self.ids = []
+
+    def upsert_vectors(self, ids, embeddings, documents, metadatas=None):
+        assert len(embeddings) == len(ids) == len(documents)
+        self.ids.extend(ids)
+
+
+class FailingEmbeddings:
+    """Fails every batch holding `bad`; `calls` counts provider requests."""
+
+    def __init__(self, bad):
+        self.bad = bad
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.bad in texts:
+            raise RuntimeError("provider error")
+        return [[1.0, 0.0] for _ in texts]
+
+
+def test_failed_batch_is_retried_then_skipped(monkeypatch):
+    monkeypatch.setattr(embedding_pipeline, "pack_batches", lambda items: pack_batches(items, max_tokens=4))
+    store, embeddings = Store(), FailingEmbeddings("bad")
+    stored, failed = embed_and_store(store, embeddings, items("ok1", "bad", "ok2"), concurrency=2, max_retries=2)
+    assert sorted(stored) == sorted(store.ids) == ["id-0", "id-2"]
+    assert failed == ["id-1"]
+    assert embeddings.calls == 2 + 3  # The two good batches, the bad one with its two retries
@@ -0,0 +1,171 @@
+# 🔗 Tests the PR fetch backends, ETag cache, incremental sync and rate-limit scheduler against the fake GitHub
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+import pytest
+import requests
+
+from benchmarks.fake_services import FakeServices, SyntheticRepo
+from smartmerge_ai.diff_model import line_counts
+from smartmerge_ai.rate_limiter import RateLimitScheduler
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+OWNER, NAME = "fake", "repo"
+FILES_PATH = re.compile(rf"/repos/{OWNER}/{NAME}/(?:pulls|issues)/(\d+)/(?:files|comments)")
+
+
+@pytest.fixture
+def services():
+    with FakeServices([SyntheticRepo(OWNER, NAME, closed=12, open=4)], latency=0, jitter=0) as services:
+        yield services
+
+
+def fetch(services, data_dir, mode="full", backend="rest", check=True, **overrides):
+    """Runs `fetch_repo_prs` in a fresh interpreter (config is read at import) against `services`."""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, SMARTMERGE_DATA_DIR=str(data_dir), GITHUB_API_URL=services.url,
+               GITHUB_GRAPHQL_URL=f"{services.url}/graphql", GITHUB_TOKEN="test-token", GITHUB_TOKENS="test-token",
+               GRAPHQL_PATCHES="true", PR_DATASET_BACKEND="json")
+    env.update(overrides)
+    code = ("from smartmerge_ai.pr_sync import fetch_repo_prs; "
+            f"fetch_repo_prs({OWNER!r}, {NAME!r}, {mode!r}, {backend!r})")
+    return subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+                          check=check)
+
+
+def watermark(data_dir):
+    path = os.path.join(data_dir, "raw", "sync_state.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file).get(f"{OWNER}/{NAME}")
+
+
+def stored_prs(data_dir, state):
+    with open(os.path.join(data_dir, "raw", f"{state}_pr", OWNER, f"{NAME}_all_{state}_prs.json")) as file:
+        return json.load(file)
+
+
+def fetched_pr_numbers(log):
+    return {int(match.group(1)) for _, path, _ in log for match in [FILES_PATH.fullmatch(path)] if match}
+
+
+def test_backends_store_identical_records(services, tmp_path):
+    records = {}
+    for backend in ("rest", "async", "graphql"):
+        fetch(services, tmp_path / backend, backend=backend)
+        records[backend] = {state: stored_prs(tmp_path / backend, state) for state in ("closed", "open")}
+
+    assert [pr["PR Number"] for pr in records["rest"]["open"]] == [16, 15, 14, 13]
+    assert len(records["rest"]["closed"]) == 12
+    assert records["async"] == records["rest"]
+    assert records["graphql"] == records["rest"]
+
+
+def test_graphql_without_patches_keeps_line_counts(services, tmp_path):
+    fetch(services, tmp_path / "rest")
+    fetch(services, tmp_path / "graphql", backend="graphql", GRAPHQL_PATCHES="false")
+    for state in ("closed", "open"):
+        rest, graphql = stored_prs(tmp_path / "rest", state), stored_prs(tmp_path / "graphql", state)
+        assert [[line_counts(fc) for fc in pr["File Changes"]] for pr in graphql] == \
+               [[line_counts(fc) for fc in pr["File Changes"]] for pr in rest]
+        assert all(fc["Patch"] == "" for pr in graphql for fc in pr["File Changes"])
+    assert any(line_counts(fc) != (0, 0) for pr in graphql for fc in pr["File Changes"])
+
+
+def test_second_fetch_is_served_by_304s(services, tmp_path):
+    fetch(services, tmp_path)
+    first = stored_prs(tmp_path, "closed")
+    services.log.clear()
+
+    fetch(services, tmp_path)
+    github = [status for method, path, status in services.log if path.startswith("/repos/")]
+    assert github and set(github) == {304}
+    assert stored_prs(tmp_path, "closed") == first
+
+
+def test_incremental_sync_refetches_only_updated_prs(services, tmp_path):
+    repo = services.repos[OWNER, NAME]
+    fetch(services, tmp_path, mode="incremental")
+    assert fetched_pr_numbers(services.log) == set(repo.times)
+    watermark = max(updated for _, updated in repo.times.values())
+    at_watermark = {number for number, (_, updated) in repo.times.items() if updated == watermark}
+
+    # Two closed PRs get new activity and the oldest open PR is closed
+    latest = watermark + 10
+    for number in (2, 5, 13):
+        repo.times[number] = (repo.times[number][0], latest)
+    repo.closed += 1
+    services.log.clear()
+
+    fetch(services, tmp_path, mode="incremental")
+    # PRs updated exactly at the watermark are re-fetched too, by design
+    assert {2, 5, 13} <= fetched_pr_numbers(services.log) <= {2, 5, 13} | at_watermark
+    assert 13 in {pr["PR Number"] for pr in stored_prs(tmp_path, "closed")}
+    assert [pr["PR Number"] for pr in stored_prs(tmp_path, "open")] == [16, 15, 14]
+
+
+def test_failed_listing_page_keeps_the_watermark(tmp_path):
+    repo = SyntheticRepo(OWNER, NAME, closed=100, open=5, files_per_pr=1, comments_per_pr=1)
+    with FakeServices([repo], latency=0, jitter=0) as services:
+        services.failing_pages = {2}
+        result = fetch(services, tmp_path, mode="incremental", check=False, GITHUB_MAX_RETRIES="0")
+        assert result.returncode != 0 and "ListingError" in result.stderr
+        assert watermark(tmp_path) is None  # Page 2 was never listed
+        assert len(stored_prs(tmp_path, "closed")) + len(stored_prs(tmp_path, "open")) == 100  # Page 1 is kept
+
+        services.failing_pages.clear()
+        fetch(services, tmp_path, mode="incremental")
+        assert len(stored_prs(tmp_path, "closed")) == 100
+        assert watermark(tmp_path) == repo.pull(repo.listing("all", "updated")[0])["updated_at"]
+
+
+def test_full_refresh_records_a_watermark(services, tmp_path):
+    services.failing_pages = {2}  # Past the last page of both listings: a cut-short full refresh
+    fetch(services, tmp_path, GITHUB_MAX_RETRIES="0")
+    assert watermark(tmp_path) is None
+
+    services.failing_pages.clear()
+    fetch(services, tmp_path)
+    assert watermark(tmp_path) is not None
+    services.log.clear()
+    fetch(services, tmp_path, mode="incremental")  # Nothing changed since the full refresh
+    assert fetched_pr_numbers(services.log) == set()
+
+
+def get_pulls(services):
+    return requests.get(f"{services.url}/repos/{OWNER}/{NAME}/pulls", headers={"Authorization": "token test-token"})
+
+
+def test_scheduler_waits_when_remaining_quota_is_low():
+    with FakeServices([SyntheticRepo(OWNER, NAME, closed=2, open=1)], latency=0, jitter=0,
+                      rate_limit=10) as services:
+        services.reset_at = int(time.time()) + 5
+        scheduler = RateLimitScheduler(tokens=["test-token"], burst=1)
+
+        scheduler.update("test-token", get_pulls(services).headers)  # 9 of 10 left: unpaced
+        assert scheduler.reserve() == ("test-token", 0.0)
+
+        for _ in range(8):
+            response = get_pulls(services)
+        assert response.headers["X-RateLimit-Remaining"] == "1"
+        scheduler.update("test-token", response.headers)
+        assert scheduler.reserve()[1] == 0.0  # The last request left
+        _, wait = scheduler.reserve()  # Quota gone: wait for the reset
+        assert 1 < wait <= 7
+
+        assert get_pulls(services).headers["X-RateLimit-Remaining"] == "0"
+        response = get_pulls(services)
+        assert response.status_code == 403
+        assert scheduler.retry_delay("test-token", 403, response.headers, response.text, 0) == 0.0
+        assert 1 < scheduler.reserve()[1] <= 7  # Blocked until the reset, not retried at once
+
+
+def test_scheduler_honours_retry_after():
+    scheduler = RateLimitScheduler(tokens=["test-token"], burst=1)
+    assert scheduler.retry_delay("test-token", 429, {"Retry-After": "3"}, "", 0) == 0.0
+    _, wait = scheduler.reserve()
+    assert 2.5 < wait <= 3
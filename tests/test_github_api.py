@@ -1 +1,71 @@
- # 🔗 Tests GitHub API integration
\ No newline at end of file
+# 🔗 Tests that GitHub requests time out and retry dropped connections like 5xx responses
+import asyncio
+
+import httpx
+import pytest
+import requests
+
+from smartmerge_ai import async_extractor, github_client
+from smartmerge_ai.config import GITHUB_MAX_RETRIES, GITHUB_TIMEOUT
+from smartmerge_ai.github_client import GitHubClient, ResponseCache
+from smartmerge_ai.rate_limiter import RateLimitScheduler
+
+
+class FlakySession:
+    """Raises the queued errors in turn, then answers 200; records the kwargs of every call."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append(kwargs)
+        if self.errors:
+            raise self.errors.pop(0)
+        response = requests.Response()
+        response.status_code, response._content = 200, b"[]"
+        return response
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(github_client, "backoff_delay", lambda attempt: 0)
+    monkeypatch.setattr(async_extractor, "backoff_delay", lambda attempt: 0)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(github_client, "GITHUB_TOKENS", ["token"])
+    return GitHubClient(cache=ResponseCache(str(tmp_path)), scheduler=RateLimitScheduler(tokens=["token"]))
+
+
+def test_network_errors_are_retried_with_a_timeout(client):
+    client.session = FlakySession(requests.ConnectionError("reset"), requests.ReadTimeout("stalled"))
+    assert client.request("GET", "https://api.github.com/x").status_code == 200
+    assert len(client.session.calls) == 3
+    assert all(call["timeout"] == GITHUB_TIMEOUT for call in client.session.calls)
+
+
+def test_network_error_on_the_last_attempt_is_raised(client):
+    client.session = FlakySession(*[requests.ConnectTimeout("down")] * (GITHUB_MAX_RETRIES + 1))
+    with pytest.raises(requests.ConnectTimeout):
+        client.request("GET", "https://api.github.com/x")
+    assert len(client.session.calls) == GITHUB_MAX_RETRIES + 1
+
+
+def test_async_transport_errors_are_retried(monkeypatch):
+    monkeypatch.setattr(async_extractor, "get_scheduler", lambda: RateLimitScheduler(tokens=["token"]))
+    errors = [httpx.ConnectError("refused"), httpx.ReadTimeout("stalled")]
+
+    def handler(request):
+        if errors:
+            raise errors.pop(0)
+        return httpx.Response(200, json=[])
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            request = client.build_request("GET", "https://api.github.com/x")
+            return await async_extractor._send(client, asyncio.Semaphore(1), request)
+
+    assert asyncio.run(run()).status_code == 200
+    assert not errors
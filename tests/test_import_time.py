@@ -0,0 +1,48 @@
+ # ⏱️ Import-time budget: `import smartmerge_ai` and CLI startup must stay cheap and credential-free
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+IMPORT_BUDGET = float(os.getenv("SMARTMERGE_IMPORT_BUDGET", "0.5"))  # Seconds, best of RUNS
+RUNS = 3
+
+# Modules that must only be imported once a stage actually needs them
+HEAVY_MODULES = ["langchain", "langchain_core", "langchain_openai", "langchain_community", "chromadb",
+                 "openai", "tiktoken", "pandas", "numpy", "requests", "httpx", "fastapi", "uvicorn"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def probe_import(module):
+    """Imports `module` in a fresh interpreter without any credentials; returns (best seconds, heavy modules)."""
+    env = {key: value for key, value in os.environ.items()
+           if key not in ("GITHUB_TOKEN", "GITHUB_TOKENS", "OPENAI_API_KEY")}
+    env["PYTHONPATH"] = REPO_ROOT
+    results = []
+    for _ in range(RUNS):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return min(result["seconds"] for result in results), results[0]["heavy"]
+
+
+@pytest.mark.parametrize("module", ["smartmerge_ai", "smartmerge_ai.main"])
+def test_import_stays_within_budget(module):
+    seconds, heavy = probe_import(module)
+    assert not heavy, f"`import {module}` pulls in {heavy}; import them on first use instead"
+    assert seconds <= IMPORT_BUDGET, f"`import {module}` took {seconds:.3f}s (budget {IMPORT_BUDGET}s)"
+
+
+@pytest.mark.parametrize("module", ["smartmerge_ai.Extract_Closed_PR", "smartmerge_ai.Extract_Open_PR"])
+def test_extractors_import_without_credentials(module):
+    probe_import(module)  # Raises CalledProcessError if the import fails
@@ -0,0 +1,79 @@
+# ⏳ Tests that duplicate job submissions coalesce and that event subscribers see every event in order
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+
+from smartmerge_ai import jobs
+from smartmerge_ai.jobs import JobManager
+
+
+class Registry:
+    llm = None
+
+    @contextmanager
+    def use(self, repo_owner, repo_name):
+        yield None
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """A two-stage pipeline that waits on `release` before its predictions; `runs` logs each job's start."""
+    state = {"runs": [], "release": None}
+
+    async def run_pipeline(job, registry, resources):
+        state["runs"].append((job.repo_name, job.mode))
+        await job.start_stage("fetch")
+        await state["release"].wait()
+        await job.start_stage("evaluate", total=2)
+        await job.add_result(1, {"merge_percentage": "90%"})
+        await job.add_result(2, {"merge_percentage": "40%"})
+
+    monkeypatch.setattr(jobs, "run_pipeline", run_pipeline)
+    return state
+
+
+def test_same_repo_and_settings_coalesce(pipeline):
+    async def run():
+        pipeline["release"] = asyncio.Event()
+        manager = JobManager(Registry())
+        first, coalesced = manager.submit("octo", "repo", "full", "rest")
+        assert not coalesced
+        assert manager.submit("octo", "repo", "full", "rest") == (first, True)
+        other, coalesced = manager.submit("octo", "repo", "incremental", "rest")
+        assert other is not first and not coalesced
+
+        await asyncio.sleep(0.01)
+        assert pipeline["runs"] == [("repo", "full")]  # The other mode queues behind it
+        pipeline["release"].set()
+        await first.wait()
+        await other.wait()
+        assert pipeline["runs"] == [("repo", "full"), ("repo", "incremental")]
+
+        again, coalesced = manager.submit("octo", "repo", "full", "rest")
+        assert again is not first and not coalesced  # Finished jobs are never joined
+        await again.wait()
+        return first
+
+    job = asyncio.run(run())
+    assert job.status == "done" and job.results == {1: {"merge_percentage": "90%"}, 2: {"merge_percentage": "40%"}}
+
+
+def test_late_subscribers_replay_every_event_in_order(pipeline):
+    async def run():
+        pipeline["release"] = asyncio.Event()
+        manager = JobManager(Registry())
+        job, _ = manager.submit("octo", "repo")
+
+        async def subscribe():
+            return [(event, data.get("stage", data.get("pr_number"))) async for event, data in job.follow()]
+
+        early = asyncio.create_task(subscribe())
+        await asyncio.sleep(0.01)  # The job is now waiting inside its fetch stage
+        pipeline["release"].set()
+        await job.wait()
+        return await early, await subscribe()
+
+    early, late = asyncio.run(run())
+    assert early == late == [("stage", "fetch"), ("stage", "evaluate"), ("prediction", 1), ("prediction", 2),
+                             ("done", "evaluate")]
@@ -0,0 +1,77 @@
+# 📐 Tests the memory-mapped exact vector index against brute-force cosine similarity
+import numpy as np
+import pytest
+
+from smartmerge_ai.memmap_index import MemmapIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = MemmapIndex(None, persist_directory=str(tmp_path / "index"))
+    yield index
+    index.close()
+
+
+def add(index, vectors, start=0):
+    ids = [f"id-{start + n}" for n in range(len(vectors))]
+    metadatas = [{"pr_number": start + n, "state": "closed" if (start + n) % 2 else "open"}
+                 for n in range(len(vectors))]
+    index.upsert_vectors(ids, vectors, [f"doc {start + n}" for n in range(len(vectors))], metadatas)
+    return ids
+
+
+def brute_force(vectors, query, k, rows=None):
+    rows = np.arange(len(vectors)) if rows is None else np.asarray(rows)
+    unit = vectors[rows] / np.linalg.norm(vectors[rows], axis=1, keepdims=True)
+    scores = unit @ (query / np.linalg.norm(query))
+    order = np.argsort(-scores)[:k]
+    return rows[order].tolist(), scores[order]
+
+
+def test_search_matches_brute_force_cosine(index):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((200, 16)).astype(np.float32)
+    add(index, vectors[:120])
+    add(index, vectors[120:], start=120)  # Appended to the existing matrix
+    query = rng.standard_normal(16).astype(np.float32)
+
+    hits = index.similarity_search_by_vector_with_score(query, k=10)
+    expected_rows, expected_scores = brute_force(vectors, query, 10)
+    assert [doc.metadata["pr_number"] for doc, _ in hits] == expected_rows
+    assert [score for _, score in hits] == pytest.approx(expected_scores.tolist(), abs=1e-5)
+
+    hits = index.similarity_search_by_vector_with_score(query, k=5, filter={"state": "closed"})
+    expected_rows, _ = brute_force(vectors, query, 5, rows=range(1, 200, 2))
+    assert [doc.metadata["pr_number"] for doc, _ in hits] == expected_rows
+
+
+def test_upsert_is_idempotent(index, tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((20, 8)).astype(np.float32)
+    ids = add(index, vectors)
+    query = vectors[3]
+    before = [(doc.id, score) for doc, score in index.similarity_search_by_vector_with_score(query, k=5)]
+
+    add(index, vectors)
+    add(index, vectors)
+    assert index.count() == 20
+    assert index.get(ids=ids[:1])["documents"] == ["doc 0"]
+    after = [(doc.id, score) for doc, score in index.similarity_search_by_vector_with_score(query, k=5)]
+    assert [id_ for id_, _ in after] == [id_ for id_, _ in before]
+    assert [score for _, score in after] == pytest.approx([score for _, score in before])
+    assert after[0][0] == "id-3"
+
+    reopened = MemmapIndex(None, persist_directory=str(tmp_path / "index"))
+    assert reopened.count() == 20
+    assert [doc.id for doc in reopened.similarity_search_by_vector(query, k=5)] == [id_ for id_, _ in before]
+    reopened.close()
+
+
+def test_delete_tombstones_and_compacts(index):
+    vectors = np.random.default_rng(2).standard_normal((10, 4)).astype(np.float32)
+    ids = add(index, vectors)
+    index.delete(ids[:6])  # More than half dead: the matrix is rewritten
+    assert index.count() == 4
+    assert len(np.load(index._vectors_path, mmap_mode="r")) == 4
+    expected_rows, _ = brute_force(vectors, vectors[7], 4, rows=range(6, 10))
+    assert [doc.metadata["pr_number"] for doc in index.similarity_search_by_vector(vectors[7], k=4)] == expected_rows
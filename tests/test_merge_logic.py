@@ -0,0 +1,77 @@
+# 📝 Tests the heuristic merge scorer and its triage cut-offs
+import math
+
+import pandas as pd
+import pytest
+
+from smartmerge_ai.diff_model import compact_file_change
+from smartmerge_ai.merge_logic import WEIGHTS, MergeHistory, decide, score_prs, triage_open_prs
+
+NOW = pd.Timestamp("2024-06-01T00:00:00Z")
+
+
+def make_pr(number, author="newcomer", merged=None, conflict=False, paths=(), created=NOW):
+    return {
+        "PR Number": number, "State": "open" if merged is None else "closed", "Author": author,
+        "Base Branch": "main", "Created Date": created.isoformat(), "Merge Conflict": conflict,
+        "Merged Date": "2024-01-02T00:00:00Z" if merged else "Not merged",
+        "File Changes": [compact_file_change(path, "modified", "@@ -1 +1 @@\n-a\n+b") for path in paths],
+    }
+
+
+def logit(p):
+    return math.log(p / (1 - p))
+
+
+def sigmoid(x):
+    return 1 / (1 + math.exp(-x))
+
+
+@pytest.fixture
+def history():
+    # 3 of 4 closed PRs merged; alice merged both of hers
+    return MergeHistory([make_pr(1, "alice", merged=True), make_pr(2, "alice", merged=True),
+                         make_pr(3, "bob", merged=True), make_pr(4, "bob", merged=False)])
+
+
+def test_score_of_a_featureless_pr_is_the_repo_merge_rate(history):
+    assert history.merge_rate == 0.75
+    scores = score_prs([make_pr(10)], history, now=NOW)["score"]
+    assert scores[0] == pytest.approx(0.75)
+
+
+def test_known_scores(history):
+    frame = score_prs([make_pr(10, "alice"), make_pr(11, conflict=True),
+                       make_pr(12, created=NOW - pd.Timedelta(days=30))], history, now=NOW)
+    alice_rate = (2 + 5 * 0.75) / (2 + 5)  # Two merges, shrunk by PRIOR_STRENGTH towards the repo rate
+    expected = [
+        sigmoid(logit(0.75) + WEIGHTS["author_rate"] * (alice_rate - 0.75)),
+        sigmoid(logit(0.75) + WEIGHTS["merge_conflict"]),
+        sigmoid(logit(0.75) + WEIGHTS["age"] * math.log1p(1)),
+    ]
+    assert frame["score"].tolist() == pytest.approx(expected)
+
+
+def test_docs_only_prs_score_higher(history):
+    frame = score_prs([make_pr(10, paths=["docs/guide.md"]), make_pr(11, paths=["src/app.py"])], history, now=NOW)
+    assert frame["score"][0] > frame["score"][1]
+
+
+def test_decide_cut_offs():
+    scores = pd.Series([0.95, 0.85, 0.5, 0.15, 0.05])
+    assert decide(scores, high=0.85, low=0.15).tolist() == ["merge", "merge", "llm", "block", "block"]
+    assert (decide(scores, high=1.1, low=-0.1) == "llm").all()
+
+
+def test_triage_settles_clear_cases_only(history):
+    now = pd.Timestamp.now(tz="UTC")
+    open_prs = [make_pr(10, "alice", created=now), make_pr(11, created=now),
+                make_pr(12, conflict=True, created=now)]
+    # Scores: ~0.79 (alice), 0.75 (repo rate), ~0.2 (conflict)
+    results, uncertain = triage_open_prs(open_prs, history, high=0.78, low=0.25)
+    assert set(results) == {10, 12}
+    assert uncertain == [11]
+    assert results[10]["source"] == "heuristic"
+    assert results[10]["response"].startswith("Safe to merge")
+    assert results[12]["response"].startswith("Do not merge yet")
+    assert results[12]["merge_percentage"] == f"{round(sigmoid(logit(0.75) - 2.5) * 100)}%"
@@ -0,0 +1,61 @@
+# 📈 Tests the Prometheus text export of counters, histograms and spans
+import pytest
+from fastapi.testclient import TestClient
+
+from smartmerge_ai import app as api
+from smartmerge_ai.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry(enabled=True)
+
+
+def test_counters_and_histograms_render_in_prometheus_format(registry):
+    registry.inc("github_requests_total", resource="core", status=200)
+    registry.inc("github_requests_total", 2, resource="core", status=200)
+    registry.inc("github_requests_total", resource="core", status="ReadTimeout")
+    for seconds in (0.003, 0.2, 400):
+        registry.observe("github_request_seconds", seconds, resource="core")
+    lines = registry.render_prometheus().splitlines()
+
+    assert lines.count("# TYPE smartmerge_github_requests_total counter") == 1
+    assert "# HELP smartmerge_github_requests_total GitHub API requests, by resource and HTTP status " \
+           "(or network error)" in lines
+    assert 'smartmerge_github_requests_total{resource="core",status="200"} 3' in lines
+    assert 'smartmerge_github_requests_total{resource="core",status="ReadTimeout"} 1' in lines
+    assert "# TYPE smartmerge_github_request_seconds histogram" in lines
+    assert 'smartmerge_github_request_seconds_bucket{resource="core",le="0.005"} 1' in lines
+    assert 'smartmerge_github_request_seconds_bucket{resource="core",le="0.25"} 2' in lines  # Cumulative
+    assert 'smartmerge_github_request_seconds_bucket{resource="core",le="300.0"} 2' in lines
+    assert 'smartmerge_github_request_seconds_bucket{resource="core",le="+Inf"} 3' in lines
+    assert 'smartmerge_github_request_seconds_count{resource="core"} 3' in lines
+    assert 'smartmerge_github_request_seconds_sum{resource="core"} 400.203' in lines
+
+
+def test_label_values_are_escaped(registry):
+    registry.inc("llm_requests_total", model='say "hi"\\\n', status="ok")
+    assert 'smartmerge_llm_requests_total{model="say \\"hi\\"\\\\\\n",status="ok"} 1' in \
+        registry.render_prometheus().splitlines()
+
+
+def test_failed_spans_are_counted(registry):
+    with pytest.raises(KeyError):
+        with registry.span("stage.fetch", repo="octo/repo"):
+            raise KeyError("missing")
+    with registry.span("stage.embed"):
+        pass
+    text = registry.render_prometheus()
+    assert 'smartmerge_span_errors_total{span="stage.fetch"} 1' in text
+    assert 'smartmerge_span_seconds_count{span="stage.fetch"} 1' in text
+    assert 'smartmerge_span_seconds_count{span="stage.embed"} 1' in text
+    assert [span["error"] for span in registry.spans] == ["KeyError", None]
+
+
+def test_metrics_endpoint_serves_the_shared_registry(registry, monkeypatch):
+    monkeypatch.setattr(api, "metrics", registry)
+    registry.inc("embedding_requests_total", model="hashing")
+    response = TestClient(api.app).get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'smartmerge_embedding_requests_total{model="hashing"} 1' in response.text
+    assert TestClient(api.app).get("/metrics", params={"format": "json"}).json()["embedding"]["requests"] == 1
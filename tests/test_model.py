@@ -1 +1,54 @@
- # 🧪 Tests model predictions
\ No newline at end of file
+# 🧪 Tests model predictions: merge percentages from LLM answers and retries of transient provider errors
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from smartmerge_ai import ragLLM
+from smartmerge_ai.ragLLM import _call_llm, extract_merge_percentage, to_result
+
+
+@pytest.mark.parametrize("answer, percentage", [
+    ("This PR is ready to merge.", 90),
+    ("Looks SAFE TO MERGE after a rebase.", 85),
+    ("Merge conflicts exist in src/app.py.", 40),
+    ("Do not merge: it drops the migration.", 10),
+    ("Hard to say.", 50),
+])
+def test_merge_percentage_follows_the_answer(answer, percentage):
+    assert extract_merge_percentage(answer) == percentage
+    assert to_result(answer) == {"response": answer, "merge_percentage": f"{percentage}%"}
+
+
+class FlakyLLM:
+    """Times out `failures` times, then answers."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com/v1/chat"))
+        return SimpleNamespace(content="Safe to merge.")
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(ragLLM, "backoff_delay", lambda attempt: 0)
+
+
+def test_transient_errors_are_retried():
+    llm = FlakyLLM(failures=2)
+    assert asyncio.run(_call_llm(llm, [], max_retries=2)).content == "Safe to merge."
+    assert llm.calls == 3
+
+
+def test_transient_error_on_the_last_attempt_is_raised():
+    llm = FlakyLLM(failures=3)
+    with pytest.raises(openai.APITimeoutError):
+        asyncio.run(_call_llm(llm, [], max_retries=2))
+    assert llm.calls == 3
@@ -0,0 +1,84 @@
+# 💾 Tests resuming an interrupted PR stream and that readers only ever see complete runs
+import json
+import os
+
+import pytest
+
+from smartmerge_ai import pr_dataset, pr_stream
+from smartmerge_ai.vector_store import iter_pr_data
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    stream = tmp_path / "repo_all_closed_prs.jsonl"
+    monkeypatch.setattr(pr_stream, "pr_stream_path", lambda state, repo: str(stream))
+    monkeypatch.setattr(pr_stream, "pr_data_path", lambda state, repo: str(tmp_path / "repo_all_closed_prs.json"))
+    monkeypatch.setattr(pr_dataset, "pr_stream_path", lambda state, repo: str(stream))
+    return tmp_path / "repo_all_closed_prs.json", stream
+
+
+def pr(number):
+    return {"PR Number": number, "Title": f"PR {number}", "File Changes": []}
+
+
+def test_resume_relists_the_last_completed_page(paths):
+    writer = pr_stream.PRStreamWriter("closed", "repo")
+    assert writer.resume_page == 1
+    writer.write(pr(9), page=1)
+    writer.complete_page(1)
+    writer.write(pr(8), page=2)
+    writer.close()  # Interrupted halfway through page 2
+
+    writer = pr_stream.PRStreamWriter("closed", "repo")
+    assert writer.resume_page == 2  # The unfinished page
+    assert writer.has(9) and writer.has(8)
+    writer.complete_page(2)
+    writer.close()
+
+    writer = pr_stream.PRStreamWriter("closed", "repo")
+    assert writer.resume_page == 2  # Completed, but re-listed in case PRs shifted
+    writer.finalize()
+    assert pr_stream.PRStreamWriter("closed", "repo").resume_page == 1
+
+
+def complete_run(numbers):
+    writer = pr_stream.PRStreamWriter("closed", "repo")
+    for number in numbers:
+        writer.write(pr(number), page=1)
+    writer.complete_page(1)
+    writer.finalize()
+
+
+def numbers(prs):
+    return [p["PR Number"] for p in prs]
+
+
+def test_interrupted_run_leaves_the_complete_stream_alone(paths):
+    json_file, stream = paths
+    complete_run((3, 2, 1))
+    assert numbers(iter_pr_data(str(json_file))) == [3, 2, 1]
+
+    writer = pr_stream.PRStreamWriter("closed", "repo")
+    writer.write(pr(4), page=1)
+    writer.close()  # Interrupted
+    assert numbers(iter_pr_data(str(json_file))) == [3, 2, 1]
+    assert numbers(iter_pr_data(str(stream))) == [3, 2, 1]
+
+    writer = pr_stream.PRStreamWriter("closed", "repo")  # Resumes the partial run
+    assert writer.has(4)
+    writer.write(pr(3), page=1)
+    writer.complete_page(1)
+    writer.finalize()
+    assert numbers(iter_pr_data(str(stream))) == [4, 3]
+    assert numbers(json.loads(json_file.read_text())) == [4, 3]
+
+
+def test_run_failing_before_the_first_write_keeps_the_last_run(paths):
+    json_file, stream = paths
+    complete_run((3, 2, 1))
+
+    writer = pr_stream.PRStreamWriter("closed", "repo")
+    writer.close()  # Listing failed: nothing fetched, no checkpoint
+    assert not os.path.exists(pr_stream.checkpoint_path(str(stream)))
+    assert numbers(iter_pr_data(str(stream))) == [3, 2, 1]
+    assert numbers(pr_dataset.iter_raw_prs("closed", "repo")) == [3, 2, 1]
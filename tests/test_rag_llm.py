@@ -0,0 +1,35 @@
+# 🤖 Tests that one PR failing for good does not sink the evaluation of the others
+import asyncio
+from types import SimpleNamespace
+
+from smartmerge_ai.ragLLM import stream_evaluations
+
+
+class FakeLLM:
+    """Answers every prompt, except that of PR #2, which fails with a non-transient error."""
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(0)
+        if "PR #2:" in messages[1]["content"]:
+            raise ValueError("context length exceeded")
+        return SimpleNamespace(content="This PR is ready to merge.")
+
+
+def make_pr(number):
+    return {"PR Number": number, "Title": f"Change {number}", "State": "open", "Author": "alice",
+            "Created Date": "2024-01-01T00:00:00Z", "Base Branch": "main", "Head Branch": f"feature/{number}",
+            "Merge Conflict": False, "File Changes": [], "Old Comments": [], "New Comments": []}
+
+
+def test_failed_pr_yields_an_error_result_and_the_rest_complete(capsys):
+    async def run():
+        return [item async for item in stream_evaluations(
+            None, (make_pr(number) for number in (1, 2, 3)), concurrency=3, use_cache=False, llm=FakeLLM(),
+            repo="test/no-such-repo")]
+
+    results = dict(asyncio.run(run()))
+    assert sorted(results) == [1, 2, 3]
+    assert results[1] == results[3] == {"response": "This PR is ready to merge.", "merge_percentage": "90%"}
+    assert results[2]["merge_percentage"] == "N/A"
+    assert results[2]["error"] == "ValueError: context length exceeded"
+    assert "1 PR evaluations failed" in capsys.readouterr().out
@@ -0,0 +1,61 @@
+# 🔥 Tests that the repo registry evicts idle and least recently used repos and closes their stores
+import asyncio
+
+import pytest
+
+from smartmerge_ai import repo_registry
+from smartmerge_ai.chroma_store import ChromaStore
+from smartmerge_ai.repo_registry import RepoRegistry
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    """Every closed-PR store the registry opens, each a ChromaStore in its own directory."""
+    opened = []
+
+    def open_pr_store(path):
+        opened.append(ChromaStore(collection_name="closed_prs", persist_directory=str(tmp_path / str(len(opened)))))
+        return opened[-1]
+
+    monkeypatch.setattr(repo_registry, "open_pr_store", open_pr_store)
+    return opened
+
+
+def test_least_recently_used_repo_is_evicted_and_closed(stores):
+    registry = RepoRegistry(max_repos=1, idle_ttl=3600)
+    with registry.use("a", "one") as resources:
+        assert resources.closed_db.collection.count() == 0
+    assert "a/one" in registry and not stores[0]._client._closed
+
+    with registry.use("b", "two") as resources:
+        resources.closed_db
+    assert "a/one" not in registry and "b/two" in registry
+    assert stores[0]._client._closed and not stores[1]._client._closed
+    registry.close()
+    assert stores[1]._client._closed
+
+
+def test_repo_in_use_is_never_evicted(stores):
+    registry = RepoRegistry(max_repos=1, idle_ttl=-1)  # Idle means expired
+    with registry.use("a", "one") as resources:
+        resources.closed_db
+        assert registry.evict() == 0
+        with registry.use("b", "two"):
+            assert len(registry) == 2  # Over max_repos, but both are busy
+    assert len(registry) == 0  # Expired as soon as they were released
+    assert stores[0]._client._closed
+
+
+def test_evict_idle_closes_repos_while_no_job_comes_by(stores):
+    registry = RepoRegistry(idle_ttl=3600)
+    with registry.use("a", "one") as resources:
+        resources.closed_db
+    registry.idle_ttl = -1
+
+    async def run():
+        task = asyncio.create_task(registry.evict_idle())
+        await asyncio.sleep(1.2)
+        task.cancel()
+
+    asyncio.run(run())
+    assert len(registry) == 0 and stores[0]._client._closed
@@ -0,0 +1,94 @@
+# 📚 Tests PR chunk metadata, filtered search, and streaming stored PRs page by page
+import numpy as np
+import pytest
+
+from smartmerge_ai.chroma_store import ChromaStore
+from smartmerge_ai.embedding_backends import HashingEmbeddings
+from smartmerge_ai.embedding_cache import sync_texts
+from smartmerge_ai.memmap_index import MemmapIndex
+from smartmerge_ai.vector_store import build_pr_documents, iter_stored_prs, search_prs, stored_pr_numbers
+
+
+class CountingIndex(MemmapIndex):
+    """Records the `limit` of every `get` call, i.e. the pages read."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pages = []
+
+    def get(self, *args, **kwargs):
+        self.pages.append(kwargs.get("limit"))
+        return super().get(*args, **kwargs)
+
+
+@pytest.fixture
+def store(tmp_path):
+    """25 PRs of two chunks each, stored second chunk first; odd PRs are by bob."""
+    store = CountingIndex(None, persist_directory=str(tmp_path / "index"))
+    ids, documents, metadatas = [], [], []
+    for number in range(1, 26):
+        author = "bob" if number % 2 else "alice"
+        for chunk, start, text in ((1, 10, f"second-{number}"), (0, 0, f"PR {number}: ")):
+            ids.append(f"{number}-{chunk}")
+            documents.append(text)
+            metadatas.append({"pr_number": number, "author": author, "chunk": chunk, "start": start})
+    vectors = np.random.default_rng(0).standard_normal((len(ids), 4)).astype(np.float32)
+    store.upsert_vectors(ids, vectors, documents, metadatas)
+    yield store
+    store.close()
+
+
+def test_stored_pr_numbers_pages_past_page_size(store):
+    assert list(stored_pr_numbers(store, page_size=4)) == list(range(1, 26))
+    assert len(store.pages) == 13  # 50 chunks, 4 per page
+
+
+def test_iter_stored_prs_streams_each_filtered_pr_once(store):
+    prs = list(iter_stored_prs(store, where={"author": "bob"}, page_size=5))
+    assert [metadata["pr_number"] for metadata, _ in prs] == list(range(1, 26, 2))
+    assert all(metadata == {"pr_number": metadata["pr_number"], "author": "bob"} for metadata, _ in prs)
+    assert prs[0][1] == "PR 1: \nsecond-1"
+    assert len(store.pages) == 1 + 3  # One metadata page, then one document read per batch of 5 PRs
+
+
+def make_pr(number, author, paths, merged=True, comments=0):
+    return {"PR Number": number, "Title": f"Change {number}", "State": "closed", "Author": author,
+            "Merged Date": "2024-01-02T00:00:00Z" if merged else "Not merged", "Base Branch": "main",
+            "File Changes": [{"Filename": path, "Status": "modified"} for path in paths],
+            "New Comments": [{"User": "reviewer", "Body": f"note {n} " * 30} for n in range(comments)]}
+
+
+def test_every_chunk_carries_its_pr_metadata():
+    texts, metadatas = build_pr_documents([make_pr(1, "alice", ["src/core/db.py"], comments=5),
+                                           make_pr(2, "bob", [], merged=False)])
+    first = [metadata for metadata in metadatas if metadata["pr_number"] == 1]
+    assert len(first) > 1  # Long enough to be split
+    assert [metadata["chunk"] for metadata in first] == list(range(len(first)))
+    assert all(metadata["paths"] == ["src/core/db.py"] and metadata["dirs"] == ["src/", "src/core/"]
+               and metadata["author"] == "alice" and metadata["merged"] for metadata in first)
+    assert metadatas[-1]["pr_number"] == 2 and "paths" not in metadatas[-1] and not metadatas[-1]["merged"]
+    assert all(text.startswith("PR Number: 2,") for text, metadata in zip(texts, metadatas)
+               if metadata["pr_number"] == 2)
+
+
+@pytest.mark.parametrize("backend", ["chroma", "memmap"])
+def test_search_only_returns_chunks_matching_the_filter(backend, tmp_path):
+    embeddings = HashingEmbeddings(dim=64)
+    if backend == "chroma":
+        store = ChromaStore(collection_name="closed_prs", embedding_function=embeddings,
+                            persist_directory=str(tmp_path))
+    else:
+        store = MemmapIndex(embeddings, str(tmp_path))
+    prs = [make_pr(1, "alice", ["src/core/db.py"]), make_pr(2, "bob", ["src/core/api.py"], merged=False),
+           make_pr(3, "alice", ["docs/index.md"])]
+    sync_texts(store, *build_pr_documents(prs))
+
+    def numbers(**filters):
+        return sorted({doc.metadata["pr_number"] for doc in search_prs(store, "src core db change", k=10, **filters)})
+
+    assert numbers() == [1, 2, 3]
+    assert numbers(path_prefix="src/core/") == [1, 2]
+    assert numbers(path_prefix="src/core/db.py") == [1]
+    assert numbers(author="alice", merged=True) == [1, 3]
+    assert numbers(author="bob", path_prefix="docs/") == []
+    store.close()
@@ -0,0 +1,91 @@
+# 🗳️ Tests verdict cache expiry, LRU eviction, and that any change to a PR invalidates its verdict
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from smartmerge_ai import ragLLM, verdict_cache
+from smartmerge_ai.ragLLM import stream_evaluations
+from smartmerge_ai.verdict_cache import VerdictCache, pr_fingerprint
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(verdict_cache, "time", clock)
+    return clock
+
+
+def make_pr(number, sha="abc", patch="+new", comment="LGTM"):
+    return {"PR Number": number, "Title": f"Change {number}", "Head SHA": sha,
+            "File Changes": [{"Filename": "src/app.py", "Status": "modified", "Patch": patch}],
+            "Old Comments": [], "New Comments": [{"User": "reviewer", "Body": comment}]}
+
+
+def fingerprint(pr, prompt="prompt", model="model"):
+    return pr_fingerprint(pr, "text", prompt, model)
+
+
+def test_fingerprint_changes_with_anything_the_verdict_depends_on():
+    base = fingerprint(make_pr(1))
+    assert fingerprint(make_pr(1)) == base
+    changed = [make_pr(1, sha="def"), make_pr(1, patch="+other"), make_pr(1, comment="Needs work")]
+    assert base not in {fingerprint(pr) for pr in changed}
+    assert fingerprint(make_pr(1), prompt="new prompt") != base
+    assert fingerprint(make_pr(1), model="other model") != base
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = VerdictCache(str(tmp_path / "verdicts.sqlite"), ttl=60, max_entries=10)
+    cache.put(1, "fp", {"merge_percentage": "90%"})
+    clock.now += 59
+    assert cache.get(1, "fp") == {"merge_percentage": "90%"}
+    assert cache.get(1, "other fp") is None
+    clock.now += 2
+    assert cache.get(1, "fp") is None
+    cache.evict()
+    assert len(cache) == 0 and (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = VerdictCache(str(tmp_path / "verdicts.sqlite"), ttl=3600, max_entries=2)
+    for number in (1, 2, 3):
+        cache.put(number, "fp", {"n": number})
+        clock.now += 1
+    cache.get(1, "fp")  # 1 is now the most recently used, 2 the least
+    cache.evict()
+    assert [cache.get(number, "fp") for number in (1, 2, 3)] == [{"n": 1}, None, {"n": 3}]
+
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return SimpleNamespace(content="Safe to merge.")
+
+
+def test_unchanged_prs_are_answered_from_the_cache(tmp_path, monkeypatch):
+    cache = VerdictCache(str(tmp_path / "verdicts.sqlite"))
+    monkeypatch.setattr(ragLLM, "get_verdict_cache", lambda: cache)
+    llm = CountingLLM()
+
+    def run(prs):
+        async def collect():
+            return dict([item async for item in stream_evaluations(
+                None, prs, use_cache=True, llm=llm, repo="test/no-such-repo")])
+        return asyncio.run(collect())
+
+    first = run([make_pr(1), make_pr(2)])
+    assert llm.calls == 2
+    assert run([make_pr(1), make_pr(2, sha="new head")]) == first
+    assert llm.calls == 3  # Only PR 2, whose head moved, was asked again